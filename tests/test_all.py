@@ -1,6 +1,8 @@
 """Smoke tests for core OpenWrite capabilities."""
 
+import json
 import os
+import random
 import subprocess
 import sys
 import tempfile
@@ -104,6 +106,606 @@ def test_world_graph_manager():
         assert check["is_valid"] is True
 
 
+def test_world_graph_adjacency():
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        for entity_id, name in (("city_rain", "雨城"), ("faction_han", "韩氏"), ("faction_li", "李氏")):
+            manager.upsert_entity(entity_id=entity_id, name=name)
+        manager.add_relation(source_id="faction_han", target_id="city_rain", relation="located_in")
+        manager.add_relation(source_id="faction_li", target_id="city_rain", relation="located_in")
+        manager.add_relation(source_id="faction_han", target_id="faction_li", relation="rival")
+
+        outgoing = manager.related_entities(entity_id="faction_han")
+        assert [(rel.relation, node.id) for rel, node in outgoing] == [
+            ("located_in", "city_rain"),
+            ("rival", "faction_li"),
+        ]
+        incoming = manager.incoming_entities(entity_id="city_rain", relation="located_in")
+        assert [node.id for _, node in incoming] == ["faction_han", "faction_li"]
+        assert manager.incoming_entities(entity_id="city_rain", relation="rival") == []
+
+        # A second manager sees edits made through the file.
+        other = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        other.add_relation(source_id="city_rain", target_id="faction_han", relation="ruled_by")
+        assert [node.id for _, node in manager.incoming_entities(entity_id="faction_han")] == [
+            "city_rain"
+        ]
+
+
+def test_world_graph_session():
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        with manager.session():
+            manager.upsert_entity(entity_id="city_rain", name="雨城")
+            manager.upsert_entity(entity_id="faction_han", name="韩氏")
+            manager.add_relation(source_id="faction_han", target_id="city_rain", relation="located_in")
+            assert not manager.graph_file.exists()
+            assert [node.id for _, node in manager.related_entities(entity_id="faction_han")] == [
+                "city_rain"
+            ]
+        assert len(manager.list_relations()) == 1
+
+        saved = manager.graph_file.read_text(encoding="utf-8")
+        try:
+            with manager.session():
+                manager.upsert_entity(entity_id="sect_shu", name="蜀山")
+                manager.add_relation(source_id="sect_shu", target_id="missing", relation="rival")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("relation to a missing entity should fail")
+        assert manager.graph_file.read_text(encoding="utf-8") == saved
+        assert [item.id for item in manager.list_entities()] == ["city_rain", "faction_han"]
+
+        counts = manager.import_records(
+            [{"id": "sect_shu", "name": "蜀山", "type": "faction"}],
+            [{"source": "sect_shu", "target": "city_rain", "relation": "protects", "weight": 3}],
+        )
+        assert counts == (1, 1)
+        assert manager.incoming_entities(entity_id="city_rain", relation="protects")[0][1].id == "sect_shu"
+
+
+def test_world_table_import_export():
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir)
+        entities_csv = root / "ents.csv"
+        entities_csv.write_text(
+            "id,name,type,tags,attr.capital\n"
+            "kingdom_wei,魏国,faction,诸侯|北方,大梁\n"
+            "city_daliang,大梁,location,,\n"
+            "\n"
+            "city_daliang,大梁城,location,都城,\n",
+            encoding="utf-8",
+        )
+        relations_jsonl = root / "rels.jsonl"
+        relations_jsonl.write_text(
+            '{"source": "city_daliang", "target": "kingdom_wei", "relation": "belongs_to"}\n'
+            "\n"
+            '{"source_id": "city_daliang", "target_id": "kingdom_wei", "relation": "belongs_to"}\n'
+            '{"source": "kingdom_wei", "target": "city_daliang", "relation": "rules", "weight": 4}\n',
+            encoding="utf-8",
+        )
+
+        manager = WorldGraphManager(project_dir=root, novel_id="my_novel")
+        stats = manager.import_tables(entities_path=entities_csv, relations_path=relations_jsonl)
+        assert stats == {"entities": 2, "relations": 2, "duplicates": 1}
+        wei = manager.list_entities(entity_type="faction")[0]
+        assert wei.tags == ["诸侯", "北方"]
+        assert wei.attributes == {"capital": "大梁"}
+        assert manager.list_entities(entity_type="location")[0].name == "大梁城"
+
+        bad = root / "bad.jsonl"
+        bad.write_text('{"source": "kingdom_wei", "target": "kingdom_qi", "relation": "rival"}\n')
+        saved = manager.graph_file.read_text(encoding="utf-8")
+        try:
+            manager.import_tables(relations_path=bad)
+        except ValueError as exc:
+            assert "bad.jsonl 第 1 行" in str(exc)
+        else:
+            raise AssertionError("unknown endpoint should abort the import")
+        assert manager.graph_file.read_text(encoding="utf-8") == saved
+
+        for raw, message in (
+            ('"x"', "weight 必须是整数: x"),
+            ("2.9", "weight 必须是整数: 2.9"),
+            ("true", "weight 必须是整数: True"),
+            ("0", "greater than or equal to 1"),
+        ):
+            bad.write_text(
+                '{"source": "kingdom_wei", "target": "city_daliang", "relation": "taxes", '
+                f'"weight": {raw}}}\n'
+            )
+            try:
+                manager.import_tables(relations_path=bad)
+            except ValueError as exc:
+                assert str(exc).startswith("bad.jsonl 第 1 行: ") and message in str(exc)
+            else:
+                raise AssertionError(f"weight {raw} should abort the import")
+            assert manager.graph_file.read_text(encoding="utf-8") == saved
+        assert WorldGraphManager._parse_weight(" 3 ") == WorldGraphManager._parse_weight(3.0) == 3
+        assert WorldGraphManager._parse_weight("") == WorldGraphManager._parse_weight(None) == 1
+
+        out_entities = root / "out.csv"
+        out_relations = root / "out.jsonl"
+        assert manager.export_tables(
+            entities_path=out_entities, relations_path=out_relations
+        ) == {"entities": 2, "relations": 2}
+        other = WorldGraphManager(project_dir=root, novel_id="copy")
+        other.import_tables(entities_path=out_entities, relations_path=out_relations)
+        assert other.list_entities() == manager.list_entities()
+        assert other.list_relations() == manager.list_relations()
+
+
+def test_world_incremental_conflicts():
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        for entity_id in ("realm_a", "realm_b", "realm_c"):
+            manager.upsert_entity(entity_id=entity_id, name=entity_id, entity_type="realm")
+        manager.add_relation(source_id="realm_a", target_id="realm_b", relation="above")
+        manager.add_relation(source_id="realm_b", target_id="realm_c", relation="above")
+        assert manager.last_write_conflicts == {"errors": [], "warnings": []}
+
+        manager.add_relation(source_id="realm_a", target_id="realm_b", relation="above")
+        assert manager.last_write_conflicts["warnings"] == ["重复关系: realm_a-above->realm_b"]
+        manager.add_relation(source_id="realm_c", target_id="realm_a", relation="above")
+        assert manager.last_write_conflicts["errors"] == [
+            "境界层级存在循环: realm_a -> realm_b -> realm_c -> realm_a"
+        ]
+        assert manager.conflict_state_file.exists()
+
+        incremental = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel").check_conflicts()
+        full = manager.check_conflicts(full=True)
+        assert sorted(incremental["warnings"]) == sorted(full["warnings"])
+        assert incremental["errors"] == full["errors"]
+        assert len(full["errors"]) == 1
+        assert incremental["is_valid"] is False
+
+        # A later, separate cycle is still reported by the write that closes it.
+        for entity_id in ("realm_0", "realm_z"):
+            manager.upsert_entity(entity_id=entity_id, name=entity_id, entity_type="realm")
+        manager.add_relation(source_id="realm_z", target_id="realm_0", relation="above")
+        manager.add_relation(source_id="realm_0", target_id="realm_z", relation="above")
+        assert manager.last_write_conflicts["errors"] == [
+            "境界层级存在循环: realm_0 -> realm_z -> realm_0"
+        ]
+        incremental = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel").check_conflicts()
+        assert incremental["errors"] == manager.check_conflicts(full=True)["errors"]
+
+        # Hand edits invalidate the persisted state; the next check rescans.
+        raw = yaml.safe_load(manager.graph_file.read_text(encoding="utf-8"))
+        raw["relations"] = [{"source_id": "realm_a", "target_id": "ghost", "relation": "near"}]
+        manager.graph_file.write_text(yaml.safe_dump(raw, allow_unicode=True), encoding="utf-8")
+        result = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel").check_conflicts()
+        assert result["errors"] == ["关系目标实体不存在: ghost"]
+        assert result["warnings"] == []
+
+        manager.upsert_entity(entity_id="ghost", name="幽灵")
+        assert manager.check_conflicts()["is_valid"] is True
+
+    # Random hierarchies: the state built edge by edge reports exactly what a
+    # full rescan does, and each write names its component's cycle.
+    rng = random.Random(20)
+    for _ in range(30):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+            nodes = [f"e{number}" for number in range(7)]
+            with manager.session():
+                for entity_id in nodes:
+                    manager.upsert_entity(entity_id=entity_id, name=entity_id, entity_type="realm")
+                for _ in range(12):
+                    manager.add_relation(
+                        source_id=rng.choice(nodes), target_id=rng.choice(nodes), relation="above"
+                    )
+                    written = [
+                        item for item in manager.last_write_conflicts["errors"] if "循环" in item
+                    ]
+                    cycles = [
+                        f"境界层级存在循环: {' -> '.join(cycle)}"
+                        for cycle in manager.find_cycles("above")
+                    ]
+                    assert all(item in cycles for item in written)
+            incremental = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel").check_conflicts()
+            assert incremental["errors"] == manager.check_conflicts(full=True)["errors"]
+
+
+def test_world_cycle_components():
+    from graph.algorithms import component_cycle, find_cycles, strongly_connected_components
+    from world_graph_manager import WorldGraphManager
+
+    chain = {f"r{i}": [f"r{i + 1}"] for i in range(5000)}
+    assert find_cycles(chain) == []
+    chain["r5000"] = ["r0"]
+    cycles = find_cycles(chain)
+    assert len(cycles) == 1 and len(cycles[0]) == 5002
+    assert cycles[0][0] == cycles[0][-1] == "r0"
+    assert component_cycle({"c": ["a"], "a": ["b", "c"], "b": ["c"]}, ["c", "b", "a"]) == ["a", "c", "a"]
+
+    components = strongly_connected_components({"a": ["b"], "b": ["a", "c"], "c": ["c"], "d": []})
+    assert sorted(sorted(item) for item in components) == [["a", "b"], ["c"], ["d"]]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        with manager.session():
+            for entity_id in ("a", "b", "c", "x", "y"):
+                manager.upsert_entity(entity_id=entity_id, name=entity_id, entity_type="realm")
+            for source_id, target_id in (("a", "b"), ("b", "c"), ("c", "a"), ("x", "y"), ("y", "x")):
+                manager.add_relation(source_id=source_id, target_id=target_id, relation="above")
+            manager.add_relation(source_id="a", target_id="x", relation="rival")
+        assert manager.find_cycles("above") == [["a", "b", "c", "a"], ["x", "y", "x"]]
+        assert manager.find_cycles("rival") == []
+
+
+def test_world_realm_ranks():
+    from character_state_manager import CharacterStateManager
+    from graph.algorithms import longest_path_heights
+    from world_graph_manager import WorldGraphManager
+
+    assert longest_path_heights({"a": ["b"], "b": ["c"], "x": ["y"], "y": ["x"]}) == {"c": 0, "b": 1, "a": 2}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        world = WorldGraphManager(project_dir=project_dir, novel_id="my_novel")
+        realms = [("realm_jindan", "金丹"), ("realm_zhuji", "筑基"), ("realm_lianqi", "练气")]
+        with world.session():
+            for entity_id, name in realms:
+                world.upsert_entity(entity_id=entity_id, name=name, entity_type="realm")
+            world.add_relation(source_id="realm_jindan", target_id="realm_zhuji", relation="above")
+            world.add_relation(source_id="realm_zhuji", target_id="realm_lianqi", relation="above")
+        assert world.compare_realms("金丹", "练气") == 1
+        assert world.compare_realms("realm_lianqi", "筑基") == -1
+        assert world.compare_realms("筑基", "realm_zhuji") == 0
+        assert world.compare_realms("元婴", "练气") is None
+        ranks = world.realm_ranks()
+        assert WorldGraphManager(project_dir=project_dir, novel_id="my_novel").realm_ranks() is ranks
+        # A separate branch of equal height is not ordered against 筑基.
+        world.upsert_entity(entity_id="realm_lianti", name="炼体", entity_type="realm")
+        world.add_relation(source_id="realm_lianti", target_id="realm_lianqi", relation="above")
+        assert world.compare_realms("炼体", "练气") == 1
+        assert world.compare_realms("炼体", "筑基") is None
+        # Reachability is a closure over the whole chain, rebuilt only when
+        # the ``above`` edges change.
+        reach = world._index().realm_reach
+        world.upsert_entity(entity_id="city_tianjing", name="天京", entity_type="location")
+        assert world.compare_realms("炼体", "练气") == 1
+        assert world._index().realm_reach is reach
+        world.upsert_entity(entity_id="realm_yuanying", name="元婴", entity_type="realm")
+        world.add_relation(source_id="realm_yuanying", target_id="realm_jindan", relation="above")
+        assert world.compare_realms("元婴", "练气") == 1
+        assert world.compare_realms("炼体", "元婴") is None
+        assert world._index().realm_reach is not reach
+
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("韩立", tier="主角")
+        advance = manager.apply_mutation(name="韩立", chapter_id="ch_001", mutation_expr="realm:筑基")
+        assert "realm_change" not in advance.payload
+        regression = manager.apply_mutation(name="韩立", chapter_id="ch_002", mutation_expr="realm:练气")
+        assert regression.payload["realm_change"] == "regression"
+        unranked = manager.apply_mutation(name="韩立", chapter_id="ch_003", mutation_expr="realm:化神")
+        assert unranked.payload["realm_change"] == "unranked"
+        assert manager.realm_change("筑基", "炼体") == "unordered"
+
+        # Backdated changes are judged against the realm at their own chapter.
+        manager.apply_mutation(name="韩立", chapter_id="ch_005", mutation_expr="realm:金丹")
+        backdated = manager.apply_mutation(name="韩立", chapter_id="ch_002", mutation_expr="realm:筑基")
+        assert "realm_change" not in backdated.payload
+        backdated = manager.apply_mutation(name="韩立", chapter_id="ch_001", mutation_expr="realm:练气")
+        assert backdated.payload["realm_change"] == "regression"
+
+
+def test_world_neighborhood():
+    from agents.simulator import AgentSimulator
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        world = WorldGraphManager(project_dir=project_dir, novel_id="my_novel")
+        with world.session():
+            for entity_id, name in (("city", "雨城"), ("hall", "议事厅"), ("sect", "青云宗"), ("peak", "主峰"), ("far", "远方")):
+                world.upsert_entity(entity_id=entity_id, name=name, entity_type="location")
+            world.add_relation(source_id="hall", target_id="city", relation="located_in")
+            world.add_relation(source_id="sect", target_id="city", relation="rival")
+            world.add_relation(source_id="peak", target_id="sect", relation="located_in")
+            world.add_relation(source_id="far", target_id="peak", relation="located_in")
+
+        local = world.neighborhood(["议事厅"], hops=2)
+        assert local["hops"] == {"hall": 0, "city": 1, "sect": 2}
+        assert [(rel.source_id, rel.target_id) for rel in local["relations"]] == [("hall", "city"), ("sect", "city")]
+        assert world.neighborhood(["hall"], hops=3, max_nodes=3)["hops"] == {"hall": 0, "city": 1, "sect": 2}
+        assert list(world.neighborhood(["hall"], hops=5, relations=["located_in"])["hops"]) == ["hall", "city"]
+        assert list(world.neighborhood(["sect"], hops=1, direction="in")["hops"]) == ["sect", "peak"]
+        assert world.neighborhood(["unknown"])["entities"] == []
+
+        index = world._index()
+        world.neighborhood(["hall"], hops=2)
+        assert len(index.neighborhoods) == 5
+        world.upsert_entity(entity_id="gate", name="城门", entity_type="location")
+        assert len(world._index().neighborhoods) == 0
+
+        simulator = AgentSimulator(project_dir=project_dir, novel_id="my_novel")
+        context = simulator._world_context({"scenes": [{"attributes": {"location": "hall"}}]})
+        assert "议事厅" in context and "远方" not in context
+
+
+def test_world_centrality_summary():
+    from graph import algorithms
+    from world_graph_manager import WorldGraphManager
+
+    nodes = ["hub", "a", "b", "c", "sink"]
+    edges = [("a", "hub", 1), ("b", "hub", 1), ("c", "hub", 2), ("hub", "sink", 1), ("a", "ghost", 1)]
+    scores = algorithms.weighted_pagerank(nodes, edges)
+    assert abs(sum(scores.values()) - 1.0) < 1e-6
+    assert max(scores, key=scores.get) == "sink" and scores["hub"] > scores["a"]
+    numpy_module, algorithms.np = algorithms.np, None
+    try:
+        fallback = algorithms.weighted_pagerank(nodes, edges)
+    finally:
+        algorithms.np = numpy_module
+    assert all(abs(fallback[node] - scores[node]) < 1e-6 for node in nodes)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = WorldGraphManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        with manager.session():
+            manager.upsert_entity(entity_id="aaa", name="边缘村", entity_type="location")
+            manager.upsert_entity(entity_id="zzz", name="帝都", entity_type="location")
+            for order in range(4):
+                manager.upsert_entity(entity_id=f"town_{order}", name=f"镇{order}", entity_type="location")
+                manager.add_relation(source_id=f"town_{order}", target_id="zzz", relation="belongs_to")
+        summary = manager.summary(max_entities=1, max_relations=1)
+        assert summary.startswith("实体: 帝都<location>; 关系: 镇")
+        scores = manager.centrality()
+        assert manager.centrality() is scores
+        manager.add_relation(source_id="zzz", target_id="aaa", relation="rules", weight=10)
+        assert manager.centrality() is not scores
+        assert manager.summary(max_entities=1).startswith("实体: 边缘村")
+
+
+def test_world_temporal_relations():
+    import random
+
+    from agents.simulator import AgentSimulator
+    from graph.interval_index import IntervalIndex
+    from world_graph_manager import WorldGraphManager
+
+    rng = random.Random(7)
+    intervals = []
+    for number in range(300):
+        low = rng.randint(0, 100)
+        intervals.append((low, low + rng.randint(0, 30), number))
+    index = IntervalIndex(intervals)
+    for point in range(-1, 135):
+        expected = sorted(item for low, high, item in intervals if low <= point <= high)
+        assert sorted(index.stab(point)) == expected
+    assert IntervalIndex([]).stab(3) == []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = WorldGraphManager(project_dir=project_dir, novel_id="my_novel")
+        with manager.session():
+            for entity_id in ("han", "li", "city"):
+                manager.upsert_entity(entity_id=entity_id, name=entity_id, entity_type="faction")
+            manager.add_relation(source_id="han", target_id="city", relation="located_in")
+            manager.add_relation(source_id="han", target_id="li", relation="ally", until_chapter="ch_079")
+            manager.add_relation(source_id="han", target_id="li", relation="enemy", from_chapter="ch_080")
+        try:
+            manager.add_relation(source_id="li", target_id="city", relation="owns", from_chapter="ch_010", until_chapter="ch_002")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a reversed chapter window should fail")
+
+        def labels(chapter_id):
+            return sorted(rel.relation for rel in manager.list_relations(at=chapter_id))
+
+        assert labels("ch_010") == ["ally", "located_in"]
+        assert labels("ch_079") == ["ally", "located_in"]
+        assert labels("ch_080") == ["enemy", "located_in"]
+        assert len(manager.list_relations()) == 3
+        assert manager.neighborhood(["han"], hops=1, relations=["ally"], at="ch_100")["hops"] == {"han": 0}
+
+        rows = project_dir / "relations.jsonl"
+        manager.export_tables(relations_path=rows)
+        assert '"from_chapter": "ch_080"' in rows.read_text(encoding="utf-8")
+        assert manager.import_tables(relations_path=rows)["duplicates"] == 3
+
+        simulator = AgentSimulator(project_dir=project_dir, novel_id="my_novel")
+        context = simulator._world_context({"scenes": [{"attributes": {"location": "han"}}]}, "ch_090")
+        assert "han-enemy->li" in context and "ally" not in context
+
+
+def test_world_entity_search():
+    from graph.entity_index import EntitySearchIndex
+    from models.world import WorldEntity
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = WorldGraphManager(project_dir=project_dir, novel_id="my_novel")
+        with manager.session():
+            manager.upsert_entity(entity_id="city_rain", name="雨城", entity_type="location", tags=["主城"])
+            manager.upsert_entity(
+                entity_id="faction_han",
+                name="雨城韩氏",
+                entity_type="faction",
+                aliases=["韩家"],
+                attributes={"leader": "韩策"},
+            )
+            manager.upsert_entity(
+                entity_id="sect_qing",
+                name="青云宗",
+                entity_type="faction",
+                description="坐落雨城以北的剑修宗门 Sword sect",
+                attributes={"leader": "玄真"},
+            )
+
+        def ids(query="", **kwargs):
+            return [entity.id for entity, _ in manager.search_entities(query, **kwargs)]
+
+        assert ids("雨城") == ["city_rain", "faction_han", "sect_qing"]
+        assert ids("韩家") == ["faction_han"]
+        assert ids("韩策") == ["faction_han"]
+        assert ids("sword") == ["sect_qing"]
+        assert ids("剑") == ["sect_qing"]
+        assert ids("雨城", entity_type="faction") == ["faction_han", "sect_qing"]
+        assert ids(attributes={"leader": "玄真"}) == ["sect_qing"]
+        assert ids("不存在") == []
+        assert [entity.id for entity in manager.list_entities("faction")] == ["faction_han", "sect_qing"]
+
+        search = manager._index().search
+        manager.upsert_entity(entity_id="faction_han", name="韩氏", entity_type="faction", aliases=["韩门"])
+        assert manager._index().search is search
+        assert ids("韩家") == [] and ids("韩门") == ["faction_han"]
+        manager.add_relation(source_id="faction_han", target_id="city_rain", relation="located_in")
+        assert manager._index().search is search
+        assert manager.neighborhood(["韩门"], hops=1)["hops"] == {"faction_han": 0, "city_rain": 1}
+
+        # Relation writes only move the stamp; the index itself is untouched.
+        index_file = manager.search_index_file
+        stored_at = index_file.stat().st_mtime_ns
+        manager.add_relation(source_id="sect_qing", target_id="city_rain", relation="located_in")
+        assert index_file.stat().st_mtime_ns == stored_at
+        assert manager._search_stamp_matches(manager._graph_signature())
+
+        # The index persisted with the last entity write is reused by a fresh process.
+        stored = json.loads(index_file.read_text(encoding="utf-8"))
+        WorldGraphManager._index_cache.clear()
+        fresh = WorldGraphManager(project_dir=project_dir, novel_id="my_novel")
+        loaded = [entity.id for entity, _ in fresh.search_entities("韩门")]
+        assert loaded == ["faction_han"]
+        assert index_file.stat().st_mtime_ns == stored_at
+        assert EntitySearchIndex.from_dict(stored).search("雨城")[0][0] == "city_rain"
+        # A hand edit of the graph no longer matches the stamp.
+        graph_text = manager.graph_file.read_text(encoding="utf-8")
+        manager.graph_file.write_text(graph_text + "\n", encoding="utf-8")
+        assert not manager._search_stamp_matches(manager._graph_signature())
+
+        for version in range(200):
+            search.upsert(WorldEntity(id="city_rain", name=f"雨城{version}", type="location"))
+        assert len(search) == 3 and len(search._documents) < 200
+        assert [item[0] for item in search.search("雨城199")] == ["city_rain"]
+
+        rows = project_dir / "entities.csv"
+        manager.export_tables(entities_path=rows)
+        with manager.session():
+            manager.upsert_entity(entity_id="faction_han", name="韩氏", entity_type="faction")
+        manager.import_tables(entities_path=rows)
+        assert manager.list_entities("faction")[0].aliases == ["韩门"]
+
+
+def test_graph_streaming_export():
+    import xml.etree.ElementTree as ET
+
+    from graph.foreshadowing_dag import ForeshadowingDAGManager
+    from world_graph_manager import WorldGraphManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        world = WorldGraphManager(project_dir=project_dir, novel_id="my_novel")
+        with world.session():
+            world.upsert_entity(entity_id="city", name='雨城 "旧都"', entity_type="location", attributes={"climate": "多雨"})
+            world.upsert_entity(entity_id="han", name="韩氏", entity_type="faction", tags=["主角方", "世家"])
+            world.upsert_entity(entity_id="li", name="李氏", entity_type="faction")
+            world.upsert_entity(entity_id="far", name="远方", entity_type="location")
+            world.add_relation(source_id="han", target_id="city", relation="located_in", weight=5)
+            world.add_relation(source_id="li", target_id="han", relation="rival", from_chapter="ch_010")
+            world.add_relation(source_id="far", target_id="li", relation="trade")
+
+        graphml = project_dir / "world.graphml"
+        assert world.export_graph(graphml) == {"nodes": 4, "edges": 3}
+        ns = {"g": "http://graphml.graphdrawing.org/xmlns"}
+        root = ET.parse(graphml).getroot()
+        keys = {key.get("attr.name"): key.get("id") for key in root.findall("g:key", ns)}
+        assert "attr.climate" in keys
+        city = root.find("g:graph/g:node[@id='city']", ns)
+        assert {data.get("key"): data.text for data in city}[keys["name"]] == '雨城 "旧都"'
+        assert len(root.findall("g:graph/g:edge", ns)) == 3
+
+        dot = project_dir / "world.dot"
+        assert world.export_graph(dot, seeds=["韩氏"], hops=1) == {"nodes": 3, "edges": 2}
+        text = dot.read_text(encoding="utf-8")
+        assert text.startswith('digraph "my_novel" {') and '"han" -> "city"' in text
+        assert '\\"旧都\\"' in text and "far" not in text
+
+        lines = project_dir / "world.jsonl"
+        stats = world.export_graph(lines, entity_types=["faction"], at="ch_005")
+        assert stats == {"nodes": 2, "edges": 0}
+        rows = [json.loads(line) for line in lines.read_text(encoding="utf-8").splitlines()]
+        assert rows[0]["kind"] == "node" and rows[0]["tags"] == ["主角方", "世家"]
+
+        try:
+            world.export_graph(project_dir / "world.png")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unknown export format should fail")
+        assert not (project_dir / "world.png").exists()
+
+        dag = ForeshadowingDAGManager(project_dir=project_dir, novel_id="my_novel")
+        dag.create_node("f1", "玉佩来历", weight=9, layer="主线")
+        dag.create_node("f2", "旧盟约", weight=3, layer="支线")
+        dag.create_edge("f1", "f2")
+        dag.create_edge("f1", "f1_recover")
+        out = project_dir / "dag.graphml"
+        assert dag.export_graph(out) == {"nodes": 3, "edges": 2}
+        assert dag.export_graph(project_dir / "main.dot", layers=["主线"]) == {"nodes": 2, "edges": 1}
+        ET.parse(out)
+
+
+def test_foreshadowing_cycles_and_topo():
+    from graph.algorithms import find_path
+    from graph.foreshadowing_dag import ForeshadowingDAGManager
+    from models.foreshadowing import ForeshadowingEdge
+
+    chain = {f"n{i}": [f"n{i + 1}"] for i in range(5000)}
+    assert len(find_path(chain, "n0", "n5000")) == 5001
+    assert find_path(chain, "n5", "n0") == []
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = ForeshadowingDAGManager(project_dir=project_dir, novel_id="my_novel")
+        for node_id in ("f_end", "f_mid", "f_root", "f_side"):
+            manager.create_node(node_id, node_id, weight=5)
+        assert manager.create_edge("f_root", "f_mid")
+        assert manager.create_edge("f_mid", "f_end")
+        assert manager.create_edge("f_root", "f_root_recover")
+        assert not manager.create_edge("f_end", "f_root")
+        assert not manager.create_edge("f_side", "f_side")
+        assert len(manager._load_dag().edges) == 3
+        assert manager._cycle_with(manager._load_dag(), "f_end", "f_root") == ["f_end", "f_root", "f_mid", "f_end"]
+
+        order = manager.topological_order()
+        assert order.index("f_root") < order.index("f_mid") < order.index("f_end")
+        assert sorted(order) == ["f_end", "f_mid", "f_root", "f_side"]
+        assert manager.validate_dag()["is_valid"] is True
+
+        # A cycle written straight into the file is reported with its path.
+        dag = manager._load_dag()
+        dag.edges.append(ForeshadowingEdge(from_="f_end", to="f_root", type="依赖"))
+        manager._save_dag(dag)
+        errors = manager.validate_dag()["errors"]
+        assert errors == ["伏笔依赖存在循环: f_end -> f_root -> f_mid -> f_end"]
+        assert manager.topological_order() == ["f_side"]
+
+        env = os.environ.copy()
+        env["PYTHONPATH"] = str(REPO_ROOT)
+        result = subprocess.run(
+            ["python3", "-m", "tools.cli", "foreshadowing", "list", "--topo", "--novel-id", "my_novel"],
+            cwd=str(project_dir),
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        assert result.returncode == 0
+        assert "f_side" in result.stdout and "f_root" in result.stdout
+
+
 def test_character_state_manager():
     from character_state_manager import CharacterStateManager
 
@@ -155,6 +757,541 @@ def test_character_state_manager():
         assert timeline[-1].note == "与旧友在茶馆交换情报"
 
 
+def test_character_state_checkpoints():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = CharacterStateManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        manager.CHECKPOINT_INTERVAL = 2
+        manager.create_character("李逍遥", tier="主角")
+        for chapter_no in range(1, 7):
+            manager.apply_mutation(
+                name="李逍遥",
+                chapter_id=f"ch_{chapter_no:03d}",
+                mutation_expr=f"move:地点{chapter_no}",
+            )
+
+        # Checkpoints are written by the mutations themselves, not by reads.
+        checkpoint_file = manager._checkpoint_path("char_001")
+        checkpoints = json.loads(checkpoint_file.read_text(encoding="utf-8"))
+        positions = [item["position"] for item in checkpoints["checkpoints"]]
+        assert positions == [2, 4, 6]
+        checkpoint_file.unlink()
+        assert manager.rebuild_state(name="李逍遥").location == "地点6"
+        assert manager.rebuild_state(name="李逍遥", until_chapter="ch_005").location == "地点5"
+        assert not checkpoint_file.exists()
+        assert manager.refresh_checkpoints() == {"char_001": 3}
+
+        # Inserting an earlier mutation recomputes checkpoints after the insert point.
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_002", mutation_expr="acquire:玉佩")
+        checkpoints = json.loads(checkpoint_file.read_text(encoding="utf-8"))["checkpoints"]
+        assert [item["position"] for item in checkpoints] == [2, 4, 6]
+        assert "玉佩" in checkpoints[1]["summary"]["items"]
+        rebuilt = manager.rebuild_state(name="李逍遥", until_chapter="ch_003")
+        assert rebuilt.location == "地点3"
+        assert "玉佩" in rebuilt.items
+        assert "玉佩" not in manager.rebuild_state(name="李逍遥", until_chapter="ch_001").items
+
+
+def test_character_log_jsonl_migration():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = CharacterStateManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        legacy_log = manager.logs_dir / "char_001.yaml"
+        legacy_log.write_text(
+            yaml.safe_dump(
+                {
+                    "mutations": [
+                        {
+                            "mutation_id": "char_001_0002",
+                            "chapter_id": "ch_010",
+                            "action": "move",
+                            "payload": {"raw": "青云镇"},
+                        },
+                        {
+                            "mutation_id": "char_001_0001",
+                            "chapter_id": "ch_002",
+                            "action": "acquire",
+                            "payload": {"raw": "神秘玉佩"},
+                        },
+                    ]
+                },
+                allow_unicode=True,
+            ),
+            encoding="utf-8",
+        )
+
+        assert manager.migrate_legacy_logs() == ["char_001"]
+        assert not legacy_log.exists()
+        assert (manager.logs_dir / "char_001.jsonl").exists()
+        assert [item.chapter_id for item in manager.get_timeline(name="李逍遥")] == [
+            "ch_002",
+            "ch_010",
+        ]
+
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_005", mutation_expr="realm:炼气")
+        timeline = manager.get_timeline(name="李逍遥")
+        assert [item.chapter_id for item in timeline] == ["ch_002", "ch_005", "ch_010"]
+        assert timeline[1].mutation_id == "char_001_0003"
+        log_lines = (manager.logs_dir / "char_001.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(log_lines) == 3
+        assert '"ch_005"' in log_lines[-1]
+
+        # A stale sidecar index is rebuilt from the log.
+        (manager.logs_dir / "char_001.idx.jsonl").unlink()
+        rebuilt = manager.rebuild_state(name="李逍遥", until_chapter="ch_005")
+        assert rebuilt.realm == "炼气"
+        assert "神秘玉佩" in rebuilt.items
+        assert rebuilt.location == "未知"
+
+        # In-order appends only read the index header and last line, and
+        # append entries that a full parse agrees with.
+        order = manager.chapter_registry.snapshot()
+        for chapter_no in range(11, 14):
+            manager.apply_mutation(name="李逍遥", chapter_id=f"ch_{chapter_no:03d}", note="赶路")
+        tail = manager._read_log_tail("char_001", order)
+        assert tail.entries is None and tail.count == 6
+        assert tail.last == manager._load_log_index("char_001", order)[-1]
+        assert manager._load_log_index("char_001", order) == manager._rebuild_log_index(
+            "char_001", order, False
+        )
+        assert manager.apply_mutation(name="李逍遥", chapter_id="ch_014", note="到达").mutation_id == (
+            "char_001_0007"
+        )
+
+
+def test_character_batch_mutations():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = CharacterStateManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.create_character("赵灵儿", tier="重要配角")
+
+        mutations = manager.apply_mutations(
+            [
+                {"name": "李逍遥", "chapter": "ch_003", "change": "acquire:回气丹"},
+                {"name": "赵灵儿", "chapter": "ch_003", "change": "move:仙灵岛"},
+                {"name": "李逍遥", "chapter": "ch_003", "change": "use:回气丹"},
+                {"id": "char_001", "chapter": "ch_003", "note": "服药疗伤"},
+            ]
+        )
+        assert [(final_id, item.mutation_id) for final_id, item in mutations] == [
+            ("char_001", "char_001_0001"),
+            ("char_002", "char_002_0001"),
+            ("char_001", "char_001_0002"),
+            ("char_001", "char_001_0003"),
+        ]
+        assert manager.get_character_card(name="李逍遥").summary.items == []
+        assert manager.get_character_card(name="赵灵儿").summary.location == "仙灵岛"
+        assert len(manager.get_timeline(name="李逍遥")) == 3
+
+        # A failing change aborts the whole batch before anything is written.
+        try:
+            manager.apply_mutations(
+                [
+                    {"name": "赵灵儿", "chapter": "ch_004", "change": "move:余杭镇"},
+                    {"name": "李逍遥", "chapter": "ch_004", "change": "use:回气丹"},
+                ]
+            )
+        except ValueError as exc:
+            assert "第 2 条变更" in str(exc)
+        else:
+            raise AssertionError("expected batch validation failure")
+        assert manager.get_character_card(name="赵灵儿").summary.location == "仙灵岛"
+        assert len(manager.get_timeline(name="赵灵儿")) == 1
+
+
+def test_character_rebuild_all():
+    from character_state_manager import CharacterStateManager
+    from queries.character_query import CharacterQuery
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.create_character("赵灵儿", tier="重要配角")
+        manager.create_character("林月如", tier="重要配角")
+        manager.apply_mutations(
+            [
+                {"name": "李逍遥", "chapter": "ch_001", "change": "move:余杭镇"},
+                {"name": "赵灵儿", "chapter": "ch_002", "change": "move:仙灵岛"},
+                {"name": "李逍遥", "chapter": "ch_002", "change": "move:仙灵岛"},
+                {"name": "李逍遥", "chapter": "ch_005", "change": "move:苏州"},
+                {"name": "赵灵儿", "chapter": "ch_005", "change": "acquire:天蛇杖"},
+            ]
+        )
+
+        states = manager.rebuild_all(until_chapter="ch_002")
+        assert set(states) == {"char_001", "char_002", "char_003"}
+        assert states["char_001"].location == "仙灵岛"
+        assert states["char_002"].items == []
+        assert states["char_003"].location == "未知"
+        for character_id in ("char_001", "char_002"):
+            expected = manager.rebuild_state(character_id=character_id, until_chapter="ch_002")
+            assert states[character_id] == expected
+
+        latest = manager.rebuild_all(character_ids=["char_002", "char_404"])
+        assert list(latest) == ["char_002"]
+        assert "天蛇杖" in latest["char_002"].items
+
+        rows = CharacterQuery(project_dir=project_dir).get_cast_state_at("ch_005")
+        assert [row["name"] for row in rows] == ["李逍遥", "赵灵儿", "林月如"]
+        assert rows[0]["state"]["location"] == "苏州"
+
+
+def test_character_snapshot_all():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.create_character("赵灵儿", tier="重要配角")
+        manager.apply_mutations(
+            [
+                {"name": "李逍遥", "chapter": "ch_001", "change": "move:余杭镇"},
+                {"name": "赵灵儿", "chapter": "ch_002", "change": "acquire:天蛇杖"},
+                {"name": "李逍遥", "chapter": "ch_003", "change": "move:苏州"},
+            ]
+        )
+
+        paths = manager.create_snapshots(volume_id="vol_001", until_chapter="ch_002")
+        assert [path.name for path in paths] == ["char_001_vol_001.md", "char_002_vol_001.md"]
+        assert "余杭镇" in paths[0].read_text(encoding="utf-8")
+        assert "天蛇杖" in paths[1].read_text(encoding="utf-8")
+        for character_id, path in zip(("char_001", "char_002"), paths):
+            card = manager.get_character_card(character_id=character_id)
+            assert card.current_snapshot == path.name
+
+        single = manager.create_snapshot(name="李逍遥", volume_id="vol_001", until_chapter="ch_002")
+        assert single == paths[0]
+        assert "苏州" not in single.read_text(encoding="utf-8")
+
+        # A free-form range is only a label; outline ids also set the cutoff.
+        manager.create_snapshot(name="李逍遥", volume_id="vol_001", chapter_range="1-2")
+        assert "苏州" in single.read_text(encoding="utf-8")
+        chapters_dir = project_dir / "data" / "novels" / "my_novel" / "outline" / "chapters"
+        chapters_dir.mkdir(parents=True, exist_ok=True)
+        for chapter_no in range(1, 4):
+            (chapters_dir / f"ch_{chapter_no:03d}.md").write_text("# 章节\n", encoding="utf-8")
+        manager.create_snapshot(name="李逍遥", volume_id="vol_001", chapter_range="ch_001-ch_002")
+        assert "苏州" not in single.read_text(encoding="utf-8")
+
+
+def test_character_timeline_compaction():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.apply_mutations(
+            [
+                {"name": "李逍遥", "chapter": "ch_001", "change": "move:余杭镇"},
+                {"name": "李逍遥", "chapter": "ch_002", "change": "acquire:回气丹"},
+                {"name": "李逍遥", "chapter": "ch_003", "change": "move:苏州"},
+                {"name": "李逍遥", "chapter": "ch_004", "note": "比武招亲"},
+            ]
+        )
+        before = manager.rebuild_state(name="李逍遥")
+
+        assert manager.compact_timeline("ch_003") == {"char_001": 2}
+        assert manager.compact_timeline("ch_003") == {}
+        assert manager.rebuild_state(name="李逍遥") == before
+        assert manager.rebuild_all()["char_001"] == before
+        assert [item.chapter_id for item in manager.get_timeline(name="李逍遥")] == [
+            "ch_003",
+            "ch_004",
+        ]
+        assert manager._archive_path("char_001").exists()
+
+        # States before the baseline and the full history come from the archive.
+        early = manager.rebuild_state(name="李逍遥", until_chapter="ch_001")
+        assert early.location == "余杭镇" and early.items == []
+        full = manager.get_timeline(name="李逍遥", include_archived=True)
+        assert [item.mutation_id for item in full] == [
+            "char_001_0001",
+            "char_001_0002",
+            "char_001_0003",
+            "char_001_0004",
+        ]
+
+        # Numbering continues past archived mutations.
+        mutation = manager.apply_mutation(
+            name="李逍遥", chapter_id="ch_005", mutation_expr="move:仙灵岛"
+        )
+        assert mutation.mutation_id == "char_001_0005"
+        assert manager.rebuild_state(name="李逍遥").location == "仙灵岛"
+        assert manager.rebuild_chapter_index() == 5
+
+        # Archived history is sealed: a backdated write before the baseline is
+        # rejected instead of being replayed on top of it.
+        try:
+            manager.apply_mutation(name="李逍遥", chapter_id="ch_001", mutation_expr="move:回溯")
+        except ValueError as exc:
+            assert "已压缩到 ch_003" in str(exc)
+        else:
+            raise AssertionError("backdated write before the baseline should be rejected")
+        assert manager.rebuild_state(name="李逍遥").location == "仙灵岛"
+        assert manager.rebuild_state(name="李逍遥", until_chapter="ch_004").location == "苏州"
+        assert manager.rebuild_chapter_index() == 5
+
+
+def test_character_inventory_counts():
+    from character_state_manager import CharacterStateManager
+    from models.character import CharacterSummary
+
+    legacy = CharacterSummary.model_validate({"items": ["回气丹 x3", "神秘玉佩", "回气丹"]})
+    assert legacy.inventory == {"回气丹": 4, "神秘玉佩": 1}
+    assert legacy.items == ["回气丹 x4", "神秘玉佩"]
+    dumped = legacy.model_dump()
+    assert dumped["items"] == ["回气丹 x4", "神秘玉佩"]
+    assert CharacterSummary.model_validate(dumped) == legacy
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_001", mutation_expr="acquire:回气丹 x3")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_002", mutation_expr="use:回气丹")
+        card = manager.get_character_card(name="李逍遥")
+        assert card.summary.inventory == {"回气丹": 2}
+        assert manager.rebuild_state(name="李逍遥").items == ["回气丹 x2"]
+        try:
+            manager.apply_mutation(name="李逍遥", chapter_id="ch_003", mutation_expr="use:回气丹 x5")
+        except ValueError as exc:
+            assert "物品不足" in str(exc)
+        else:
+            raise AssertionError("use beyond the stack should fail")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_003", mutation_expr="use:回气丹 x2")
+        assert manager.get_character_card(name="李逍遥").summary.inventory == {}
+
+        # Cards written with the legacy string list load into the counted inventory.
+        card_path = manager._card_path("char_001")
+        raw = yaml.safe_load(card_path.read_text(encoding="utf-8"))
+        raw["summary"].pop("inventory", None)
+        raw["summary"]["items"] = ["天蛇杖", "回气丹 x2"]
+        card_path.write_text(yaml.safe_dump(raw, allow_unicode=True), encoding="utf-8")
+        migrated = manager.get_character_card(name="李逍遥")
+        assert migrated.summary.inventory == {"天蛇杖": 1, "回气丹": 2}
+
+
+def test_character_state_diff():
+    from character_state_manager import CharacterStateManager
+    from queries.character_query import CharacterQuery
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.apply_mutations(
+            [
+                {"name": "李逍遥", "chapter": "ch_040", "change": "acquire:回气丹 x3"},
+                {"name": "李逍遥", "chapter": "ch_040", "change": "flag:中毒"},
+                {"name": "李逍遥", "chapter": "ch_060", "change": "use:回气丹 x2"},
+                {"name": "李逍遥", "chapter": "ch_070", "change": "realm:筑基"},
+                {"name": "李逍遥", "chapter": "ch_080", "change": "move:苏州"},
+                {"name": "李逍遥", "chapter": "ch_085", "change": "acquire:天蛇杖"},
+                {"name": "李逍遥", "chapter": "ch_100", "change": "move:仙灵岛"},
+            ]
+        )
+
+        query = CharacterQuery(project_dir=project_dir)
+        delta = query.diff("李逍遥", "ch_040", "ch_090")
+        assert delta["changed"]
+        assert delta["realm"] == {"from": "凡人", "to": "筑基"}
+        assert delta["location"] == {"from": "未知", "to": "苏州"}
+        assert delta["statuses"] == {"added": [], "removed": []}
+        assert delta["items"] == {"gained": {"天蛇杖": 1}, "lost": {"回气丹": 2}}
+
+        before, after = manager.rebuild_window(
+            name="李逍遥", from_chapter="ch_040", to_chapter="ch_090"
+        )
+        assert after == manager.rebuild_state(name="李逍遥", until_chapter="ch_090")
+        assert not query.diff("李逍遥", "ch_090", "ch_095")["changed"]
+        try:
+            query.diff("李逍遥", "ch_090", "ch_040")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("reversed window should be rejected")
+
+
+def test_character_name_alias_index():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角", aliases=["逍遥哥哥"])
+        card = manager.create_character("赵灵儿", tier="重要配角")
+        assert card.static.id == "char_002"
+
+        assert manager.get_character_card(name="逍遥哥哥").static.id == "char_001"
+        for duplicate in ("李逍遥", "逍遥哥哥"):
+            try:
+                manager.create_character(duplicate)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"duplicate not detected: {duplicate}")
+
+        card.static.aliases.append("灵儿")
+        manager.save_character_card(card)
+        index_data = yaml.safe_load(manager.index_file.read_text(encoding="utf-8"))
+        assert index_data["characters"][1]["aliases"] == ["灵儿"]
+        assert manager.resolve_character_id("灵儿") == "char_002"
+
+        # A second manager (or an external edit) sees index changes via mtime.
+        other = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        index_data["characters"][0]["aliases"].append("李大侠")
+        manager.index_file.write_text(
+            yaml.safe_dump(index_data, allow_unicode=True), encoding="utf-8"
+        )
+        assert other.resolve_character_id("李大侠") == "char_001"
+
+
+def test_character_pure_reads_and_scaffold():
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = CharacterStateManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        card = manager.create_character("李逍遥", tier="主角")
+        profile_file = manager.get_profile_path(card=card)
+        profile_file.unlink()
+
+        assert manager.get_character_card(name="李逍遥").static.id == "char_001"
+        assert manager.get_profile_excerpt(name="李逍遥") == ""
+        assert not profile_file.exists()
+
+        assert manager.scaffold_profiles() == [profile_file]
+        assert profile_file.exists()
+        assert manager.scaffold_profiles(name="李逍遥") == []
+
+
+def test_profile_panel_parser():
+    from agents.lore_checker import LoreCheckerAgent
+    from character_state_manager import CharacterStateManager
+    from parsers.profile_parser import parse_profile
+
+    panel = parse_profile(
+        "# 韩策\n【姓名：韩策】  【境界：归元后期】\n【状态：轻伤】\n【状态：盟印回响】\n【武器：】\n"
+    )
+    assert panel.first("境界") == "归元后期"
+    assert panel.fields["状态"] == ["轻伤", "盟印回响"]
+    assert "武器" not in panel.fields
+    assert panel.excerpt(12) == "【姓名：韩策】  【境界"
+    assert parse_profile("# 标题\n\n- 普通 *文本*\n").excerpt() == "标题 普通 文本"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        manager = CharacterStateManager(project_dir=Path(tmpdir), novel_id="my_novel")
+        card = manager.create_character("韩策", tier="主角")
+        profile_file = manager.get_profile_path(card=card)
+        profile_file.write_text("【关键道具：残损盟印、回气丹 x2】\n", encoding="utf-8")
+        panel = manager.get_profile_panel(name="韩策")
+        assert panel is manager.get_profile_panel(card=card)
+        profile_file.write_text("【境界：凝丹初期】【关键道具：残损盟印、回气丹 x2】\n", encoding="utf-8")
+        assert manager.get_profile_panel(card=card).first("境界") == "凝丹初期"
+
+        annotations = {
+            "characters": [
+                {"attributes": {"id": "char_001", "mutation": "use:回气丹"}},
+                {"attributes": {"id": "char_001", "mutation": "use:雨城旧档案"}},
+            ]
+        }
+        result = LoreCheckerAgent().check_draft(
+            draft="",
+            forbidden=[],
+            required=[],
+            chapter_annotations=annotations,
+            character_state_manager=manager,
+            strict=True,
+        )
+        assert len(result.errors) == 1
+        assert "雨城旧档案" in result.errors[0]
+
+
+def test_character_chapter_change_index():
+    from character_state_manager import CharacterStateManager
+    from queries.character_query import CharacterQuery
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.create_character("赵灵儿", tier="重要配角")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_056", mutation_expr="move:余杭镇")
+        manager.apply_mutations(
+            [
+                {"name": "李逍遥", "chapter": "ch_057", "change": "acquire:回气丹"},
+                {"name": "赵灵儿", "chapter": "ch_057", "note": "初遇"},
+                {"name": "赵灵儿", "chapter": "ch_058", "change": "move:仙灵岛"},
+            ]
+        )
+
+        changes = manager.get_chapter_changes("ch_057")
+        assert [(cid, item.mutation_id) for cid, item in changes] == [
+            ("char_001", "char_001_0002"),
+            ("char_002", "char_002_0001"),
+        ]
+        assert manager.get_chapter_changes("ch_999") == []
+
+        manager.chapter_changes_dir.joinpath("ch_057.jsonl").unlink()
+        assert manager.rebuild_chapter_index() == 4
+        rows = CharacterQuery(project_dir=project_dir).get_chapter_changes("ch_057")
+        assert [row["name"] for row in rows] == ["李逍遥", "赵灵儿"]
+        assert rows[1]["note"] == "初遇"
+
+
+def test_chapter_registry_ordering():
+    from chapter_registry import ChapterRegistry
+    from character_state_manager import CharacterStateManager
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project_dir = Path(tmpdir)
+        outline_dir = project_dir / "data" / "novels" / "my_novel" / "outline"
+        (outline_dir / "chapters").mkdir(parents=True)
+        (outline_dir / "volumes").mkdir(parents=True)
+        for chapter_id in ("ch_001", "ch_002", "ch_010", "ch_011"):
+            (outline_dir / "chapters" / f"{chapter_id}.md").write_text(
+                f"# {chapter_id}\n", encoding="utf-8"
+            )
+        volume_file = outline_dir / "volumes" / "vol_001.md"
+        volume_file.write_text("# 第一卷\n\n章节: ch_001 - ch_010\n", encoding="utf-8")
+
+        registry = ChapterRegistry(project_dir, "my_novel")
+        assert registry.chapters() == ["vol_001", "ch_001", "ch_002", "ch_010", "ch_011"]
+        order = registry.ordinal
+        assert order("ch_002") < order("ch_009") < order("ch_010")
+        assert order("ch_010") < order("ch_010a") < order("ch_011")
+        assert order("ch_011") < order("vol_002")
+
+        manager = CharacterStateManager(project_dir=project_dir, novel_id="my_novel")
+        manager.create_character("李逍遥", tier="主角")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_002", mutation_expr="move:余杭镇")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_010", mutation_expr="move:仙灵岛")
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_010a", mutation_expr="acquire:回气丹")
+        assert manager.rebuild_state(name="李逍遥", until_chapter="ch_010").items == []
+        assert manager.rebuild_state(name="李逍遥").location == "仙灵岛"
+
+        # A flashback volume puts ch_010 before ch_002; reads re-key the index
+        # in memory only, and the next write stores it.
+        volume_file.write_text("# 第一卷（倒叙）\n\n- ch_010\n- ch_002\n", encoding="utf-8")
+        index_path = manager._log_index_path("char_001")
+        before = index_path.read_bytes()
+        assert manager.rebuild_state(name="李逍遥").location == "余杭镇"
+        assert manager.rebuild_all()["char_001"].location == "余杭镇"
+        assert index_path.read_bytes() == before
+        manager.apply_mutation(name="李逍遥", chapter_id="ch_011", note="离岛")
+        index_lines = index_path.read_text(encoding="utf-8").splitlines()
+        header, entries = json.loads(index_lines[0]), [json.loads(line) for line in index_lines[1:]]
+        assert header["registry"] == registry.version
+        assert [entry[1] for entry in entries] == ["ch_010", "ch_010a", "ch_002", "ch_011"]
+
+
 def test_cli_help():
     result = subprocess.run(
         ["python3", "-m", "tools.cli", "--help"],
@@ -330,6 +1467,17 @@ def test_agent_simulator():
         assert len(report["chapter_annotations"]["scenes"]) == 1
         assert report["lore_checker"]["attempts"][0]["passed"] is True
 
+        rebuild_calls = []
+        original_rebuild = simulator.manager.rebuild_all
+        simulator.manager.rebuild_all = lambda *args, **kwargs: rebuild_calls.append(
+            kwargs
+        ) or original_rebuild(*args, **kwargs)
+        annotations = {"characters": [{"attributes": {"id": "char_001"}}]}
+        context = simulator._build_context("ch_001", "推进主线", annotations)
+        assert len(rebuild_calls) == 1
+        assert "九阴凝幽气" in context["characters"]
+        del simulator.manager.rebuild_all
+
         rewrite_result = simulator.simulate_chapter(
             chapter_id="ch_001",
             objective="推进主线",
@@ -353,7 +1501,32 @@ def run_all_tests() -> bool:
     test_foreshadowing_dag()
     test_foreshadowing_checker()
     test_world_graph_manager()
+    test_world_graph_adjacency()
+    test_world_graph_session()
+    test_world_table_import_export()
+    test_world_incremental_conflicts()
+    test_world_cycle_components()
+    test_world_realm_ranks()
+    test_world_neighborhood()
+    test_world_centrality_summary()
+    test_world_temporal_relations()
+    test_world_entity_search()
+    test_graph_streaming_export()
+    test_foreshadowing_cycles_and_topo()
     test_character_state_manager()
+    test_character_state_checkpoints()
+    test_character_log_jsonl_migration()
+    test_character_batch_mutations()
+    test_character_rebuild_all()
+    test_character_snapshot_all()
+    test_character_timeline_compaction()
+    test_character_inventory_counts()
+    test_character_state_diff()
+    test_character_name_alias_index()
+    test_character_pure_reads_and_scaffold()
+    test_profile_panel_parser()
+    test_character_chapter_change_index()
+    test_chapter_registry_ordering()
     test_cli_help()
     test_lore_checker_structured_rules()
     test_agent_simulator()
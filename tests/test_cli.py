@@ -151,6 +151,20 @@ def test_character_commands():
         )
         assert snapshot_file.exists()
 
+        batch_file = project_dir / "changes.yaml"
+        batch_file.write_text(
+            "changes:\n"
+            "  - {name: 李逍遥, chapter: ch_002, change: \"acquire:回气丹\"}\n"
+            "  - {name: 李逍遥, chapter: ch_002, change: \"move:青云镇\"}\n",
+            encoding="utf-8",
+        )
+        batch_result = run_cli(
+            ["character", "mutate-batch", "--file", str(batch_file), "--novel-id", "test_novel"],
+            project_dir,
+        )
+        assert batch_result.returncode == 0
+        assert "已记录 2 条时间线" in batch_result.stdout
+
 
 def test_simulate_chapter_command():
     with tempfile.TemporaryDirectory() as tmpdir:
@@ -1,7 +1,13 @@
 """Lore checker for timeline/world consistency checks."""
 
+import re
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from tools.models.character import split_item_count
+except ImportError:  # pragma: no cover - supports legacy path injection
+    from models.character import split_item_count
 
 
 @dataclass
@@ -20,6 +26,8 @@ class LoreCheckerAgent:
     """Performs lightweight rule checks on generated draft text."""
 
     SUPPORTED_MUTATIONS = {"acquire", "use", "move", "health", "realm", "flag"}
+    # Profile panel fields that list what a character carries.
+    PROFILE_ITEM_FIELDS = ("物品", "关键道具", "法宝", "装备", "武器")
 
     def __init__(self, strict: bool = False):
         self.strict = strict
@@ -56,6 +64,7 @@ class LoreCheckerAgent:
         chapter_annotations: Optional[Dict[str, List[Dict[str, Any]]]] = None,
         character_state_manager: Optional[Any] = None,
         strict: Optional[bool] = None,
+        chapter_id: Optional[str] = None,
     ) -> LoreCheckResult:
         errors: List[str] = []
         warnings: List[str] = []
@@ -83,6 +92,7 @@ class LoreCheckerAgent:
                     errors,
                     warnings,
                     strict=final_strict,
+                    chapter_id=chapter_id,
                 )
 
         return LoreCheckResult(errors=errors, warnings=warnings)
@@ -140,8 +150,11 @@ class LoreCheckerAgent:
         errors: List[str],
         warnings: List[str],
         strict: bool,
+        chapter_id: Optional[str] = None,
     ) -> None:
         characters = chapter_annotations.get("characters", [])
+        realm_checks: List[Tuple[Any, str]] = []
+        use_checks: List[Tuple[Any, str]] = []
         for annotation in characters:
             attrs = annotation.get("attributes", {})
             mutation = str(attrs.get("mutation", "")).strip()
@@ -184,12 +197,57 @@ class LoreCheckerAgent:
                 continue
 
             if action == "use":
-                rebuilt = character_state_manager.rebuild_state(character_id=character_id)
-                normalized = {item.split(" x", 1)[0].strip() for item in rebuilt.items}
-                if payload not in normalized:
-                    self._append_issue(
-                        f"人物 {card.static.name} 尝试使用不存在/不足物品: {payload}",
-                        errors,
-                        warnings,
-                        strict,
-                    )
+                use_checks.append((card, payload))
+            elif action == "realm" and hasattr(character_state_manager, "realm_change"):
+                realm_checks.append((card, payload))
+
+        if not use_checks and not realm_checks:
+            return
+        # Rebuild every referenced character in one pass instead of one replay per
+        # mark; with a chapter id, later chapters' mutations are not counted.
+        checked_ids = [card.static.id for card, _ in use_checks + realm_checks]
+        rebuilt_by_id = character_state_manager.rebuild_all(
+            until_chapter=chapter_id,
+            character_ids=list(dict.fromkeys(checked_ids)),
+        )
+        for card, payload in use_checks:
+            rebuilt = rebuilt_by_id.get(card.static.id)
+            item_name, count = split_item_count(payload)
+            if rebuilt is not None and rebuilt.item_count(item_name) >= count:
+                continue
+            if item_name in self._profile_items(character_state_manager, card):
+                continue
+            self._append_issue(
+                f"人物 {card.static.name} 尝试使用不存在/不足物品: {payload}",
+                errors,
+                warnings,
+                strict,
+            )
+        for card, payload in realm_checks:
+            rebuilt = rebuilt_by_id.get(card.static.id)
+            current = rebuilt.realm if rebuilt is not None else card.summary.realm
+            change = character_state_manager.realm_change(current, payload)
+            # Regressions can be intentional (injuries, sealed cultivation): warn only.
+            if change == "regression":
+                warnings.append(f"人物 {card.static.name} 境界倒退: {current} -> {payload}")
+            elif change == "unranked":
+                warnings.append(f"人物 {card.static.name} 的境界未在 above 层级中定义: {payload}")
+            elif change == "unordered":
+                warnings.append(
+                    f"人物 {card.static.name} 的境界不在同一 above 层级分支: {current} -> {payload}"
+                )
+
+    def _profile_items(self, character_state_manager: Any, card: Any) -> Set[str]:
+        """Items the author listed in the profile panel (text-first source of truth)."""
+        if not hasattr(character_state_manager, "get_profile_panel"):
+            return set()
+        panel = character_state_manager.get_profile_panel(card=card)
+        if panel is None:
+            return set()
+        items: Set[str] = set()
+        for value in panel.values(*self.PROFILE_ITEM_FIELDS):
+            for part in re.split(r"[、,，;；/\s]+", value):
+                part = split_item_count(part)[0]
+                if part:
+                    items.add(part)
+        return items
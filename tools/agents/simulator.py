@@ -5,7 +5,7 @@ from __future__ import annotations
 from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
@@ -16,6 +16,7 @@ try:
     from tools.agents.stylist import StylistAgent
     from tools.character_state_manager import CharacterStateManager
     from tools.graph.foreshadowing_dag import ForeshadowingDAGManager
+    from tools.models.character import CharacterCard, CharacterSummary
     from tools.queries.outline_query import OutlineQuery
     from tools.world_graph_manager import WorldGraphManager
 except ImportError:  # pragma: no cover - supports legacy path injection
@@ -25,6 +26,7 @@ except ImportError:  # pragma: no cover - supports legacy path injection
     from agents.stylist import StylistAgent
     from character_state_manager import CharacterStateManager
     from graph.foreshadowing_dag import ForeshadowingDAGManager
+    from models.character import CharacterCard, CharacterSummary
     from queries.outline_query import OutlineQuery
     from world_graph_manager import WorldGraphManager
 
@@ -143,28 +145,106 @@ class AgentSimulator:
 
         return "暂无待回收伏笔"
 
-    def _characters_context(self, limit: int = 5) -> str:
+    def _character_states(
+        self, character_ids: List[str]
+    ) -> Tuple[Dict[str, CharacterCard], Dict[str, CharacterSummary]]:
+        """Cards and current summaries, reading each card once."""
+        cards: Dict[str, CharacterCard] = {}
+        for character_id in dict.fromkeys(character_ids):
+            try:
+                cards[character_id] = self.manager.get_character_card(character_id=character_id)
+            except FileNotFoundError:
+                continue
+        return cards, self.manager.rebuild_all(cards=list(cards.values()))
+
+    def _characters_context(
+        self,
+        limit: int = 5,
+        states: Optional[Tuple[Dict[str, CharacterCard], Dict[str, CharacterSummary]]] = None,
+    ) -> str:
         entries = self.manager.list_characters()
         if not entries:
             return "暂无人物档案"
 
+        selected = entries[:limit]
+        if states is None:
+            states = self._character_states([item["id"] for item in selected])
+        cards, summaries = states
         lines: List[str] = []
-        for item in entries[:limit]:
-            card = self.manager.get_character_card(character_id=item["id"])
-            summary = self.manager.rebuild_state(character_id=item["id"])
-            inventory_count = len(summary.items)
+        for item in selected:
+            summary = summaries.get(item["id"])
+            if summary is None:
+                continue
+            inventory_count = sum(summary.inventory.values())
             profile_excerpt = self.manager.get_profile_excerpt(
-                character_id=item["id"], max_chars=80
+                card=cards[item["id"]], max_chars=80
             )
             profile_part = f", 设定={profile_excerpt}" if profile_excerpt else ""
             lines.append(
-                f"{card.static.name}(境界={summary.realm}, 位置={summary.location}, "
+                f"{item.get('name', item['id'])}(境界={summary.realm}, 位置={summary.location}, "
                 f"物品数={inventory_count}{profile_part})"
             )
         return "; ".join(lines)
 
-    def _world_context(self) -> str:
-        return self.world_manager.summary(max_entities=6, max_relations=8)
+    @staticmethod
+    def _annotated_characters(chapter_annotations: Dict[str, List[Dict[str, str]]]) -> List[str]:
+        character_ids: List[str] = []
+        for annotation in chapter_annotations.get("characters", []):
+            attrs = annotation.get("attributes", {})
+            character_id = str(attrs.get("id") or attrs.get("ref") or "").strip()
+            if character_id:
+                character_ids.append(character_id)
+        return list(dict.fromkeys(character_ids))
+
+    def _world_seeds(
+        self,
+        chapter_annotations: Dict[str, List[Dict[str, str]]],
+        summaries: Optional[Dict[str, CharacterSummary]] = None,
+    ) -> List[str]:
+        """Scene locations, annotated characters and where those characters are.
+
+        ``summaries`` reuses states already rebuilt for the chapter context.
+        """
+        seeds: List[str] = []
+        for scene in chapter_annotations.get("scenes", []):
+            location = str(scene.get("attributes", {}).get("location", "")).strip()
+            if location:
+                seeds.append(location)
+        character_ids = self._annotated_characters(chapter_annotations)
+        if character_ids:
+            if summaries is None:
+                summaries = self.manager.rebuild_all(character_ids=character_ids)
+            for character_id in character_ids:
+                seeds.append(character_id)
+                summary = summaries.get(character_id)
+                if summary is not None and summary.location:
+                    seeds.append(summary.location)
+        return list(dict.fromkeys(seeds))
+
+    def _world_context(
+        self,
+        chapter_annotations: Optional[Dict[str, List[Dict[str, str]]]] = None,
+        chapter_id: str = "",
+        hops: int = 2,
+        max_entities: int = 12,
+        max_relations: int = 12,
+        summaries: Optional[Dict[str, CharacterSummary]] = None,
+    ) -> str:
+        seeds = self._world_seeds(chapter_annotations or {}, summaries)
+        local = self.world_manager.neighborhood(
+            seeds, hops=hops, max_nodes=max_entities, at=chapter_id
+        )
+        if not local["entities"]:
+            return self.world_manager.summary(max_entities=6, max_relations=8)
+
+        names = {entity.id: entity.name for entity in local["entities"]}
+        entity_part = ", ".join(f"{entity.name}<{entity.type}>" for entity in local["entities"])
+        relations = sorted(local["relations"], key=lambda item: (item.weight * -1, item.relation))
+        relation_part = "; ".join(
+            f"{names[rel.source_id]}-{rel.relation}->{names[rel.target_id]}"
+            for rel in relations[:max_relations]
+        )
+        return f"实体: {entity_part}; 关系: {relation_part or '暂无'}"
 
     def _build_context(
         self,
@@ -173,10 +253,12 @@ class AgentSimulator:
         chapter_annotations: Dict[str, List[Dict[str, str]]],
     ) -> Dict[str, str]:
         outline_summary = self._outline_context(chapter_id)
-        character_summary = self._characters_context()
+        listed = [item["id"] for item in self.manager.list_characters()[:5]]
+        states = self._character_states(listed + self._annotated_characters(chapter_annotations))
+        character_summary = self._characters_context(states=states)
         foreshadowing_summary = self._pending_foreshadowing_context()
         scene_summary = self._scene_context(chapter_annotations)
-        world_summary = self._world_context()
+        world_summary = self._world_context(chapter_annotations, chapter_id, summaries=states[1])
         summary = (
             f"目标:{objective}; 章节:{chapter_id}; 大纲:{outline_summary}; "
             f"人物:{character_summary}; 待回收伏笔:{foreshadowing_summary}; "
@@ -231,6 +313,7 @@ class AgentSimulator:
                 chapter_annotations=chapter_annotations,
                 character_state_manager=self.manager,
                 strict=strict_lore,
+                chapter_id=chapter_id,
             )
             rewrite_logs.append(
                 {
@@ -0,0 +1,197 @@
+"""Chapter ordinal registry built from the outline.
+
+Every component that orders chapters (timeline logs, checkpoints, snapshots,
+foreshadowing targets, LoreChecker) compares the integers returned by
+``ChapterRegistry.ordinal`` instead of parsing ids on every comparison.
+Validating the cache stats the outline, so code that orders many ids takes
+one ``ChapterRegistry.snapshot()`` per operation and sorts with its
+``ordinal`` method, which is a plain dict lookup.
+
+Order comes from ``outline/volumes`` (volume order, then the chapters each
+volume lists or spans with a ``ch_a - ch_b`` range) and ``outline/chapters``
+(natural order for chapters no volume mentions). Ids absent from the outline
+are slotted after their natural-order predecessor, so ``ch_010a`` still lands
+between ``ch_010`` and ``ch_011``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# Gap between two outline chapters; ids missing from the outline take a slot
+# inside the gap that follows their natural-order predecessor.
+ORDINAL_STRIDE = 1 << 32
+
+CHAPTER_ID_PATTERN = re.compile(r"\bch_[0-9A-Za-z_]*[0-9A-Za-z]")
+RANGE_PATTERN = re.compile(
+    r"`?(ch_[0-9A-Za-z_]*[0-9A-Za-z])`?\s*(?:-|–|—|~|～|至|到)\s*`?(ch_[0-9A-Za-z_]*[0-9A-Za-z])`?"
+)
+
+
+def natural_key(chapter_id: str) -> Tuple[Tuple[int, object], ...]:
+    """Split ``ch_010a`` into comparable text/number parts."""
+    parts = re.split(r"(\d+)", chapter_id)
+    return tuple((1, int(part)) if part.isdigit() else (0, part) for part in parts if part)
+
+
+def _fallback_offset(chapter_id: str) -> int:
+    """Offset inside a gap, derived from the id's last number and suffix."""
+    match = re.search(r"(\d+)([A-Za-z]*)\D*$", chapter_id)
+    if not match:
+        return ORDINAL_STRIDE - 1
+    number = int(match.group(1))
+    suffix = match.group(2).lower()
+    suffix_rank = (ord(suffix[0]) - ord("a") + 1) if suffix else 0
+    return min(number * 64 + min(suffix_rank, 63) + 1, ORDINAL_STRIDE - 1)
+
+
+class ChapterOrder:
+    """Immutable ordinal table for one outline state."""
+
+    def __init__(self, sequence: List[str], volumes: Set[str]):
+        self.sequence = sequence
+        self.ordinals: Dict[str, int] = {
+            chapter_id: (position + 1) * ORDINAL_STRIDE
+            for position, chapter_id in enumerate(sequence)
+        }
+        # An unknown id sorts after its predecessor's block: a chapter is its
+        # own block, a volume's block runs until the next volume starts.
+        block_end: Dict[str, int] = dict(self.ordinals)
+        current_volume: Optional[str] = None
+        for chapter_id in sequence:
+            if chapter_id in volumes:
+                current_volume = chapter_id
+            elif current_volume is not None:
+                block_end[current_volume] = self.ordinals[chapter_id]
+        known = sorted(self.ordinals, key=natural_key)
+        self._natural_keys = [natural_key(chapter_id) for chapter_id in known]
+        self._natural_ordinals = [block_end[chapter_id] for chapter_id in known]
+        self._fallback: Dict[str, int] = {}
+        digest = hashlib.sha1("\n".join(sequence).encode("utf-8")).hexdigest()
+        self.version = digest[:16]
+
+    def ordinal(self, chapter_id: Optional[str]) -> int:
+        """Integer position of ``chapter_id`` in story order (0 for no id)."""
+        if not chapter_id:
+            return 0
+        known = self.ordinals.get(chapter_id)
+        if known is not None:
+            return known
+        cached = self._fallback.get(chapter_id)
+        if cached is not None:
+            return cached
+        index = bisect_right(self._natural_keys, natural_key(chapter_id))
+        base = self._natural_ordinals[index - 1] if index else 0
+        value = base + _fallback_offset(chapter_id)
+        self._fallback[chapter_id] = value
+        return value
+
+
+_REGISTRY_CACHE: Dict[Path, Tuple[Tuple, ChapterOrder]] = {}
+
+
+class ChapterRegistry:
+    """Chapter id -> ordinal mapping for one novel, cached on outline changes."""
+
+    def __init__(self, project_dir: Path, novel_id: str = "my_novel"):
+        self.outline_dir = project_dir / "data" / "novels" / novel_id / "outline"
+        self.volumes_dir = self.outline_dir / "volumes"
+        self.chapters_dir = self.outline_dir / "chapters"
+
+    def _signature(self) -> Tuple:
+        parts: List[Tuple[str, int, int]] = []
+        for path in (self.volumes_dir, self.chapters_dir):
+            if path.exists():
+                stat = path.stat()
+                parts.append((path.name, stat.st_mtime_ns, stat.st_size))
+        if self.volumes_dir.exists():
+            for volume_file in sorted(self.volumes_dir.glob("*.md")):
+                stat = volume_file.stat()
+                parts.append((volume_file.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(parts)
+
+    def snapshot(self) -> ChapterOrder:
+        """Ordinal table for the current outline, revalidated on each call."""
+        signature = self._signature()
+        cached = _REGISTRY_CACHE.get(self.outline_dir)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        sequence = self._build_sequence()
+        volumes: Set[str] = set()
+        if self.volumes_dir.exists():
+            volumes = {path.stem for path in self.volumes_dir.glob("*.md")}
+        data = ChapterOrder(sequence, volumes)
+        _REGISTRY_CACHE[self.outline_dir] = (signature, data)
+        return data
+
+    def _build_sequence(self) -> List[str]:
+        chapter_files: List[str] = []
+        if self.chapters_dir.exists():
+            chapter_files = sorted(
+                (path.stem for path in self.chapters_dir.glob("*.md")), key=natural_key
+            )
+        volume_files: List[Path] = []
+        if self.volumes_dir.exists():
+            volume_files = sorted(self.volumes_dir.glob("*.md"), key=lambda p: natural_key(p.stem))
+
+        sequence: List[str] = []
+        assigned: Set[str] = set()
+        for volume_file in volume_files:
+            sequence.append(volume_file.stem)
+            for chapter_id in self._volume_chapters(
+                volume_file.read_text(encoding="utf-8"), chapter_files
+            ):
+                if chapter_id not in assigned:
+                    assigned.add(chapter_id)
+                    sequence.append(chapter_id)
+
+        unassigned = [chapter_id for chapter_id in chapter_files if chapter_id not in assigned]
+        if not assigned:
+            sequence.extend(unassigned)
+            return sequence
+
+        # Slot chapters no volume mentions after their natural-order predecessor.
+        keys = {chapter_id: natural_key(chapter_id) for chapter_id in sequence}
+        for chapter_id in unassigned:
+            key = natural_key(chapter_id)
+            insert_at = 0
+            for position, existing in enumerate(sequence):
+                if existing in assigned and keys[existing] <= key:
+                    insert_at = position + 1
+            sequence.insert(insert_at, chapter_id)
+            keys[chapter_id] = key
+            assigned.add(chapter_id)
+        return sequence
+
+    @staticmethod
+    def _volume_chapters(text: str, chapter_files: List[str]) -> List[str]:
+        """Chapters of one volume: its ``ch_a - ch_b`` ranges, else every id it lists."""
+        chapters: List[str] = []
+        for match in RANGE_PATTERN.finditer(text):
+            low, high = natural_key(match.group(1)), natural_key(match.group(2))
+            candidates = sorted(
+                {match.group(1), match.group(2), *chapter_files}, key=natural_key
+            )
+            chapters.extend(
+                chapter_id for chapter_id in candidates if low <= natural_key(chapter_id) <= high
+            )
+        if not chapters:
+            chapters = [match.group(0) for match in CHAPTER_ID_PATTERN.finditer(text)]
+        return list(dict.fromkeys(chapters))
+
+    @property
+    def version(self) -> str:
+        """Stable hash of the outline order; changes only when ordering changes."""
+        return self.snapshot().version
+
+    def chapters(self) -> List[str]:
+        """Outline ids (volumes and chapters) in story order."""
+        return list(self.snapshot().sequence)
+
+    def ordinal(self, chapter_id: Optional[str]) -> int:
+        """Integer position of ``chapter_id`` in story order."""
+        return self.snapshot().ordinal(chapter_id)
@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import gzip
+import heapq
+import json
+import os
 import re
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 import yaml
 
@@ -17,7 +24,11 @@ try:
         CharacterState,
         CharacterStatic,
         StateMutation,
+        split_item_count,
     )
+    from tools.chapter_registry import RANGE_PATTERN, ChapterOrder, ChapterRegistry
+    from tools.parsers.profile_parser import ProfilePanel, load_profile_panel
+    from tools.world_graph_manager import WorldGraphManager
 except ImportError:  # pragma: no cover - supports legacy path injection
     from models.character import (
         CharacterCard,
@@ -25,12 +36,65 @@ except ImportError:  # pragma: no cover - supports legacy path injection
         CharacterState,
         CharacterStatic,
         StateMutation,
+        split_item_count,
     )
+    from chapter_registry import RANGE_PATTERN, ChapterOrder, ChapterRegistry
+    from parsers.profile_parser import ProfilePanel, load_profile_panel
+    from world_graph_manager import WorldGraphManager
+
+
+@dataclass
+class _CharacterLookup:
+    """Hash index over ``characters/index.yaml`` (ids, names and aliases)."""
+
+    signature: Tuple[int, int]
+    entries: List[Dict] = field(default_factory=list)
+    by_id: Dict[str, Dict] = field(default_factory=dict)
+    by_name: Dict[str, str] = field(default_factory=dict)
+    by_alias: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, signature: Tuple[int, int], entries: List[Dict]) -> "_CharacterLookup":
+        lookup = cls(signature=signature, entries=entries)
+        for entry in entries:
+            character_id = entry.get("id")
+            if not character_id:
+                continue
+            lookup.by_id[character_id] = entry
+            if entry.get("name"):
+                lookup.by_name.setdefault(entry["name"], character_id)
+            for alias in entry.get("aliases") or []:
+                lookup.by_alias.setdefault(alias, character_id)
+        return lookup
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self.by_name.get(name) or self.by_alias.get(name)
+
+
+@dataclass
+class _LogTail:
+    """What an append needs from a log index: size, last entry, checkpoint hint.
+
+    ``entries`` is only set when the whole index had to be parsed (missing,
+    stale or keyed under another outline), so the append can reuse it.
+    """
+
+    count: int
+    last: Optional[List] = None
+    checkpoint: Optional[int] = None
+    entries: Optional[List[List]] = None
 
 
 class CharacterStateManager:
     """Manage character cards and timeline mutations."""
 
+    # Lookup indexes shared by all managers, keyed by index file path and
+    # validated against its (mtime_ns, size) before every use.
+    _lookup_cache: Dict[Path, _CharacterLookup] = {}
+
+    # Minimum number of replayed mutations between two persisted checkpoints.
+    CHECKPOINT_INTERVAL = 32
+
     def __init__(self, project_dir: Optional[Path] = None, novel_id: str = "my_novel"):
         self.project_dir = project_dir or self._find_project_dir()
         self.novel_id = novel_id
@@ -39,7 +103,13 @@ class CharacterStateManager:
         self.profiles_dir = self.base_dir / "profiles"
         self.logs_dir = self.base_dir / "timeline" / "logs"
         self.snapshots_dir = self.base_dir / "timeline" / "snapshots"
+        self.checkpoints_dir = self.base_dir / "timeline" / "checkpoints"
+        self.chapter_changes_dir = self.base_dir / "timeline" / "chapters"
+        self.baselines_dir = self.base_dir / "timeline" / "baselines"
+        self.archive_dir = self.base_dir / "timeline" / "archive"
         self.index_file = self.base_dir / "index.yaml"
+        self.chapter_registry = ChapterRegistry(self.project_dir, novel_id)
+        self._world_graph: Optional[WorldGraphManager] = None
         self._ensure_dirs()
 
     def _find_project_dir(self) -> Path:
@@ -54,6 +124,7 @@ class CharacterStateManager:
         self.profiles_dir.mkdir(parents=True, exist_ok=True)
         self.logs_dir.mkdir(parents=True, exist_ok=True)
         self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        self.checkpoints_dir.mkdir(parents=True, exist_ok=True)
         if not self.index_file.exists():
             self.index_file.write_text("characters: []\n", encoding="utf-8")
 
@@ -64,39 +135,96 @@ class CharacterStateManager:
             data = yaml.safe_load(handle) or {}
         return data
 
+    @staticmethod
+    def _atomic_write_text(path: Path, text: str) -> None:
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
     def _save_yaml(self, path: Path, data: Dict) -> None:
-        with path.open("w", encoding="utf-8") as handle:
-            yaml.safe_dump(data, handle, allow_unicode=True, sort_keys=False)
+        self._atomic_write_text(
+            path, yaml.safe_dump(data, allow_unicode=True, sort_keys=False)
+        )
 
     def _load_index(self) -> Dict[str, List[Dict[str, str]]]:
         return self._load_yaml(self.index_file, {"characters": []})
 
+    def _index_signature(self) -> Tuple[int, int]:
+        try:
+            stat = self.index_file.stat()
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_mtime_ns, stat.st_size)
+
     def _save_index(self, index_data: Dict[str, List[Dict[str, str]]]) -> None:
         self._save_yaml(self.index_file, index_data)
+        entries = list(index_data.get("characters", []))
+        self._lookup_cache[self.index_file] = _CharacterLookup.build(
+            self._index_signature(), entries
+        )
+
+    def _lookup(self) -> _CharacterLookup:
+        signature = self._index_signature()
+        cached = self._lookup_cache.get(self.index_file)
+        if cached is not None and cached.signature == signature:
+            return cached
+        entries = list(self._load_index().get("characters", []))
+        lookup = _CharacterLookup.build(signature, entries)
+        self._lookup_cache[self.index_file] = lookup
+        return lookup
 
     def list_characters(self) -> List[Dict[str, str]]:
         """List all registered characters from index."""
-        index_data = self._load_index()
-        return list(index_data.get("characters", []))
+        return list(self._lookup().entries)
+
+    def resolve_character_id(self, name: str) -> Optional[str]:
+        """Resolve a character name or alias to its id."""
+        return self._lookup().resolve(name)
 
     def _generate_character_id(self) -> str:
-        index_data = self._load_index()
-        next_no = len(index_data.get("characters", [])) + 1
+        lookup = self._lookup()
+        next_no = len(lookup.entries) + 1
+        while f"char_{next_no:03d}" in lookup.by_id:
+            next_no += 1
         return f"char_{next_no:03d}"
 
     def _card_path(self, character_id: str) -> Path:
         return self.cards_dir / f"{character_id}.yaml"
 
     def _log_path(self, character_id: str) -> Path:
+        return self.logs_dir / f"{character_id}.jsonl"
+
+    def _log_index_path(self, character_id: str) -> Path:
+        return self.logs_dir / f"{character_id}.idx.jsonl"
+
+    def _legacy_log_path(self, character_id: str) -> Path:
         return self.logs_dir / f"{character_id}.yaml"
 
+    def _checkpoint_path(self, character_id: str) -> Path:
+        return self.checkpoints_dir / f"{character_id}.json"
+
+    def _baseline_path(self, character_id: str) -> Path:
+        return self.baselines_dir / f"{character_id}.yaml"
+
+    def _archive_path(self, character_id: str) -> Path:
+        return self.archive_dir / f"{character_id}.jsonl.gz"
+
+    def _chapter_changes_path(self, chapter_id: str) -> Path:
+        safe_name = re.sub(r"[^\w.-]", "_", chapter_id)
+        return self.chapter_changes_dir / f"{safe_name}.jsonl"
+
     def _profile_path(self, character_id: str) -> Path:
         return self.profiles_dir / f"{character_id}.md"
 
     def get_profile_path(
-        self, *, character_id: Optional[str] = None, name: Optional[str] = None
+        self,
+        *,
+        character_id: Optional[str] = None,
+        name: Optional[str] = None,
+        card: Optional[CharacterCard] = None,
     ) -> Path:
-        card = self.get_character_card(character_id=character_id, name=name)
+        if card is None:
+            card = self.get_character_card(character_id=character_id, name=name)
         return self.base_dir / card.dynamic_profile
 
     def get_profile_excerpt(
@@ -105,23 +233,23 @@ class CharacterStateManager:
         character_id: Optional[str] = None,
         name: Optional[str] = None,
         max_chars: int = 120,
+        card: Optional[CharacterCard] = None,
     ) -> str:
-        profile_path = self.get_profile_path(character_id=character_id, name=name)
-        if not profile_path.exists():
-            return ""
-        lines = [line.strip() for line in profile_path.read_text(encoding="utf-8").splitlines()]
-        lines = [line for line in lines if line]
-        if not lines:
+        panel = self.get_profile_panel(character_id=character_id, name=name, card=card)
+        if panel is None:
             return ""
-        panel_lines = [line for line in lines if "【" in line and "】" in line]
-        if panel_lines:
-            compact_panel = " ".join(panel_lines[:6])
-            return compact_panel[:max_chars]
+        return panel.excerpt(max_chars)
 
-        compact = " ".join(lines)
-        compact = re.sub(r"[`#>*_-]+", " ", compact)
-        compact = re.sub(r"\s+", " ", compact).strip()
-        return compact[:max_chars]
+    def get_profile_panel(
+        self,
+        *,
+        character_id: Optional[str] = None,
+        name: Optional[str] = None,
+        card: Optional[CharacterCard] = None,
+    ) -> Optional[ProfilePanel]:
+        """Structured ``【key：value】`` panel of a profile, cached on mtime/size."""
+        profile_path = self.get_profile_path(character_id=character_id, name=name, card=card)
+        return load_profile_panel(profile_path)
 
     @staticmethod
     def _profile_template(name: str, character_id: str) -> str:
@@ -150,13 +278,6 @@ class CharacterStateManager:
             ]
         )
 
-    @staticmethod
-    def _normalize_item_name(item: str) -> str:
-        text = item.strip()
-        if " x" in text:
-            return text.split(" x", 1)[0].strip()
-        return text
-
     @staticmethod
     def _update_health_statuses(statuses: List[str], health_value: str) -> None:
         health_candidates = {
@@ -185,17 +306,35 @@ class CharacterStateManager:
             if flag and flag not in summary.statuses:
                 summary.statuses.append(flag)
         for item, count in state.inventory.items():
-            if count <= 0:
-                continue
-            summary.items.append(item if count == 1 else f"{item} x{count}")
+            if count > 0:
+                summary.add_item(item, count)
         return summary
 
-    @staticmethod
-    def _chapter_order(chapter_id: str) -> Tuple[int, str]:
-        match = re.search(r"(\d+)", chapter_id)
-        if not match:
-            return (10**9, chapter_id)
-        return (int(match.group(1)), chapter_id)
+    @property
+    def world_graph(self) -> WorldGraphManager:
+        if self._world_graph is None:
+            self._world_graph = WorldGraphManager(self.project_dir, self.novel_id)
+        return self._world_graph
+
+    def realm_change(self, current: str, new: str) -> Optional[str]:
+        """Classify ``current -> new`` against the world ``above`` hierarchy.
+
+        Returns ``advance``/``same``/``regression``, ``unordered`` when the
+        two realms sit on separate branches of the hierarchy, ``unranked``
+        when the new realm is missing from a defined hierarchy, or ``None``
+        when there is no hierarchy or the current realm is not part of it.
+        """
+        ranks = self.world_graph.realm_ranks()
+        if not ranks:
+            return None
+        if new not in ranks:
+            return "unranked"
+        if current not in ranks:
+            return None
+        order = self.world_graph.compare_realms(new, current)
+        if order is None:
+            return "unordered"
+        return {1: "advance", 0: "same", -1: "regression"}[order]
 
     def create_character(
         self,
@@ -204,17 +343,21 @@ class CharacterStateManager:
         faction: str = "",
         gender: Optional[str] = None,
         age: Optional[int] = None,
+        aliases: Optional[List[str]] = None,
     ) -> CharacterCard:
-        index_data = self._load_index()
-        for item in index_data.get("characters", []):
-            if item.get("name") == name:
-                raise ValueError(f"人物已存在: {name}")
+        lookup = self._lookup()
+        aliases = [alias for alias in dict.fromkeys(aliases or []) if alias and alias != name]
+        for label in [name, *aliases]:
+            existing_id = lookup.resolve(label)
+            if existing_id:
+                raise ValueError(f"人物已存在: {label} ({existing_id})")
 
         character_id = self._generate_character_id()
         card = CharacterCard(
             static=CharacterStatic(
                 id=character_id,
                 name=name,
+                aliases=aliases,
                 tier=tier,
                 faction=faction,
                 gender=gender,
@@ -230,16 +373,20 @@ class CharacterStateManager:
                 encoding="utf-8",
             )
 
-        index_data.setdefault("characters", []).append({"id": character_id, "name": name})
-        self._save_index(index_data)
+        entries = [dict(item) for item in lookup.entries]
+        entries.append(self._index_entry(card))
+        self._save_index({"characters": entries})
         return card
 
+    @staticmethod
+    def _index_entry(card: CharacterCard) -> Dict:
+        entry: Dict = {"id": card.static.id, "name": card.static.name}
+        if card.static.aliases:
+            entry["aliases"] = list(card.static.aliases)
+        return entry
+
     def _get_character_id_by_name(self, name: str) -> Optional[str]:
-        index_data = self._load_index()
-        for item in index_data.get("characters", []):
-            if item.get("name") == name:
-                return item.get("id")
-        return None
+        return self._lookup().resolve(name)
 
     def get_character_card(
         self, *, character_id: Optional[str] = None, name: Optional[str] = None
@@ -260,43 +407,325 @@ class CharacterStateManager:
         card = CharacterCard.model_validate(data)
         if not card.dynamic_profile:
             card.dynamic_profile = f"profiles/{card.static.id}.md"
-        profile_file = self.base_dir / card.dynamic_profile
-        if not profile_file.exists():
+        return card
+
+    def scaffold_profiles(
+        self, *, character_id: Optional[str] = None, name: Optional[str] = None
+    ) -> List[Path]:
+        """Create missing profile templates and card links; returns created files.
+
+        Reads never touch the filesystem beyond loading the card, so this is
+        the explicit repair step for cards whose profile went missing.
+        """
+        if character_id or name:
+            cards = [self.get_character_card(character_id=character_id, name=name)]
+        else:
+            cards = [
+                self.get_character_card(character_id=item["id"])
+                for item in self.list_characters()
+                if self._card_path(item["id"]).exists()
+            ]
+
+        created: List[Path] = []
+        for card in cards:
+            raw = self._load_yaml(self._card_path(card.static.id), {})
+            if not raw.get("dynamic_profile"):
+                self.save_character_card(card)
+            profile_file = self.base_dir / card.dynamic_profile
+            if profile_file.exists():
+                continue
             profile_file.parent.mkdir(parents=True, exist_ok=True)
             profile_file.write_text(
                 self._profile_template(name=card.static.name, character_id=card.static.id),
                 encoding="utf-8",
             )
-        return card
+            created.append(profile_file)
+        return created
 
     def save_character_card(self, card: CharacterCard) -> None:
+        self._write_card(card)
+        self._sync_index_entry(card)
+
+    def _write_card(self, card: CharacterCard) -> None:
         data = card.model_dump(
             exclude_none=True,
             exclude={"initial_state", "current_state"},
         )
         self._save_yaml(self._card_path(card.static.id), data)
 
-    def _load_mutations(self, character_id: str) -> List[StateMutation]:
-        raw = self._load_yaml(self._log_path(character_id), {"mutations": []})
-        mutations = [StateMutation.model_validate(item) for item in raw.get("mutations", [])]
-        mutations.sort(key=lambda m: self._chapter_order(m.chapter_id))
-        return mutations
-
-    def _save_mutations(self, character_id: str, mutations: List[StateMutation]) -> None:
-        serialized = [
-            mutation.model_dump(
-                exclude_none=True,
-                exclude_defaults=True,
-                exclude={"reason", "before_state", "after_state"},
-            )
-            for mutation in mutations
+    def _sync_index_entry(self, card: CharacterCard) -> None:
+        """Keep the index name/aliases in step with a saved card."""
+        lookup = self._lookup()
+        current = lookup.by_id.get(card.static.id)
+        if current is None:
+            return
+        wanted = self._index_entry(card)
+        if current == wanted:
+            return
+        entries = [
+            wanted if item.get("id") == card.static.id else dict(item)
+            for item in lookup.entries
         ]
-        self._save_yaml(
-            self._log_path(character_id),
-            {"mutations": serialized},
+        self._save_index({"characters": entries})
+
+    @staticmethod
+    def _serialize_mutation(mutation: StateMutation) -> str:
+        data = mutation.model_dump(
+            exclude_none=True,
+            exclude_defaults=True,
+            exclude={"reason", "before_state"},
+        )
+        return json.dumps(data, ensure_ascii=False)
+
+    @staticmethod
+    def _entry_key(order: ChapterOrder, chapter_id: str) -> List:
+        return [order.ordinal(chapter_id), chapter_id]
+
+    @staticmethod
+    def _entry_sort_key(entry: List) -> Tuple[int, str, int]:
+        return (entry[0], entry[1], entry[2])
+
+    def _load_log_index(
+        self, character_id: str, order: ChapterOrder, persist: bool = False
+    ) -> List[List]:
+        """Return ``[ordinal, chapter_id, offset, length]`` entries in chapter order."""
+        return self._read_log_index(character_id, order, persist)[0]
+
+    def _read_log_index(
+        self, character_id: str, order: ChapterOrder, persist: bool = False
+    ) -> Tuple[List[List], Optional[int]]:
+        """Return the index entries and the last checkpoint position it records.
+
+        The sidecar is a JSONL file: a header line (outline version, log size,
+        entry count, last checkpoint position) followed by one entry per
+        mutation. Entries appended in order carry the entry count as a fifth
+        field so ``_read_log_tail`` never has to count lines. The index is
+        rebuilt from the log whenever it is missing or no longer covers the
+        log (e.g. the log was edited by hand), and re-keyed without touching
+        the log when the outline order changed. Only write paths pass
+        ``persist`` to store such a rebuilt or re-keyed index; reads keep it in
+        memory and never write the sidecar. (A legacy YAML log is still
+        converted once on first access, since entries point into the JSONL
+        log.) The checkpoint position is ``None`` when unknown.
+        """
+        self._migrate_legacy_log(character_id, order)
+        log_path = self._log_path(character_id)
+        if not log_path.exists():
+            return [], None
+        log_size = log_path.stat().st_size
+        try:
+            with self._log_index_path(character_id).open("r", encoding="utf-8") as handle:
+                header = json.loads(next(handle))
+                entries = [json.loads(line)[:4] for line in handle]
+        except (OSError, StopIteration, ValueError):
+            header, entries = {}, []
+        # In-order appends add entries without rewriting the header; the last
+        # one always ends where the log ends.
+        covered = header.get("size") == log_size or (
+            bool(entries) and entries[-1][2] + entries[-1][3] == log_size
         )
+        if not header or not covered:
+            return self._rebuild_log_index(character_id, order, persist), None
+        checkpoint = header.get("checkpoint")
+        if header.get("registry") != order.version:
+            for entry in entries:
+                entry[0] = order.ordinal(entry[1])
+            entries.sort(key=self._entry_sort_key)
+            if persist:
+                self._save_log_index(character_id, entries, order, checkpoint)
+        return entries, checkpoint
+
+    # Bytes read from the end of an index to find its last line.
+    _TAIL_BLOCK = 4096
+
+    def _read_log_tail(self, character_id: str, order: ChapterOrder) -> _LogTail:
+        """Entry count, last entry and checkpoint hint from the index header and tail.
+
+        Only the header and the last line are read; the whole index is parsed
+        (and rebuilt if needed) only when that is not enough to trust it.
+        """
+        try:
+            log_size = self._log_path(character_id).stat().st_size
+            with self._log_index_path(character_id).open("rb") as handle:
+                header = json.loads(handle.readline())
+                body_start = handle.tell()
+                end = handle.seek(0, os.SEEK_END)
+                handle.seek(max(body_start, end - self._TAIL_BLOCK))
+                block = handle.read().rstrip(b"\n")
+            last = None
+            if block:
+                if b"\n" not in block and end - body_start > self._TAIL_BLOCK:
+                    raise ValueError("index line longer than the tail block")
+                last = json.loads(block.rsplit(b"\n", 1)[-1])
+        except (OSError, ValueError):
+            header, last = {}, None
+        if header.get("registry") == order.version:
+            checkpoint = header.get("checkpoint")
+            if header.get("size") == log_size and "count" in header:
+                return _LogTail(int(header["count"]), last, checkpoint)
+            if last is not None and len(last) > 4 and last[2] + last[3] == log_size:
+                return _LogTail(int(last[4]), last[:4], checkpoint)
+        entries, checkpoint = self._read_log_index(character_id, order, persist=True)
+        return _LogTail(len(entries), entries[-1] if entries else None, checkpoint, entries)
+
+    @staticmethod
+    def _log_index_line(item: object) -> str:
+        return json.dumps(item, ensure_ascii=False) + "\n"
+
+    def _save_log_index(
+        self,
+        character_id: str,
+        entries: List[List],
+        order: ChapterOrder,
+        checkpoint: Optional[int] = None,
+    ) -> None:
+        header: Dict = {
+            "registry": order.version,
+            "size": self._log_path(character_id).stat().st_size,
+            "count": len(entries),
+        }
+        if checkpoint is not None:
+            header["checkpoint"] = checkpoint
+        lines = [self._log_index_line(header)]
+        lines.extend(self._log_index_line(entry) for entry in entries)
+        self._atomic_write_text(self._log_index_path(character_id), "".join(lines))
+
+    def _rebuild_log_index(
+        self, character_id: str, order: ChapterOrder, persist: bool
+    ) -> List[List]:
+        entries: List[List] = []
+        offset = 0
+        with self._log_path(character_id).open("rb") as handle:
+            for line in handle:
+                if line.strip():
+                    chapter_id = json.loads(line).get("chapter_id", "")
+                    entries.append(self._entry_key(order, chapter_id) + [offset, len(line)])
+                offset += len(line)
+        entries.sort(key=self._entry_sort_key)
+        if not persist:
+            return entries
+        self._save_log_index(character_id, entries, order)
+        # Superseded by the JSONL sidecar.
+        legacy_index = self.logs_dir / f"{character_id}.idx.json"
+        if legacy_index.exists():
+            legacy_index.unlink()
+        return entries
+
+    def _read_entries(
+        self, character_id: str, entries: Sequence[List]
+    ) -> Iterator[StateMutation]:
+        """Stream mutations for index ``entries`` in the given order."""
+        if not entries:
+            return
+        with self._log_path(character_id).open("rb") as handle:
+            for entry in entries:
+                handle.seek(entry[2])
+                yield StateMutation.model_validate(json.loads(handle.readline()))
+
+    def _load_mutations(self, character_id: str, order: ChapterOrder) -> List[StateMutation]:
+        entries = self._load_log_index(character_id, order)
+        return list(self._read_entries(character_id, entries))
+
+    def _append_mutations(
+        self,
+        character_id: str,
+        mutations: Sequence[StateMutation],
+        order: ChapterOrder,
+        tail: _LogTail,
+    ) -> Tuple[int, Optional[int], Optional[List[List]]]:
+        """Append mutations to the log and keep its index and checkpoints valid.
+
+        Mutations sorting after every logged one (the usual case) are appended
+        to the index as well, using only ``tail``; an earlier chapter parses
+        and rewrites the index, and the checkpoint file is only read when the
+        insert lands before the last checkpoint recorded in the index header.
+        Returns the entry count, the last checkpoint position and the entries
+        when they were loaded.
+        """
+        keys = [tuple(self._entry_key(order, mutation.chapter_id)) for mutation in mutations]
+        previous = (tail.last[0], tail.last[1]) if tail.last else ()
+        in_order = tail.checkpoint is not None
+        for key in keys:
+            in_order = in_order and key >= previous
+            previous = key
+
+        entries = tail.entries
+        checkpoint = tail.checkpoint
+        if not in_order and entries is None:
+            entries, checkpoint = self._read_log_index(character_id, order, persist=True)
+
+        lines = [
+            (self._serialize_mutation(mutation) + "\n").encode("utf-8") for mutation in mutations
+        ]
+        with self._log_path(character_id).open("ab") as handle:
+            offset = handle.tell()
+            handle.write(b"".join(lines))
+        added: List[List] = []
+        for key, line in zip(keys, lines):
+            added.append([key[0], key[1], offset, len(line)])
+            offset += len(line)
+
+        if in_order:
+            with self._log_index_path(character_id).open("a", encoding="utf-8") as handle:
+                handle.write(
+                    "".join(
+                        self._log_index_line(entry + [tail.count + number])
+                        for number, entry in enumerate(added, start=1)
+                    )
+                )
+            return len(added) + tail.count, checkpoint, None if entries is None else entries + added
 
-    def _apply_mutation_action(self, card: CharacterCard, mutation_expr: str) -> Dict[str, str]:
+        first_position = len(entries)
+        for entry in added:
+            position = bisect_right(
+                entries, (entry[0], entry[1]), key=lambda item: (item[0], item[1])
+            )
+            entries.insert(position, entry)
+            first_position = min(first_position, position)
+        if checkpoint is None or first_position < checkpoint:
+            checkpoint = self._invalidate_checkpoints(character_id, first_position, order)
+        self._save_log_index(character_id, entries, order, checkpoint)
+        return len(entries), checkpoint, entries
+
+    def _save_mutations(
+        self, character_id: str, mutations: List[StateMutation], order: ChapterOrder
+    ) -> None:
+        """Rewrite the whole log (used by migrations and maintenance only)."""
+        ordered = sorted(mutations, key=lambda item: self._entry_key(order, item.chapter_id))
+        entries: List[List] = []
+        offset = 0
+        with self._log_path(character_id).open("wb") as handle:
+            for mutation in ordered:
+                line = (self._serialize_mutation(mutation) + "\n").encode("utf-8")
+                handle.write(line)
+                entries.append(self._entry_key(order, mutation.chapter_id) + [offset, len(line)])
+                offset += len(line)
+        self._save_log_index(character_id, entries, order)
+
+    def _migrate_legacy_log(self, character_id: str, order: ChapterOrder) -> bool:
+        """Convert ``logs/<id>.yaml`` into the JSONL log once."""
+        legacy_path = self._legacy_log_path(character_id)
+        if not legacy_path.exists() or self._log_path(character_id).exists():
+            return False
+        raw = self._load_yaml(legacy_path, {"mutations": []})
+        mutations = [StateMutation.model_validate(item) for item in raw.get("mutations", [])]
+        self._save_mutations(character_id, mutations, order)
+        legacy_path.rename(legacy_path.with_suffix(".yaml.migrated"))
+        self._save_checkpoints(character_id, [], order)
+        return True
+
+    def migrate_legacy_logs(self) -> List[str]:
+        """Migrate every legacy YAML timeline log; returns migrated character ids."""
+        order = self.chapter_registry.snapshot()
+        migrated: List[str] = []
+        for legacy_path in sorted(self.logs_dir.glob("*.yaml")):
+            if self._migrate_legacy_log(legacy_path.stem, order):
+                migrated.append(legacy_path.stem)
+        return migrated
+
+    def _apply_mutation_action(
+        self, summary: CharacterSummary, mutation_expr: str
+    ) -> Dict[str, str]:
         if ":" not in mutation_expr:
             raise ValueError(f"mutation 格式错误: {mutation_expr}")
 
@@ -305,35 +734,29 @@ class CharacterStateManager:
         payload_text = payload_text.strip()
         payload: Dict[str, str] = {"raw": payload_text}
 
-        if action == "acquire":
-            existing = {
-                self._normalize_item_name(item): item for item in card.summary.items
-            }
-            if payload_text not in existing:
-                card.summary.items.append(payload_text)
-            payload.update({"item": payload_text})
-        elif action == "use":
-            idx = -1
-            for i, item in enumerate(card.summary.items):
-                if self._normalize_item_name(item) == payload_text:
-                    idx = i
-                    break
-            if idx < 0:
-                raise ValueError(f"物品不足，无法使用: {payload_text}")
-            card.summary.items.pop(idx)
-            payload.update({"item": payload_text})
+        if action in {"acquire", "use"}:
+            item_name, count = split_item_count(payload_text)
+            if not item_name or count <= 0:
+                raise ValueError(f"物品格式错误: {payload_text}")
+            if action == "acquire":
+                summary.add_item(item_name, count)
+            else:
+                summary.remove_item(item_name, count)
+            payload.update({"item": item_name})
+            if count != 1:
+                payload["count"] = str(count)
         elif action == "move":
-            card.summary.location = payload_text
+            summary.location = payload_text
             payload.update({"location": payload_text})
         elif action == "health":
-            self._update_health_statuses(card.summary.statuses, payload_text)
+            self._update_health_statuses(summary.statuses, payload_text)
             payload.update({"health": payload_text})
         elif action == "realm":
-            card.summary.realm = payload_text
+            summary.realm = payload_text
             payload.update({"realm": payload_text})
         elif action == "flag":
-            if payload_text and payload_text not in card.summary.statuses:
-                card.summary.statuses.append(payload_text)
+            if payload_text and payload_text not in summary.statuses:
+                summary.statuses.append(payload_text)
             payload.update({"flag": payload_text})
         else:
             raise ValueError(f"不支持的 mutation action: {action}")
@@ -357,11 +780,25 @@ class CharacterStateManager:
         key = key_by_action.get(action, "")
         return str(payload.get(key, ""))
 
-    def _apply_record_action(self, card: CharacterCard, mutation: StateMutation) -> None:
+    def _apply_record_action(self, summary: CharacterSummary, mutation: StateMutation) -> None:
         if not mutation.action:
             return
         raw = self._payload_raw_value(mutation.action, mutation.payload)
-        self._apply_mutation_action(card, f"{mutation.action}:{raw}")
+        self._apply_mutation_action(summary, f"{mutation.action}:{raw}")
+
+    def _replay_mutation(
+        self, summary: CharacterSummary, mutation: StateMutation
+    ) -> CharacterSummary:
+        """Apply one logged mutation to ``summary`` in place (legacy snapshots replace it)."""
+        if mutation.action:
+            try:
+                self._apply_record_action(summary, mutation)
+                return summary
+            except ValueError:
+                pass
+        if mutation.after_state:
+            return self._summary_from_legacy_state(mutation.after_state)
+        return summary
 
     def apply_mutation(
         self,
@@ -373,40 +810,295 @@ class CharacterStateManager:
         note: str = "",
         reason: str = "",
     ) -> StateMutation:
-        if not mutation_expr and not note.strip() and not reason.strip():
-            raise ValueError("至少提供 --change 或 --note/--reason 之一")
+        return self.apply_mutations(
+            [
+                {
+                    "character_id": character_id,
+                    "name": name,
+                    "chapter_id": chapter_id,
+                    "mutation_expr": mutation_expr,
+                    "note": note,
+                    "reason": reason,
+                }
+            ]
+        )[0][1]
 
-        card = self.get_character_card(character_id=character_id, name=name)
-        payload: Dict[str, str] = {}
-        action: Optional[str] = None
-        if mutation_expr:
-            payload = self._apply_mutation_action(card, mutation_expr)
-            action = payload.get("action")
-        timeline_note = note.strip() or reason.strip()
-
-        mutation = StateMutation(
-            mutation_id=f"{card.static.id}_{len(self._load_mutations(card.static.id)) + 1:04d}",
-            chapter_id=chapter_id,
-            action=action,
-            payload=payload,
-            note=timeline_note,
-            reason=timeline_note or None,
-        )
+    @staticmethod
+    def _change_field(change: Dict, *keys: str) -> str:
+        for key in keys:
+            value = change.get(key)
+            if value is not None and str(value).strip():
+                return str(value).strip()
+        return ""
+
+    def apply_mutations(self, changes: Sequence[Dict]) -> List[Tuple[str, StateMutation]]:
+        """Apply many timeline changes as one transaction.
 
-        mutations = self._load_mutations(card.static.id)
-        mutations.append(mutation)
-        mutations.sort(key=lambda item: self._chapter_order(item.chapter_id))
-        self._save_mutations(card.static.id, mutations)
+        Each change is a mapping with ``name`` or ``character_id``/``id``,
+        ``chapter_id``/``chapter`` and optionally ``mutation_expr``/``change``,
+        ``note`` and ``reason``. Changes are grouped per character and
+        validated in order against in-memory state; nothing is written unless
+        every change is valid. Each touched character then gets one card save
+        and one log append. Chapters before a ``compact_timeline`` baseline
+        are rejected: that history is archived and can no longer change.
+        Returns ``(character_id, mutation)`` per change,
+        with the id each ``name``/``id`` resolved to.
+        """
+        order = self.chapter_registry.snapshot()
+        cards: Dict[str, CharacterCard] = {}
+        resolved: Dict[Tuple[str, str], str] = {}
+        next_numbers: Dict[str, int] = {}
+        latest: Dict[str, Tuple] = {}
+        baselines: Dict[str, Dict] = {}
+        tails: Dict[str, _LogTail] = {}
+        pending: Dict[str, List[StateMutation]] = {}
+        touched_cards: Set[str] = set()
+        results: List[Tuple[str, StateMutation]] = []
 
-        if mutation_expr:
-            self.save_character_card(card)
-        return mutation
+        for index, change in enumerate(changes, start=1):
+            character_id = self._change_field(change, "character_id", "id")
+            name = self._change_field(change, "name")
+            chapter_id = self._change_field(change, "chapter_id", "chapter")
+            mutation_expr = self._change_field(change, "mutation_expr", "change")
+            note = self._change_field(change, "note")
+            reason = self._change_field(change, "reason")
+            prefix = f"第 {index} 条变更: " if len(changes) > 1 else ""
+            if not chapter_id:
+                raise ValueError(f"{prefix}缺少章节ID")
+            if not mutation_expr and not note and not reason:
+                raise ValueError(f"{prefix}至少提供 --change 或 --note/--reason 之一")
+
+            lookup = (character_id, name)
+            if lookup not in resolved:
+                card = self.get_character_card(
+                    character_id=character_id or None, name=name or None
+                )
+                resolved[lookup] = card.static.id
+                cards.setdefault(card.static.id, card)
+            final_id = resolved[lookup]
+            if final_id not in pending:
+                baselines[final_id] = self._load_baseline(final_id) or {}
+                tails[final_id] = self._read_log_tail(final_id, order)
+                count, latest[final_id] = self._log_tail(
+                    tails[final_id], order, baselines[final_id]
+                )
+                next_numbers[final_id] = count + 1
+                pending[final_id] = []
+            card = cards[final_id]
+            key = tuple(self._entry_key(order, chapter_id))
+            if self._before_baseline(baselines[final_id] or None, chapter_id, order):
+                raise ValueError(
+                    f"{prefix}{final_id} 的时间线已压缩到 {baselines[final_id]['before']}，"
+                    f"不能再补录更早的章节 {chapter_id}"
+                )
+
+            payload: Dict[str, str] = {}
+            action: Optional[str] = None
+            if mutation_expr:
+                previous_realm = card.summary.realm
+                try:
+                    payload = self._apply_mutation_action(card.summary, mutation_expr)
+                except ValueError as exc:
+                    raise ValueError(f"{prefix}{exc}") from exc
+                action = payload.get("action")
+                if action == "realm":
+                    if key < latest[final_id]:
+                        # Backdated: judge against the state at that chapter, not the latest.
+                        previous_realm = self._realm_at(
+                            card, chapter_id, pending[final_id], order
+                        )
+                    change = self.realm_change(previous_realm, payload["realm"])
+                    if change in {"regression", "unranked", "unordered"}:
+                        payload["realm_change"] = change
+                touched_cards.add(final_id)
+            timeline_note = note or reason
+
+            mutation = StateMutation(
+                mutation_id=f"{final_id}_{next_numbers[final_id]:04d}",
+                chapter_id=chapter_id,
+                action=action,
+                payload=payload,
+                note=timeline_note,
+                reason=timeline_note or None,
+            )
+            next_numbers[final_id] += 1
+            latest[final_id] = max(latest[final_id], key)
+            pending[final_id].append(mutation)
+            results.append((final_id, mutation))
+
+        for final_id, mutations in pending.items():
+            count, checkpoint, entries = self._append_mutations(
+                final_id, mutations, order, tails[final_id]
+            )
+            self._refresh_checkpoints(cards[final_id], order, count, checkpoint, entries)
+            if final_id in touched_cards:
+                self.save_character_card(cards[final_id])
+        self._append_chapter_changes(pending)
+        return results
+
+    @staticmethod
+    def _chapter_change_line(character_id: str, mutation: StateMutation) -> str:
+        data = json.loads(CharacterStateManager._serialize_mutation(mutation))
+        return json.dumps({"character_id": character_id, **data}, ensure_ascii=False)
+
+    def _append_chapter_changes(self, pending: Dict[str, List[StateMutation]]) -> None:
+        """Update the chapter -> mutations inverted index with new mutations."""
+        if not self.chapter_changes_dir.exists():
+            # First write since the index was introduced: derive it from all logs,
+            # which already contain ``pending``.
+            self.rebuild_chapter_index()
+            return
+        by_chapter: Dict[str, List[str]] = {}
+        for character_id, mutations in pending.items():
+            for mutation in mutations:
+                by_chapter.setdefault(mutation.chapter_id, []).append(
+                    self._chapter_change_line(character_id, mutation)
+                )
+        for chapter_id, lines in by_chapter.items():
+            with self._chapter_changes_path(chapter_id).open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+
+    def rebuild_chapter_index(self) -> int:
+        """Recreate the per-chapter change index from every timeline log."""
+        order = self.chapter_registry.snapshot()
+        by_chapter: Dict[str, List[str]] = {}
+        for item in self.list_characters():
+            character_id = item["id"]
+            entries = self._load_log_index(character_id, order)
+            mutations = self._load_archived(character_id) + list(
+                self._read_entries(character_id, entries)
+            )
+            for mutation in mutations:
+                by_chapter.setdefault(mutation.chapter_id, []).append(
+                    self._chapter_change_line(character_id, mutation)
+                )
+
+        self.chapter_changes_dir.mkdir(parents=True, exist_ok=True)
+        for stale in self.chapter_changes_dir.glob("*.jsonl"):
+            stale.unlink()
+        for chapter_id, lines in by_chapter.items():
+            path = self._chapter_changes_path(chapter_id)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write("\n".join(lines) + "\n")
+        return sum(len(lines) for lines in by_chapter.values())
+
+    def get_chapter_changes(self, chapter_id: str) -> List[Tuple[str, StateMutation]]:
+        """Return ``(character_id, mutation)`` pairs recorded in ``chapter_id``."""
+        if not self.chapter_changes_dir.exists():
+            self.rebuild_chapter_index()
+        path = self._chapter_changes_path(chapter_id)
+        if not path.exists():
+            return []
+        changes: List[Tuple[str, StateMutation]] = []
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("chapter_id") != chapter_id:
+                    continue
+                character_id = data.pop("character_id", "")
+                changes.append((character_id, StateMutation.model_validate(data)))
+        return changes
 
     def get_timeline(
-        self, *, character_id: Optional[str] = None, name: Optional[str] = None
+        self,
+        *,
+        character_id: Optional[str] = None,
+        name: Optional[str] = None,
+        include_archived: bool = False,
     ) -> List[StateMutation]:
         card = self.get_character_card(character_id=character_id, name=name)
-        return self._load_mutations(card.static.id)
+        order = self.chapter_registry.snapshot()
+        live = self._load_mutations(card.static.id, order)
+        if not include_archived:
+            return live
+        return self._merge_by_chapter(self._load_archived(card.static.id), live, order)
+
+    def _merge_by_chapter(
+        self, archived: List[StateMutation], live: List[StateMutation], order: ChapterOrder
+    ) -> List[StateMutation]:
+        """Chapter-ordered union; archived entries come first within a chapter."""
+        return sorted(
+            archived + live, key=lambda item: self._entry_key(order, item.chapter_id)
+        )
+
+    def _load_checkpoints(self, character_id: str, order: ChapterOrder) -> List[Dict]:
+        try:
+            raw = json.loads(self._checkpoint_path(character_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return []
+        if raw.get("registry") != order.version:
+            # Positions were computed under another chapter order.
+            return []
+        return list(raw.get("checkpoints", []))
+
+    def _save_checkpoints(
+        self, character_id: str, checkpoints: List[Dict], order: ChapterOrder
+    ) -> None:
+        path = self._checkpoint_path(character_id)
+        # Superseded by the JSON file; never read, so it is just removed.
+        legacy_path = path.with_suffix(".yaml")
+        if legacy_path.exists():
+            legacy_path.unlink()
+        if not checkpoints:
+            if path.exists():
+                path.unlink()
+            return
+        data = {"registry": order.version, "checkpoints": checkpoints}
+        self._atomic_write_text(path, json.dumps(data, ensure_ascii=False))
+
+    def _invalidate_checkpoints(
+        self, character_id: str, position: int, order: ChapterOrder
+    ) -> int:
+        """Drop checkpoints whose replayed prefix no longer matches the log.
+
+        ``position`` is the index at which a mutation was inserted into the
+        chapter-ordered log; checkpoints covering more than ``position``
+        mutations have been shifted and must be recomputed. Returns the last
+        remaining checkpoint position (0 when none is left).
+        """
+        checkpoints = self._load_checkpoints(character_id, order)
+        kept = [item for item in checkpoints if int(item.get("position", 0)) <= position]
+        if len(kept) != len(checkpoints):
+            self._save_checkpoints(character_id, kept, order)
+        return self._last_checkpoint(kept)
+
+    @staticmethod
+    def _last_checkpoint(checkpoints: List[Dict]) -> int:
+        return max((int(item.get("position", 0)) for item in checkpoints), default=0)
+
+    def _select_checkpoint(
+        self, character_id: str, checkpoints: List[Dict], entries: List[List], limit: int
+    ) -> Optional[Dict]:
+        candidates = [
+            item for item in checkpoints if 0 < int(item.get("position", 0)) <= limit
+        ]
+        candidates.sort(key=lambda item: int(item["position"]), reverse=True)
+        for item in candidates:
+            position = int(item["position"])
+            last = next(self._read_entries(character_id, [entries[position - 1]]))
+            if last.mutation_id == item.get("last_mutation_id"):
+                return item
+        return None
+
+    def _replay_start(
+        self,
+        card: CharacterCard,
+        checkpoints: List[Dict],
+        entries: List[List],
+        limit: int,
+        baseline: Optional[Dict] = None,
+    ) -> Tuple[int, CharacterSummary]:
+        checkpoint = self._select_checkpoint(card.static.id, checkpoints, entries, limit)
+        if checkpoint is not None:
+            summary = CharacterSummary.model_validate(checkpoint.get("summary") or {})
+            return int(checkpoint["position"]), summary
+        if baseline is not None:
+            return 0, CharacterSummary.model_validate(baseline.get("summary") or {})
+        if card.initial_state is not None:
+            return 0, self._summary_from_legacy_state(card.initial_state)
+        return 0, CharacterSummary()
 
     def rebuild_state(
         self,
@@ -416,47 +1108,393 @@ class CharacterStateManager:
         until_chapter: Optional[str] = None,
     ) -> CharacterSummary:
         card = self.get_character_card(character_id=character_id, name=name)
-        if card.initial_state is not None:
-            summary = self._summary_from_legacy_state(card.initial_state)
-        else:
-            summary = CharacterSummary()
-        mutations = self._load_mutations(card.static.id)
-        if not mutations:
+        order = self.chapter_registry.snapshot()
+        entries = self._load_log_index(card.static.id, order)
+        baseline = self._load_baseline(card.static.id)
+        if not entries and baseline is None:
             return CharacterSummary.model_validate(card.summary.model_dump())
-        until_order = self._chapter_order(until_chapter) if until_chapter else None
 
-        for mutation in mutations:
-            mutation_order = self._chapter_order(mutation.chapter_id)
-            if until_order and mutation_order > until_order:
-                break
-            if mutation.action:
-                try:
-                    replay_card = CharacterCard(
-                        static=card.static,
-                        summary=summary,
-                        dynamic_profile=card.dynamic_profile,
-                    )
-                    self._apply_record_action(replay_card, mutation)
-                    summary = replay_card.summary
-                    continue
-                except ValueError:
-                    pass
-            if mutation.after_state:
-                summary = self._summary_from_legacy_state(mutation.after_state)
+        keys = [(item[0], item[1]) for item in entries]
+        limit = len(entries)
+        if until_chapter:
+            limit = bisect_right(keys, tuple(self._entry_key(order, until_chapter)))
+            if self._before_baseline(baseline, until_chapter, order):
+                return self._replay_archived(card, entries[:limit], until_chapter, order)
+
+        checkpoints = self._load_checkpoints(card.static.id, order)
+        start, summary = self._replay_start(card, checkpoints, entries, limit, baseline)
+        for mutation in self._read_entries(card.static.id, entries[start:limit]):
+            summary = self._replay_mutation(summary, mutation)
         return summary
 
-    def create_snapshot(
+    def refresh_checkpoints(
+        self, character_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, int]:
+        """Persist missing replay checkpoints; returns the number added per character.
+
+        ``apply_mutations`` already keeps checkpoints current, so this is only
+        needed after the log or outline was changed outside the manager.
+        """
+        if character_ids is None:
+            character_ids = [item["id"] for item in self.list_characters()]
+        order = self.chapter_registry.snapshot()
+        added: Dict[str, int] = {}
+        for final_id in character_ids:
+            try:
+                card = self.get_character_card(character_id=final_id)
+            except FileNotFoundError:
+                continue
+            # Ignore the recorded last position: the file may have been removed.
+            entries = self._load_log_index(final_id, order, persist=True)
+            count = self._refresh_checkpoints(card, order, len(entries), None, entries)
+            if count:
+                added[final_id] = count
+        return added
+
+    def _refresh_checkpoints(
+        self,
+        card: CharacterCard,
+        order: ChapterOrder,
+        count: int,
+        checkpoint: Optional[int],
+        entries: Optional[List[List]] = None,
+    ) -> int:
+        """Checkpoint the log tail once it spans ``CHECKPOINT_INTERVAL`` mutations.
+
+        Replays from the last valid checkpoint (or baseline) and stores a
+        checkpoint at each chapter end at least ``CHECKPOINT_INTERVAL``
+        mutations past the previous one. ``count`` entries are logged; the
+        index is only parsed when ``entries`` is not given and a checkpoint is
+        due. Returns the number of new checkpoints.
+        """
+        final_id = card.static.id
+        if not count:
+            return 0
+        if checkpoint is not None and count - checkpoint < self.CHECKPOINT_INTERVAL:
+            return 0
+        if entries is None:
+            entries = self._load_log_index(final_id, order, persist=True)
+        checkpoints = self._load_checkpoints(final_id, order)
+        baseline = self._load_baseline(final_id)
+        start, summary = self._replay_start(card, checkpoints, entries, len(entries), baseline)
+
+        added: List[Dict] = []
+        last_saved = start
+        replayed = self._read_entries(final_id, entries[start:])
+        for position, mutation in enumerate(replayed, start=start):
+            summary = self._replay_mutation(summary, mutation)
+            boundary = position + 1
+            at_chapter_end = boundary == len(entries) or (
+                entries[boundary][:2] != entries[position][:2]
+            )
+            if at_chapter_end and boundary - last_saved >= self.CHECKPOINT_INTERVAL:
+                added.append(
+                    {
+                        "chapter_id": mutation.chapter_id,
+                        "position": boundary,
+                        "last_mutation_id": mutation.mutation_id,
+                        "summary": summary.model_dump(),
+                    }
+                )
+                last_saved = boundary
+
+        # Checkpoints past ``start`` failed validation and are replaced.
+        kept = [item for item in checkpoints if int(item.get("position", 0)) <= start]
+        if not added and checkpoint is not None and len(kept) == len(checkpoints):
+            return 0
+        kept.extend(added)
+        # Record the new last position before the checkpoints it covers.
+        self._save_log_index(final_id, entries, order, self._last_checkpoint(kept))
+        self._save_checkpoints(final_id, kept, order)
+        return len(added)
+
+    def rebuild_window(
         self,
         *,
         character_id: Optional[str] = None,
         name: Optional[str] = None,
-        volume_id: str,
-        chapter_range: str = "",
-    ) -> Path:
+        from_chapter: str,
+        to_chapter: str,
+    ) -> Tuple[CharacterSummary, CharacterSummary]:
+        """Return the states at ``from_chapter`` and ``to_chapter``.
+
+        The first state comes from ``rebuild_state`` (checkpoint/baseline
+        backed); the second replays only the mutations between the two.
+        """
+        order = self.chapter_registry.snapshot()
+        from_key = self._entry_key(order, from_chapter)
+        to_key = self._entry_key(order, to_chapter)
+        if to_key < from_key:
+            raise ValueError(f"起始章节 {from_chapter} 晚于结束章节 {to_chapter}")
         card = self.get_character_card(character_id=character_id, name=name)
-        summary = self.rebuild_state(character_id=card.static.id)
+        start = self.rebuild_state(character_id=card.static.id, until_chapter=from_chapter)
+        if self._before_baseline(self._load_baseline(card.static.id), from_chapter, order):
+            end = self.rebuild_state(character_id=card.static.id, until_chapter=to_chapter)
+            return start, end
+
+        entries = self._load_log_index(card.static.id, order)
+        keys = [(item[0], item[1]) for item in entries]
+        low = bisect_right(keys, tuple(from_key))
+        high = bisect_right(keys, tuple(to_key))
+        end = CharacterSummary.model_validate(start.model_dump())
+        for mutation in self._read_entries(card.static.id, entries[low:high]):
+            end = self._replay_mutation(end, mutation)
+        return start, end
 
-        snapshot_file = self.snapshots_dir / f"{card.static.id}_{volume_id}.md"
+    def rebuild_all(
+        self,
+        until_chapter: Optional[str] = None,
+        character_ids: Optional[Sequence[str]] = None,
+        cards: Optional[Sequence[CharacterCard]] = None,
+    ) -> Dict[str, CharacterSummary]:
+        """Rebuild every character's summary at ``until_chapter`` in one pass.
+
+        Each character resumes from its nearest checkpoint; the remaining log
+        windows are merged by chapter order and replayed in a single scan.
+        Unknown ids in ``character_ids`` are skipped; callers that already
+        hold the cards pass ``cards`` instead.
+        """
+        if cards is not None:
+            return self._rebuild_cards(cards, until_chapter)
+        if character_ids is None:
+            character_ids = [item["id"] for item in self.list_characters()]
+        cards: List[CharacterCard] = []
+        for final_id in character_ids:
+            try:
+                cards.append(self.get_character_card(character_id=final_id))
+            except FileNotFoundError:
+                continue
+        return self._rebuild_cards(cards, until_chapter)
+
+    def _rebuild_cards(
+        self, cards: Sequence[CharacterCard], until_chapter: Optional[str]
+    ) -> Dict[str, CharacterSummary]:
+        order = self.chapter_registry.snapshot()
+        until_key = tuple(self._entry_key(order, until_chapter)) if until_chapter else None
+        summaries: Dict[str, CharacterSummary] = {}
+        streams = []
+        for rank, card in enumerate(cards):
+            final_id = card.static.id
+            entries = self._load_log_index(final_id, order)
+            baseline = self._load_baseline(final_id)
+            if not entries and baseline is None:
+                summaries[final_id] = CharacterSummary.model_validate(
+                    card.summary.model_dump()
+                )
+                continue
+            limit = len(entries)
+            if until_key is not None:
+                limit = bisect_right(entries, until_key, key=lambda item: (item[0], item[1]))
+                if self._before_baseline(baseline, until_chapter, order):
+                    summaries[final_id] = self._replay_archived(
+                        card, entries[:limit], until_chapter, order
+                    )
+                    continue
+            checkpoints = self._load_checkpoints(final_id, order)
+            start, summaries[final_id] = self._replay_start(
+                card, checkpoints, entries, limit, baseline
+            )
+            window = entries[start:limit]
+            mutations = self._read_entries(final_id, window)
+            streams.append(
+                [
+                    ((entry[0], entry[1], rank), final_id, mutation)
+                    for entry, mutation in zip(window, mutations)
+                ]
+            )
+
+        for _, final_id, mutation in heapq.merge(*streams, key=lambda item: item[0]):
+            summaries[final_id] = self._replay_mutation(summaries[final_id], mutation)
+        return summaries
+
+    def _load_baseline(self, character_id: str) -> Optional[Dict]:
+        path = self._baseline_path(character_id)
+        if not path.exists():
+            return None
+        return self._load_yaml(path, {})
+
+    @staticmethod
+    def _log_tail(tail: _LogTail, order: ChapterOrder, baseline: Dict) -> Tuple[int, Tuple]:
+        """Mutations ever recorded (for id numbering) and the latest recorded key.
+
+        The count includes archived mutations; the key is that of the last
+        log entry, else the baseline's ``before`` bound, else ``()``.
+        """
+        count = tail.count + int(baseline.get("mutation_count", 0))
+        if tail.last:
+            return count, (tail.last[0], tail.last[1])
+        if baseline.get("before"):
+            return count, (order.ordinal(baseline["before"]), "")
+        return count, ()
+
+    def _realm_at(
+        self,
+        card: CharacterCard,
+        chapter_id: str,
+        earlier: Sequence[StateMutation],
+        order: ChapterOrder,
+    ) -> str:
+        """Realm at ``chapter_id``: the logged state plus earlier unsaved changes up to it."""
+        summary = self.rebuild_state(character_id=card.static.id, until_chapter=chapter_id)
+        until_key = self._entry_key(order, chapter_id)
+        in_range = [
+            mutation
+            for mutation in earlier
+            if self._entry_key(order, mutation.chapter_id) <= until_key
+        ]
+        in_range.sort(key=lambda mutation: self._entry_key(order, mutation.chapter_id))
+        for mutation in in_range:
+            summary = self._replay_mutation(summary, mutation)
+        return summary.realm
+
+    @staticmethod
+    def _before_baseline(
+        baseline: Optional[Dict], until_chapter: str, order: ChapterOrder
+    ) -> bool:
+        """True when ``until_chapter`` precedes the compacted part of the timeline."""
+        if baseline is None:
+            return False
+        return order.ordinal(until_chapter) < order.ordinal(baseline["before"])
+
+    def _load_archived(self, character_id: str) -> List[StateMutation]:
+        path = self._archive_path(character_id)
+        if not path.exists():
+            return []
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            return [
+                StateMutation.model_validate(json.loads(line)) for line in handle if line.strip()
+            ]
+
+    def _replay_archived(
+        self,
+        card: CharacterCard,
+        entries: Sequence[List],
+        until_chapter: str,
+        order: ChapterOrder,
+    ) -> CharacterSummary:
+        """Slow path: replay archived history for a chapter before the baseline."""
+        until_key = self._entry_key(order, until_chapter)
+        archived = [
+            item
+            for item in self._load_archived(card.static.id)
+            if self._entry_key(order, item.chapter_id) <= until_key
+        ]
+        live = list(self._read_entries(card.static.id, entries))
+        summary = (
+            self._summary_from_legacy_state(card.initial_state)
+            if card.initial_state is not None
+            else CharacterSummary()
+        )
+        for mutation in self._merge_by_chapter(archived, live, order):
+            summary = self._replay_mutation(summary, mutation)
+        return summary
+
+    def _read_raw_lines(self, character_id: str, entries: Sequence[List]) -> Iterator[bytes]:
+        with self._log_path(character_id).open("rb") as handle:
+            for entry in entries:
+                handle.seek(entry[2])
+                line = handle.readline()
+                yield line if line.endswith(b"\n") else line + b"\n"
+
+    def compact_timeline(
+        self, before: str, character_ids: Optional[Sequence[str]] = None
+    ) -> Dict[str, int]:
+        """Fold mutations ordered before ``before`` into a stored baseline.
+
+        ``before`` is a chapter or volume id; every mutation whose chapter sorts
+        strictly earlier is replayed into ``timeline/baselines/<id>.yaml`` and
+        moved, unchanged, to the gzip archive ``timeline/archive/<id>.jsonl.gz``.
+        Replays then start from the baseline; states before it and
+        ``get_timeline(include_archived=True)`` still read the archive.
+        Returns the number of archived mutations per compacted character.
+        """
+        if character_ids is None:
+            character_ids = [item["id"] for item in self.list_characters()]
+        order = self.chapter_registry.snapshot()
+        before_order = order.ordinal(before)
+        compacted: Dict[str, int] = {}
+        for final_id in character_ids:
+            try:
+                card = self.get_character_card(character_id=final_id)
+            except FileNotFoundError:
+                continue
+            entries = self._load_log_index(final_id, order, persist=True)
+            cut = bisect_left(entries, before_order, key=lambda item: item[0])
+            if cut == 0:
+                continue
+
+            baseline = self._load_baseline(final_id)
+            checkpoints = self._load_checkpoints(final_id, order)
+            start, summary = self._replay_start(card, checkpoints, entries, cut, baseline)
+            last_mutation: Optional[StateMutation] = None
+            for last_mutation in self._read_entries(final_id, entries[start:cut]):
+                summary = self._replay_mutation(summary, last_mutation)
+            if last_mutation is None:
+                last_mutation = next(self._read_entries(final_id, [entries[cut - 1]]))
+
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self._archive_path(final_id), "ab") as archive:
+                for line in self._read_raw_lines(final_id, entries[:cut]):
+                    archive.write(line)
+
+            self.baselines_dir.mkdir(parents=True, exist_ok=True)
+            previous = int((baseline or {}).get("mutation_count", 0))
+            self._save_yaml(
+                self._baseline_path(final_id),
+                {
+                    "before": before,
+                    "mutation_count": previous + cut,
+                    "last_mutation_id": last_mutation.mutation_id,
+                    "summary": summary.model_dump(),
+                },
+            )
+
+            kept = entries[cut:]
+            remaining = list(self._read_raw_lines(final_id, kept))
+            offset = 0
+            for entry, line in zip(kept, remaining):
+                entry[2] = offset
+                entry[3] = len(line)
+                offset += len(line)
+            log_path = self._log_path(final_id)
+            tmp_path = log_path.with_name(f".{log_path.name}.tmp")
+            tmp_path.write_bytes(b"".join(remaining))
+            os.replace(tmp_path, log_path)
+
+            shifted = []
+            for item in checkpoints:
+                position = int(item.get("position", 0))
+                if position > cut:
+                    shifted.append({**item, "position": position - cut})
+            self._save_checkpoints(final_id, shifted, order)
+            self._save_log_index(final_id, kept, order, self._last_checkpoint(shifted))
+            compacted[final_id] = cut
+        return compacted
+
+    def _range_end(self, chapter_range: str) -> Optional[str]:
+        """Last chapter of a range such as ``ch_001-ch_010`` whose ends are outline ids.
+
+        Anything else ("1-10", "第1-10章", ids the outline does not list) is
+        only a label and never limits the replay.
+        """
+        match = RANGE_PATTERN.fullmatch(chapter_range.strip())
+        if match is None:
+            return None
+        known = self.chapter_registry.snapshot().ordinals
+        if match.group(1) not in known or match.group(2) not in known:
+            return None
+        return match.group(2)
+
+    def _snapshot_path(self, character_id: str, volume_id: str) -> Path:
+        return self.snapshots_dir / f"{character_id}_{volume_id}.md"
+
+    @staticmethod
+    def _render_snapshot(
+        card: CharacterCard,
+        summary: CharacterSummary,
+        volume_id: str,
+        chapter_range: str,
+    ) -> str:
         content_lines = [
             f"# {card.static.name} - {volume_id} 快照",
             "",
@@ -487,9 +1525,79 @@ class CharacterStateManager:
         else:
             for item in summary.items:
                 content_lines.append(f"- {item}")
+        return "\n".join(content_lines) + "\n"
+
+    def create_snapshot(
+        self,
+        *,
+        character_id: Optional[str] = None,
+        name: Optional[str] = None,
+        volume_id: str,
+        chapter_range: str = "",
+        until_chapter: Optional[str] = None,
+    ) -> Path:
+        """Write a volume snapshot of the state at ``until_chapter``.
 
-        snapshot_file.write_text("\n".join(content_lines) + "\n", encoding="utf-8")
+        ``until_chapter`` defaults to the end of ``chapter_range`` when that is
+        a range of outline chapter ids ("ch_001-ch_010"); otherwise the range
+        is just a label and the snapshot reflects the full timeline.
+        """
+        card = self.get_character_card(character_id=character_id, name=name)
+        if until_chapter is None:
+            until_chapter = self._range_end(chapter_range)
+        summary = self._rebuild_cards([card], until_chapter)[card.static.id]
+
+        snapshot_file = self._snapshot_path(card.static.id, volume_id)
+        snapshot_file.write_text(
+            self._render_snapshot(card, summary, volume_id, chapter_range), encoding="utf-8"
+        )
 
         card.current_snapshot = snapshot_file.name
         self.save_character_card(card)
         return snapshot_file
+
+    def create_snapshots(
+        self,
+        *,
+        volume_id: str,
+        until_chapter: Optional[str] = None,
+        chapter_range: str = "",
+        character_ids: Optional[Sequence[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Path]:
+        """Snapshot the whole cast (or ``character_ids``) for one volume.
+
+        States come from a single ``rebuild_all``-style pass, the markdown
+        files are rendered and written on a thread pool, and the cards are
+        then updated in one sweep without re-syncing the index per card.
+        """
+        if until_chapter is None:
+            until_chapter = self._range_end(chapter_range)
+        if character_ids is None:
+            character_ids = [item["id"] for item in self.list_characters()]
+        cards: List[CharacterCard] = []
+        for final_id in character_ids:
+            try:
+                cards.append(self.get_character_card(character_id=final_id))
+            except FileNotFoundError:
+                continue
+        if not cards:
+            return []
+        summaries = self._rebuild_cards(cards, until_chapter)
+
+        def write_one(card: CharacterCard) -> Path:
+            snapshot_file = self._snapshot_path(card.static.id, volume_id)
+            text = self._render_snapshot(
+                card, summaries[card.static.id], volume_id, chapter_range
+            )
+            self._atomic_write_text(snapshot_file, text)
+            return snapshot_file
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            paths = list(pool.map(write_one, cards))
+
+        # current_snapshot is not part of the index, so only the card files change.
+        for card, snapshot_file in zip(cards, paths):
+            card.current_snapshot = snapshot_file.name
+            self._write_card(card)
+        return paths
@@ -11,9 +11,11 @@ from rich.console import Console
 from rich.table import Table
 
 try:
+    from tools.chapter_registry import ChapterRegistry
     from tools.graph.foreshadowing_dag import ForeshadowingDAGManager
     from tools.models.foreshadowing import ForeshadowingNode
 except ImportError:  # pragma: no cover - supports legacy path injection
+    from chapter_registry import ChapterRegistry
     from graph.foreshadowing_dag import ForeshadowingDAGManager
     from models.foreshadowing import ForeshadowingNode
 
@@ -207,8 +209,9 @@ class ForeshadowingChecker:
                     }
                 )
 
-        # 按目标章节排序
-        timeline.sort(key=lambda x: x["target_chapter"])
+        # 按目标章节在大纲中的顺序排序
+        order = ChapterRegistry(self.project_dir, self.dag_manager.novel_id).snapshot()
+        timeline.sort(key=lambda x: (order.ordinal(x["target_chapter"]), x["target_chapter"]))
         return timeline
 
     def print_report(self, results: Dict[str, Any]):
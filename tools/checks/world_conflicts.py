@@ -0,0 +1,172 @@
+"""Incrementally maintained world graph conflict state.
+
+``WorldGraphManager.check_conflicts`` used to rescan every relation on each
+call. ``WorldConflictState`` keeps the derived data instead (relation key
+counts, dangling endpoint references and the ``above`` hierarchy), updates
+it per write and is persisted next to the graph so later processes can
+report conflicts without a scan. ``build`` is the full-scan fallback.
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from tools.graph.algorithms import component_cycle
+except ImportError:  # pragma: no cover - supports legacy path injection
+    from graph.algorithms import component_cycle
+
+RelationKey = Tuple[str, str, str]
+
+
+class WorldConflictState:
+    """Derived conflict data for one world graph."""
+
+    HIERARCHY_RELATION = "above"
+
+    def __init__(self) -> None:
+        self.key_counts: Dict[RelationKey, int] = {}
+        # (role, entity_id) per dangling endpoint, in relation order.
+        self.dangling: List[Tuple[str, str]] = []
+        self.hierarchy: Dict[str, List[str]] = {}
+        self.cycle: List[str] = []
+
+    @classmethod
+    def build(cls, graph: Any, find_cycle: Any) -> "WorldConflictState":
+        """Full scan of ``graph``; ``find_cycle`` maps an edge dict to a cycle path."""
+        state = cls()
+        for rel in graph.relations:
+            state._record(rel, graph.entities)
+        state.cycle = find_cycle(state.hierarchy)
+        return state
+
+    def _record(self, rel: Any, entities: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        errors: List[str] = []
+        warnings: List[str] = []
+        for role, entity_id in (("source", rel.source_id), ("target", rel.target_id)):
+            if entity_id not in entities:
+                self.dangling.append((role, entity_id))
+                errors.append(self._dangling_message(role, entity_id))
+        label = rel.relation
+        if rel.from_chapter or rel.until_chapter:
+            # The same relation over different chapter windows is not a duplicate.
+            label = f"{label}[{rel.from_chapter}~{rel.until_chapter}]"
+        key = (rel.source_id, label, rel.target_id)
+        count = self.key_counts.get(key, 0)
+        if count:
+            warnings.append(self._duplicate_message(key))
+        self.key_counts[key] = count + 1
+        if rel.relation == self.HIERARCHY_RELATION:
+            self.hierarchy.setdefault(rel.source_id, []).append(rel.target_id)
+        return errors, warnings
+
+    def relation_added(self, rel: Any, entities: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Update for one new relation and return the conflicts it introduced.
+
+        Key and endpoint checks are O(1); an ``above`` edge additionally
+        searches the hierarchy below its target for a path back to its source.
+        When it closes one, the edge's strongly connected component is
+        recomputed and its ``component_cycle`` reported, exactly as
+        ``find_cycles`` would; the state keeps the smallest such cycle, which
+        is what a full ``build`` reports.
+        """
+        errors, warnings = self._record(rel, entities)
+        if rel.relation == self.HIERARCHY_RELATION:
+            if self._path(rel.target_id, rel.source_id) is not None:
+                component = self._component(rel.source_id)
+                cycle = component_cycle(self.hierarchy, component)
+                errors.append(self._cycle_message(cycle))
+                # A component only grows; one holding the stored cycle replaces it.
+                if not self.cycle or self.cycle[0] in component or cycle < self.cycle:
+                    self.cycle = cycle
+        return {"errors": errors, "warnings": warnings}
+
+    def entity_upserted(self, entity_id: str) -> int:
+        """Resolve dangling references to ``entity_id``; returns how many."""
+        before = len(self.dangling)
+        if before:
+            self.dangling = [item for item in self.dangling if item[1] != entity_id]
+        return before - len(self.dangling)
+
+    def _path(self, start: str, goal: str) -> Optional[List[str]]:
+        """Iterative DFS path ``start -> ... -> goal`` over the hierarchy."""
+        if start == goal:
+            return [start]
+        parent: Dict[str, str] = {start: start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for nxt in self.hierarchy.get(node, []):
+                if nxt in parent:
+                    continue
+                parent[nxt] = node
+                if nxt == goal:
+                    path = [goal]
+                    while path[-1] != start:
+                        path.append(parent[path[-1]])
+                    path.reverse()
+                    return path
+                stack.append(nxt)
+        return None
+
+    @staticmethod
+    def _reachable(start: str, edges: Dict[str, List[str]]) -> Set[str]:
+        seen = {start}
+        stack = [start]
+        while stack:
+            for nxt in edges.get(stack.pop(), []):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    def _component(self, node: str) -> Set[str]:
+        """Strongly connected component of ``node``: below it and above it at once."""
+        reverse: Dict[str, List[str]] = {}
+        for source_id, targets in self.hierarchy.items():
+            for target_id in targets:
+                reverse.setdefault(target_id, []).append(source_id)
+        return self._reachable(node, self.hierarchy) & self._reachable(node, reverse)
+
+    @staticmethod
+    def _dangling_message(role: str, entity_id: str) -> str:
+        label = "源" if role == "source" else "目标"
+        return f"关系{label}实体不存在: {entity_id}"
+
+    @staticmethod
+    def _duplicate_message(key: RelationKey) -> str:
+        return f"重复关系: {key[0]}-{key[1]}->{key[2]}"
+
+    @staticmethod
+    def _cycle_message(cycle: List[str]) -> str:
+        return f"境界层级存在循环: {' -> '.join(cycle)}"
+
+    def report(self) -> Dict[str, List[str]]:
+        errors = [self._dangling_message(role, entity_id) for role, entity_id in self.dangling]
+        if self.cycle:
+            errors.append(self._cycle_message(self.cycle))
+        warnings = [
+            self._duplicate_message(key)
+            for key, count in self.key_counts.items()
+            for _ in range(count - 1)
+        ]
+        return {"errors": errors, "warnings": warnings}
+
+    @property
+    def relation_count(self) -> int:
+        return sum(self.key_counts.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "keys": [[*key, count] for key, count in self.key_counts.items()],
+            "dangling": [list(item) for item in self.dangling],
+            "hierarchy": self.hierarchy,
+            "cycle": self.cycle,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WorldConflictState":
+        state = cls()
+        state.key_counts = {(item[0], item[1], item[2]): int(item[3]) for item in data["keys"]}
+        state.dangling = [(item[0], item[1]) for item in data.get("dangling", [])]
+        state.hierarchy = {key: list(value) for key, value in data.get("hierarchy", {}).items()}
+        state.cycle = list(data.get("cycle", []))
+        return state
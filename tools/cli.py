@@ -30,10 +30,12 @@ character_app = typer.Typer(help="人物相关命令")
 outline_app = typer.Typer(help="大纲相关命令")
 world_app = typer.Typer(help="世界观图谱命令")
 simulate_app = typer.Typer(help="多Agent模拟命令")
+foreshadowing_app = typer.Typer(help="伏笔相关命令")
 app.add_typer(character_app, name="character")
 app.add_typer(outline_app, name="outline")
 app.add_typer(world_app, name="world")
 app.add_typer(simulate_app, name="simulate")
+app.add_typer(foreshadowing_app, name="foreshadowing")
 console = Console()
 
 
@@ -121,11 +123,12 @@ def character_create(
     name: str,
     tier: str = typer.Option("普通配角", help="人物层级"),
     faction: str = typer.Option("", help="所属势力"),
+    alias: list[str] = typer.Option([], "--alias", help="别名，可重复"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """创建人物卡。"""
     manager = _character_manager(Path.cwd(), novel_id)
-    card = manager.create_character(name=name, tier=tier, faction=faction)
+    card = manager.create_character(name=name, tier=tier, faction=faction, aliases=alias)
     console.print(f"[green]人物已创建:[/green] {card.static.name} ({card.static.id})")
 
 
@@ -134,10 +137,11 @@ def character_create_alias(
     name: str,
     tier: str = typer.Option("普通配角", help="人物层级"),
     faction: str = typer.Option("", help="所属势力"),
+    alias: list[str] = typer.Option([], "--alias", help="别名，可重复"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """兼容命令：character-create。"""
-    character_create(name=name, tier=tier, faction=faction, novel_id=novel_id)
+    character_create(name=name, tier=tier, faction=faction, alias=alias, novel_id=novel_id)
 
 
 @character_app.command("mutate")
@@ -161,6 +165,17 @@ def character_mutate(
         reason=reason,
     )
     note_text = mutation.note or "-"
+    realm_change = mutation.payload.get("realm_change")
+    if realm_change == "regression":
+        console.print(f"[yellow]警告:[/yellow] 境界倒退为 {mutation.payload.get('realm')}")
+    elif realm_change == "unranked":
+        console.print(
+            f"[yellow]警告:[/yellow] 境界 {mutation.payload.get('realm')} 未在世界观 above 层级中定义"
+        )
+    elif realm_change == "unordered":
+        console.print(
+            f"[yellow]警告:[/yellow] 境界 {mutation.payload.get('realm')} 与原境界不在同一 above 层级分支"
+        )
     if mutation.action:
         console.print(
             f"[green]时间线已记录:[/green] {mutation.mutation_id} "
@@ -194,11 +209,60 @@ def character_mutate_alias(
     )
 
 
+@character_app.command("mutate-batch")
+def character_mutate_batch(
+    file: Path = typer.Option(..., "--file", help="批量变更文件(YAML列表或含 changes 键)"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """批量记录人物时间线（全部校验通过后按人物一次性落盘）。"""
+    with file.open("r", encoding="utf-8") as handle:
+        data = yaml.safe_load(handle) or []
+    changes = data.get("changes", []) if isinstance(data, dict) else data
+    if not isinstance(changes, list):
+        raise typer.BadParameter("批量变更文件格式错误，应为列表或 changes: [...]")
+
+    manager = _character_manager(Path.cwd(), novel_id)
+    try:
+        mutations = manager.apply_mutations(changes)
+    except (ValueError, FileNotFoundError) as exc:
+        console.print(f"[red]批量变更未写入:[/red] {exc}")
+        raise typer.Exit(code=1)
+
+    per_character: dict[str, int] = {}
+    for character_id, _ in mutations:
+        per_character[character_id] = per_character.get(character_id, 0) + 1
+    summary = ", ".join(f"{key}×{count}" for key, count in per_character.items())
+    console.print(f"[green]已记录 {len(mutations)} 条时间线:[/green] {summary}")
+
+
+@character_app.command("migrate-logs")
+def character_migrate_logs(novel_id: Optional[str] = typer.Option(None, help="小说ID")):
+    """将旧版 YAML 时间线日志一次性迁移为 JSONL 追加日志。"""
+    manager = _character_manager(Path.cwd(), novel_id)
+    migrated = manager.migrate_legacy_logs()
+    if not migrated:
+        console.print("[yellow]没有需要迁移的旧版时间线日志[/yellow]")
+        return
+    console.print(f"[green]已迁移 {len(migrated)} 份时间线日志:[/green] {', '.join(migrated)}")
+
+
+@character_app.command("checkpoints")
+def character_checkpoints(novel_id: Optional[str] = typer.Option(None, help="小说ID")):
+    """重建时间线检查点（手动修改日志或大纲后使用）。"""
+    manager = _character_manager(Path.cwd(), novel_id)
+    added = manager.refresh_checkpoints()
+    if not added:
+        console.print("[yellow]检查点已是最新[/yellow]")
+        return
+    console.print(f"[green]已为 {len(added)} 个人物新增 {sum(added.values())} 个检查点[/green]")
+
+
 @character_app.command("snapshot")
 def character_snapshot(
     name: str,
     volume_id: str = typer.Option(..., help="卷ID，例如 vol_001"),
     chapter_range: str = typer.Option("", help="章节范围，例如 ch_001-ch_010"),
+    until: Optional[str] = typer.Option(None, help="重建到指定章节，例如 ch_010"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """生成人物卷快照。"""
@@ -207,6 +271,7 @@ def character_snapshot(
         name=name,
         volume_id=volume_id,
         chapter_range=chapter_range,
+        until_chapter=until,
     )
     console.print(f"[green]快照已生成:[/green] {snapshot_path}")
 
@@ -216,6 +281,7 @@ def character_snapshot_alias(
     name: str,
     volume_id: str = typer.Option(..., help="卷ID，例如 vol_001"),
     chapter_range: str = typer.Option("", help="章节范围，例如 ch_001-ch_010"),
+    until: Optional[str] = typer.Option(None, help="重建到指定章节，例如 ch_010"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """兼容命令：character-snapshot。"""
@@ -223,22 +289,61 @@ def character_snapshot_alias(
         name=name,
         volume_id=volume_id,
         chapter_range=chapter_range,
+        until=until,
         novel_id=novel_id,
     )
 
 
+@character_app.command("snapshot-all")
+def character_snapshot_all(
+    volume: str = typer.Option(..., help="卷ID，例如 vol_003"),
+    until: Optional[str] = typer.Option(None, help="重建到指定章节，例如 ch_150"),
+    chapter_range: str = typer.Option("", help="章节范围，例如 ch_101-ch_150"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """一次重建全员状态并批量生成卷快照。"""
+    manager = _character_manager(Path.cwd(), novel_id)
+    paths = manager.create_snapshots(
+        volume_id=volume,
+        until_chapter=until,
+        chapter_range=chapter_range,
+    )
+    if not paths:
+        console.print("[yellow]暂无人物，未生成快照[/yellow]")
+        return
+    console.print(f"[green]已生成 {len(paths)} 份快照:[/green] {manager.snapshots_dir}")
+
+
+@character_app.command("compact")
+def character_compact(
+    before: str = typer.Option(..., help="压缩此章节/卷之前的变更，例如 vol_002"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """将早期时间线折叠为基线状态，原始变更归档为压缩文件。"""
+    manager = _character_manager(Path.cwd(), novel_id)
+    compacted = manager.compact_timeline(before)
+    if not compacted:
+        console.print(f"[yellow]{before} 之前没有可压缩的变更[/yellow]")
+        return
+    console.print(
+        f"[green]已压缩 {len(compacted)} 个人物的 {sum(compacted.values())} 条变更[/green] "
+        f"(归档: {manager.archive_dir})"
+    )
+
+
 @character_app.command("query")
 def character_query(
     name: str,
     chapter: Optional[str] = typer.Option(None, help="重建到指定章节"),
     timeline: bool = typer.Option(False, help="显示时间线"),
+    archived: bool = typer.Option(False, help="时间线包含已压缩归档的变更"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """查询人物状态或时间线。"""
     query = CharacterQuery(project_dir=Path.cwd(), novel_id=novel_id or _detect_novel_id(Path.cwd()))
 
     if timeline:
-        rows = query.get_timeline(name)
+        rows = query.get_timeline(name, include_archived=archived)
         table = Table(show_header=True, header_style="bold cyan")
         table.add_column("Mutation ID")
         table.add_column("Chapter")
@@ -276,7 +381,99 @@ def character_query_alias(
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """兼容命令：character-query。"""
-    character_query(name=name, chapter=chapter, timeline=timeline, novel_id=novel_id)
+    character_query(
+        name=name, chapter=chapter, timeline=timeline, archived=False, novel_id=novel_id
+    )
+
+
+@character_app.command("state-at")
+def character_state_at(
+    chapter: str = typer.Option(..., "--chapter", help="章节ID，例如 ch_120"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """一次性重建全体人物在指定章节的状态。"""
+    query = CharacterQuery(project_dir=Path.cwd(), novel_id=novel_id or _detect_novel_id(Path.cwd()))
+    rows = query.get_cast_state_at(until_chapter=chapter)
+    table = Table(show_header=True, header_style="bold cyan", title=f"{chapter} 人物状态")
+    table.add_column("ID")
+    table.add_column("Name")
+    table.add_column("Realm")
+    table.add_column("Location")
+    table.add_column("Statuses")
+    table.add_column("Items")
+    for row in rows:
+        state = row["state"]
+        table.add_row(
+            row["id"],
+            row["name"],
+            state.get("realm") or "",
+            state.get("location") or "",
+            ",".join(state.get("statuses") or []),
+            ",".join(state.get("items") or []),
+        )
+    console.print(table)
+
+
+@character_app.command("diff")
+def character_diff(
+    name: str,
+    from_chapter: str = typer.Option(..., "--from", help="起始章节，例如 ch_040"),
+    to_chapter: str = typer.Option(..., "--to", help="结束章节，例如 ch_090"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """对比人物在两个章节之间的状态变化。"""
+    query = CharacterQuery(project_dir=Path.cwd(), novel_id=novel_id or _detect_novel_id(Path.cwd()))
+    try:
+        result = query.diff(name, from_chapter=from_chapter, to_chapter=to_chapter)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1)
+
+    console.print(f"[cyan]{result['name']} ({result['id']}) {from_chapter} → {to_chapter}[/cyan]")
+    if not result["changed"]:
+        console.print("  无变化")
+        return
+    for key, label in (("realm", "境界"), ("location", "位置")):
+        if result[key]:
+            console.print(f"  {label}: {result[key]['from']} → {result[key]['to']}")
+    statuses = result["statuses"]
+    if statuses["added"] or statuses["removed"]:
+        console.print(f"  状态标签: +{statuses['added']} -{statuses['removed']}")
+    items = result["items"]
+    for item, count in items["gained"].items():
+        console.print(f"  获得物品: {item} x{count}")
+    for item, count in items["lost"].items():
+        console.print(f"  失去物品: {item} x{count}")
+
+
+@character_app.command("changes")
+def character_changes(
+    chapter: str = typer.Option(..., "--chapter", help="章节ID，例如 ch_057"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="先从全部时间线重建章节索引"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """列出指定章节内全部人物的时间线变更。"""
+    final_novel_id = novel_id or _detect_novel_id(Path.cwd())
+    query = CharacterQuery(project_dir=Path.cwd(), novel_id=final_novel_id)
+    if rebuild:
+        total = query.manager.rebuild_chapter_index()
+        console.print(f"[cyan]章节索引已重建，共 {total} 条变更[/cyan]")
+    rows = query.get_chapter_changes(chapter)
+    table = Table(show_header=True, header_style="bold cyan", title=f"{chapter} 人物变更")
+    table.add_column("Character")
+    table.add_column("Mutation ID")
+    table.add_column("Action")
+    table.add_column("Note")
+    for row in rows:
+        action = row.get("action")
+        raw = (row.get("payload") or {}).get("raw", "")
+        table.add_row(
+            f"{row['name']} ({row['character_id']})",
+            row["mutation_id"],
+            f"{action}:{raw}" if action else "-",
+            row.get("note") or "",
+        )
+    console.print(table)
 
 
 @character_app.command("profile")
@@ -291,6 +488,9 @@ def character_profile(
     manager = _character_manager(Path.cwd(), novel_id)
     profile_path = manager.get_profile_path(name=name)
     console.print(f"[cyan]动态档案:[/cyan] {profile_path}")
+    if not profile_path.exists():
+        console.print("[yellow]动态档案不存在，可运行 character scaffold 生成模板[/yellow]")
+        return
     if preview_lines <= 0:
         return
 
@@ -300,6 +500,21 @@ def character_profile(
         console.print(preview)
 
 
+@character_app.command("scaffold")
+def character_scaffold(
+    name: Optional[str] = typer.Argument(None, help="人物名称，省略则修复全部人物"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """补齐缺失的人物动态主档模板（读取命令不会再自动创建）。"""
+    manager = _character_manager(Path.cwd(), novel_id)
+    created = manager.scaffold_profiles(name=name)
+    if not created:
+        console.print("[green]动态档案完整，无需修复[/green]")
+        return
+    for path in created:
+        console.print(f"[green]已创建动态档案:[/green] {path}")
+
+
 @app.command("character-profile")
 def character_profile_alias(
     name: str,
@@ -320,6 +535,7 @@ def world_entity_add(
     description: str = typer.Option("", help="实体描述"),
     tag: list[str] = typer.Option([], "--tag", help="标签，可重复"),
     attr: list[str] = typer.Option([], "--attr", help="属性 key=value，可重复"),
+    alias: list[str] = typer.Option([], "--alias", help="别名，可重复"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """添加或更新世界观实体。"""
@@ -331,6 +547,7 @@ def world_entity_add(
         description=description,
         tags=tag,
         attributes=_parse_world_attrs(attr),
+        aliases=alias,
     )
     console.print(f"[green]世界实体已保存:[/green] {entity.id} ({entity.name})")
 
@@ -343,6 +560,7 @@ def world_entity_add_alias(
     description: str = typer.Option("", help="实体描述"),
     tag: list[str] = typer.Option([], "--tag", help="标签，可重复"),
     attr: list[str] = typer.Option([], "--attr", help="属性 key=value，可重复"),
+    alias: list[str] = typer.Option([], "--alias", help="别名，可重复"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """兼容命令：world-entity-add。"""
@@ -353,6 +571,7 @@ def world_entity_add_alias(
         description=description,
         tag=tag,
         attr=attr,
+        alias=alias,
         novel_id=novel_id,
     )
 
@@ -364,21 +583,36 @@ def world_relation_add(
     relation: str = typer.Option(..., "--relation", help="关系类型"),
     weight: int = typer.Option(1, "--weight", help="关系权重(1-10)"),
     note: str = typer.Option("", "--note", help="备注"),
+    from_chapter: str = typer.Option("", "--from", help="关系生效的起始章节（含）"),
+    until_chapter: str = typer.Option("", "--until", help="关系有效的最后章节（含）"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """添加世界观关系。"""
     manager = _world_manager(Path.cwd(), novel_id)
-    created = manager.add_relation(
-        source_id=source,
-        target_id=target,
-        relation=relation,
-        weight=weight,
-        note=note,
-    )
+    try:
+        created = manager.add_relation(
+            source_id=source,
+            target_id=target,
+            relation=relation,
+            weight=weight,
+            note=note,
+            from_chapter=from_chapter,
+            until_chapter=until_chapter,
+        )
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1)
+    window = ""
+    if created.is_temporal:
+        window = f" [{created.from_chapter or '…'} ~ {created.until_chapter or '…'}]"
     console.print(
         f"[green]世界关系已添加:[/green] "
-        f"{created.source_id}-{created.relation}->{created.target_id}"
+        f"{created.source_id}-{created.relation}->{created.target_id}{window}"
     )
+    for message in manager.last_write_conflicts["errors"]:
+        console.print(f"[red]冲突:[/red] {message}")
+    for message in manager.last_write_conflicts["warnings"]:
+        console.print(f"[yellow]警告:[/yellow] {message}")
 
 
 @app.command("world-relation-add")
@@ -388,6 +622,8 @@ def world_relation_add_alias(
     relation: str = typer.Option(..., "--relation", help="关系类型"),
     weight: int = typer.Option(1, "--weight", help="关系权重(1-10)"),
     note: str = typer.Option("", "--note", help="备注"),
+    from_chapter: str = typer.Option("", "--from", help="关系生效的起始章节（含）"),
+    until_chapter: str = typer.Option("", "--until", help="关系有效的最后章节（含）"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """兼容命令：world-relation-add。"""
@@ -397,20 +633,109 @@ def world_relation_add_alias(
         relation=relation,
         weight=weight,
         note=note,
+        from_chapter=from_chapter,
+        until_chapter=until_chapter,
         novel_id=novel_id,
     )
 
 
+@world_app.command("import")
+def world_import(
+    file: Optional[Path] = typer.Option(
+        None, "--file", help="YAML/JSON 文件，含 entities 与 relations 列表"
+    ),
+    entities: Optional[Path] = typer.Option(None, "--entities", help="实体表(.csv/.jsonl)"),
+    relations: Optional[Path] = typer.Option(None, "--relations", help="关系表(.csv/.jsonl)"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """批量导入世界观实体与关系（流式读取、一次原子写入）。"""
+    if file is None and entities is None and relations is None:
+        raise typer.BadParameter("至少提供 --file、--entities 或 --relations 之一")
+    manager = _world_manager(Path.cwd(), novel_id)
+    try:
+        with manager.session():
+            entity_count = relation_count = duplicates = 0
+            if file is not None:
+                with file.open("r", encoding="utf-8") as handle:
+                    data = yaml.safe_load(handle) or {}
+                if not isinstance(data, dict):
+                    raise typer.BadParameter("导入文件格式错误，应包含 entities/relations")
+                entity_count, relation_count = manager.import_records(
+                    list(data.get("entities") or []), list(data.get("relations") or [])
+                )
+            if entities is not None or relations is not None:
+                stats = manager.import_tables(entities_path=entities, relations_path=relations)
+                entity_count += stats["entities"]
+                relation_count += stats["relations"]
+                duplicates = stats["duplicates"]
+    except ValueError as exc:
+        console.print(f"[red]导入未写入:[/red] {exc}")
+        raise typer.Exit(code=1)
+    message = f"[green]已导入 {entity_count} 个实体、{relation_count} 条关系[/green]"
+    if duplicates:
+        message += f"（跳过重复关系 {duplicates} 条）"
+    console.print(message)
+
+
+@world_app.command("export")
+def world_export(
+    entities: Optional[Path] = typer.Option(None, "--entities", help="实体表输出(.csv/.jsonl)"),
+    relations: Optional[Path] = typer.Option(None, "--relations", help="关系表输出(.csv/.jsonl)"),
+    format: Optional[str] = typer.Option(
+        None, "--format", help="整图导出格式 graphml/dot/jsonl（可视化用）"
+    ),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="整图导出文件路径"),
+    type: list[str] = typer.Option([], "--type", help="只导出该类型实体，可重复"),
+    relation: list[str] = typer.Option([], "--relation", help="只导出该类型关系，可重复"),
+    seed: list[str] = typer.Option([], "--seed", help="只导出该实体周边子图，可重复"),
+    hops: int = typer.Option(1, "--hops", min=0, help="--seed 子图的跳数"),
+    at: str = typer.Option("", "--at", help="只导出在该章节有效的关系"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """导出世界观：CSV/JSONL 表格，或 GraphML/DOT/JSONL 整图。"""
+    manager = _world_manager(Path.cwd(), novel_id)
+    if format is not None or output is not None:
+        target = output or Path(f"world_graph.{format}")
+        try:
+            stats = manager.export_graph(
+                target,
+                fmt=format,
+                entity_types=type,
+                relations=relation,
+                seeds=seed or None,
+                hops=hops,
+                at=at,
+            )
+        except ValueError as exc:
+            console.print(f"[red]{exc}[/red]")
+            raise typer.Exit(code=1)
+        console.print(
+            f"[green]已导出 {stats['nodes']} 个节点、{stats['edges']} 条边:[/green] {target}"
+        )
+        return
+    if entities is None and relations is None:
+        raise typer.BadParameter("至少提供 --entities、--relations 或 --format/--output 之一")
+    try:
+        stats = manager.export_tables(entities_path=entities, relations_path=relations)
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1)
+    console.print(
+        f"[green]已导出 {stats['entities']} 个实体、{stats['relations']} 条关系[/green]"
+    )
+
+
 @world_app.command("list")
 def world_list(
     type: str = typer.Option("", "--type", help="按实体类型过滤"),
     relation: str = typer.Option("", "--relation", help="按关系类型过滤"),
+    at: str = typer.Option("", "--at", help="只列出在该章节有效的关系"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """列出世界观实体与关系。"""
     manager = _world_manager(Path.cwd(), novel_id)
     entities = manager.list_entities(entity_type=type)
-    relations = manager.list_relations(relation=relation)
+    relations = manager.list_relations(relation=relation, at=at)
 
     entity_table = Table(show_header=True, header_style="bold cyan")
     entity_table.add_column("ID")
@@ -426,9 +751,13 @@ def world_list(
     relation_table.add_column("Relation")
     relation_table.add_column("Target")
     relation_table.add_column("Weight")
+    relation_table.add_column("Chapters")
     for item in relations:
+        window = ""
+        if item.is_temporal:
+            window = f"{item.from_chapter or '…'} ~ {item.until_chapter or '…'}"
         relation_table.add_row(
-            item.source_id, item.relation, item.target_id, str(item.weight)
+            item.source_id, item.relation, item.target_id, str(item.weight), window
         )
     console.print(relation_table)
 
@@ -437,24 +766,107 @@ def world_list(
 def world_list_alias(
     type: str = typer.Option("", "--type", help="按实体类型过滤"),
     relation: str = typer.Option("", "--relation", help="按关系类型过滤"),
+    at: str = typer.Option("", "--at", help="只列出在该章节有效的关系"),
     novel_id: Optional[str] = typer.Option(None, help="小说ID"),
 ):
     """兼容命令：world-list。"""
-    world_list(type=type, relation=relation, novel_id=novel_id)
+    world_list(type=type, relation=relation, at=at, novel_id=novel_id)
+
+
+@world_app.command("search")
+def world_search(
+    query: str = typer.Argument("", help="检索词，匹配名称/别名/标签/属性/描述"),
+    type: str = typer.Option("", "--type", help="按实体类型过滤"),
+    attr: list[str] = typer.Option([], "--attr", help="属性精确过滤 key=value，可重复"),
+    limit: int = typer.Option(20, "--limit", min=1, help="最多返回条数"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """全文检索世界观实体。"""
+    if not query.strip() and not type and not attr:
+        raise typer.BadParameter("至少提供检索词、--type 或 --attr 之一")
+    manager = _world_manager(Path.cwd(), novel_id)
+    results = manager.search_entities(
+        query, entity_type=type, attributes=_parse_world_attrs(attr), limit=limit
+    )
+    if not results:
+        console.print("[yellow]未找到匹配的世界观实体[/yellow]")
+        return
+    table = Table(show_header=True, header_style="bold cyan", title=f"检索: {query}")
+    table.add_column("ID")
+    table.add_column("Name")
+    table.add_column("Type")
+    table.add_column("Aliases")
+    table.add_column("Tags")
+    table.add_column("Score")
+    for entity, score in results:
+        table.add_row(
+            entity.id,
+            entity.name,
+            entity.type,
+            ",".join(entity.aliases),
+            ",".join(entity.tags),
+            f"{score:g}",
+        )
+    console.print(table)
+
+
+@world_app.command("neighbors")
+def world_neighbors(
+    entity_id: str,
+    relation: str = typer.Option("", "--relation", help="按关系类型过滤"),
+    direction: str = typer.Option("both", "--direction", help="out/in/both"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """列出实体的出边/入边邻居。"""
+    if direction not in {"out", "in", "both"}:
+        raise typer.BadParameter(f"--direction 只能是 out/in/both: {direction}")
+    manager = _world_manager(Path.cwd(), novel_id)
+    table = Table(show_header=True, header_style="bold cyan", title=f"{entity_id} 邻居")
+    table.add_column("Direction")
+    table.add_column("Relation")
+    table.add_column("Entity")
+    table.add_column("Name")
+    table.add_column("Weight")
+    if direction in {"out", "both"}:
+        for rel, target in manager.related_entities(entity_id=entity_id, relation=relation):
+            table.add_row("->", rel.relation, target.id, target.name, str(rel.weight))
+    if direction in {"in", "both"}:
+        for rel, source in manager.incoming_entities(entity_id=entity_id, relation=relation):
+            table.add_row("<-", rel.relation, source.id, source.name, str(rel.weight))
+    console.print(table)
 
 
 @world_app.command("check")
-def world_check(novel_id: Optional[str] = typer.Option(None, help="小说ID")):
+def world_check(
+    full: bool = typer.Option(False, "--full", help="忽略增量状态，全量重新扫描"),
+    relation: str = typer.Option("above", "--relation", help="环检测使用的关系类型"),
+    all_cycles: bool = typer.Option(False, "--all-cycles", help="列出该关系上的全部循环"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
     """检查世界观图谱一致性。"""
     manager = _world_manager(Path.cwd(), novel_id)
-    result = manager.check_conflicts()
+    if all_cycles:
+        cycles = manager.find_cycles(relation)
+        if not cycles:
+            console.print(f"[green]{relation} 关系无循环[/green]")
+            return
+        console.print(f"[red]{relation} 关系存在 {len(cycles)} 个循环:[/red]")
+        for number, cycle in enumerate(cycles, start=1):
+            console.print(f"  {number}. {' -> '.join(cycle)}")
+        raise typer.Exit(code=1)
+    result = manager.check_conflicts(full=full)
     console.print(result)
 
 
 @app.command("world-check")
-def world_check_alias(novel_id: Optional[str] = typer.Option(None, help="小说ID")):
+def world_check_alias(
+    full: bool = typer.Option(False, "--full", help="忽略增量状态，全量重新扫描"),
+    relation: str = typer.Option("above", "--relation", help="环检测使用的关系类型"),
+    all_cycles: bool = typer.Option(False, "--all-cycles", help="列出该关系上的全部循环"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
     """兼容命令：world-check。"""
-    world_check(novel_id=novel_id)
+    world_check(full=full, relation=relation, all_cycles=all_cycles, novel_id=novel_id)
 
 
 @outline_app.command("init")
@@ -475,6 +887,30 @@ def outline_create(type: str, id: str, title: str = ""):
     console.print("[green]大纲创建完成[/green]")
 
 
+@foreshadowing_app.command("export")
+@app.command("foreshadowing-export")
+def foreshadowing_export(
+    output: Path = typer.Option(..., "--output", "-o", help="导出文件(.graphml/.dot/.jsonl)"),
+    format: Optional[str] = typer.Option(None, "--format", help="graphml/dot/jsonl，默认按后缀"),
+    layer: list[str] = typer.Option([], "--layer", help="只导出该层级伏笔，可重复"),
+    status: list[str] = typer.Option([], "--status", help="只导出该状态伏笔，可重复"),
+    min_weight: int = typer.Option(1, "--min-weight", min=1, max=10, help="最低权重"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
+    """导出伏笔 DAG 为 GraphML/DOT/JSONL。"""
+    manager = _foreshadowing_manager(Path.cwd(), novel_id)
+    try:
+        stats = manager.export_graph(
+            output, fmt=format, layers=layer, statuses=status, min_weight=min_weight
+        )
+    except ValueError as exc:
+        console.print(f"[red]{exc}[/red]")
+        raise typer.Exit(code=1)
+    console.print(
+        f"[green]已导出 {stats['nodes']} 个节点、{stats['edges']} 条边:[/green] {output}"
+    )
+
+
 @app.command("foreshadowing-add")
 def foreshadowing_add(
     id: str,
@@ -500,17 +936,31 @@ def foreshadowing_add(
         console.print(f"[yellow]伏笔未添加（可能已存在）:[/yellow] {id}")
 
 
+@foreshadowing_app.command("list")
 @app.command("foreshadowing-list")
-def foreshadowing_list(novel_id: Optional[str] = typer.Option(None, help="小说ID")):
+def foreshadowing_list(
+    topo: bool = typer.Option(False, "--topo", help="按依赖拓扑序排列（前置伏笔在前）"),
+    novel_id: Optional[str] = typer.Option(None, help="小说ID"),
+):
     """列出所有伏笔。"""
     manager = _foreshadowing_manager(Path.cwd(), novel_id)
     dag = manager._load_dag()
+    node_ids = list(dag.nodes)
+    if topo:
+        node_ids = manager.topological_order()
+        ordered = set(node_ids)
+        cyclic = [node_id for node_id in dag.nodes if node_id not in ordered]
+        if cyclic:
+            console.print(
+                f"[red]以下伏笔处于或依赖循环，未参与排序:[/red] {', '.join(cyclic)}"
+            )
     table = Table(show_header=True, header_style="bold cyan")
     table.add_column("ID")
     table.add_column("Layer")
     table.add_column("Weight")
     table.add_column("Status")
-    for node_id, node in dag.nodes.items():
+    for node_id in node_ids:
+        node = dag.nodes[node_id]
         layer = node.layer if hasattr(node, "layer") else node.get("layer", "")
         weight = node.weight if hasattr(node, "weight") else node.get("weight", 0)
         status = dag.status.get(node_id, "")
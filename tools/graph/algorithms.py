@@ -0,0 +1,280 @@
+"""Iterative graph algorithms shared by the world graph and foreshadowing DAG.
+
+Traversal functions take adjacency as ``{node: [successor, ...]}`` and run
+without recursion, so deep chains (thousands of realms or foreshadowing
+links) never hit Python's recursion limit.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional at runtime
+    np = None
+
+Adjacency = Mapping[str, Iterable[str]]
+
+
+def _nodes(edges: Adjacency) -> List[str]:
+    """Every node mentioned by ``edges``, in first-appearance order."""
+    seen: Dict[str, None] = {}
+    for node, successors in edges.items():
+        seen.setdefault(node)
+        for successor in successors:
+            seen.setdefault(successor)
+    return list(seen)
+
+
+def strongly_connected_components(edges: Adjacency) -> List[List[str]]:
+    """Tarjan's algorithm with an explicit stack; O(V + E).
+
+    Components are returned in reverse topological order (sinks first), each
+    listing its nodes in discovery order.
+    """
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Dict[str, bool] = {}
+    stack: List[str] = []
+    components: List[List[str]] = []
+    counter = 0
+
+    for root in _nodes(edges):
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work: List[Tuple[str, Iterator[str]]] = [(root, iter(edges.get(root, ())))]
+        while work:
+            node, successors = work[-1]
+            descended = False
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, iter(edges.get(successor, ()))))
+                    descended = True
+                    break
+                if on_stack.get(successor):
+                    low[node] = min(low[node], index[successor])
+            if descended:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component: List[str] = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                component.reverse()
+                components.append(component)
+    return components
+
+
+def _cycle_through(edges: Adjacency, start: str, members: Iterable[str]) -> List[str]:
+    """Shortest closed path ``start -> ... -> start`` inside one component."""
+    allowed = set(members)
+    parent: Dict[str, str] = {}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for successor in edges.get(node, ()):
+            if successor not in allowed:
+                continue
+            if successor == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path + [start]
+            if successor not in parent:
+                parent[successor] = node
+                queue.append(successor)
+    return []
+
+
+def component_cycle(edges: Adjacency, members: Iterable[str]) -> List[str]:
+    """Canonical cycle of one strongly connected component.
+
+    The shortest closed path through the component's smallest node id, so
+    the result depends only on the component's edges (in ``edges`` order),
+    not on where a search entered it; ``[]`` if the component is acyclic.
+    """
+    allowed = set(members)
+    return _cycle_through(edges, min(allowed), allowed)
+
+
+def find_cycles(edges: Adjacency) -> List[List[str]]:
+    """One ``component_cycle`` per cyclic strongly connected component.
+
+    Each cycle is a closed path (first node repeated at the end) and cycles
+    are sorted by that path; self-loops count as cycles.
+    """
+    cycles: List[List[str]] = []
+    for component in strongly_connected_components(edges):
+        start = component[0]
+        if len(component) == 1 and start not in set(edges.get(start, ())):
+            continue
+        cycles.append(component_cycle(edges, component))
+    cycles.sort()
+    return cycles
+
+
+def find_cycle(edges: Adjacency) -> List[str]:
+    """First cycle found by ``find_cycles``, or ``[]`` for an acyclic graph."""
+    cycles = find_cycles(edges)
+    return cycles[0] if cycles else []
+
+
+def find_path(edges: Adjacency, start: str, goal: str) -> List[str]:
+    """Shortest path ``start -> ... -> goal`` by BFS, or ``[]``; O(V + E)."""
+    if start == goal:
+        return [start]
+    parent: Dict[str, str] = {start: start}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for successor in edges.get(node, ()):
+            if successor in parent:
+                continue
+            parent[successor] = node
+            if successor == goal:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path
+            queue.append(successor)
+    return []
+
+
+def topological_order(edges: Adjacency) -> List[str]:
+    """Kahn's algorithm; nodes on or behind a cycle are left out. O(V + E)."""
+    nodes = _nodes(edges)
+    indegree: Dict[str, int] = {node: 0 for node in nodes}
+    for successors in edges.values():
+        for successor in successors:
+            indegree[successor] += 1
+    queue = deque(node for node in nodes if indegree[node] == 0)
+    order: List[str] = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for successor in edges.get(node, ()):
+            indegree[successor] -= 1
+            if indegree[successor] == 0:
+                queue.append(successor)
+    return order
+
+
+def longest_path_heights(edges: Adjacency) -> Dict[str, int]:
+    """Height of every node not on, above or below a cycle (sinks are 0).
+
+    If ``a`` reaches ``b`` then ``height[a] > height[b]``, which turns
+    reachability tests on a hierarchy into an integer comparison.
+    """
+    heights: Dict[str, int] = {}
+    for node in reversed(topological_order(edges)):
+        best = 0
+        for successor in edges.get(node, ()):
+            if successor not in heights:
+                break
+            best = max(best, heights[successor] + 1)
+        else:
+            heights[node] = best
+    return heights
+
+
+def weighted_pagerank(
+    nodes: Sequence[str],
+    edges: Iterable[Tuple[str, str, float]],
+    damping: float = 0.85,
+    tol: float = 1.0e-8,
+    max_iter: int = 100,
+) -> Dict[str, float]:
+    """PageRank over weighted ``(source, target, weight)`` edges.
+
+    Each iteration is O(V + E): edges are kept as parallel source/target/weight
+    arrays (COO form) and scattered with ``numpy.bincount`` when NumPy is
+    available, or plain loops otherwise. Edges to unknown nodes are ignored and
+    the rank of sink nodes is spread evenly. Scores sum to 1.
+    """
+    position = {node: order for order, node in enumerate(nodes)}
+    count = len(position)
+    if not count:
+        return {}
+    sources: List[int] = []
+    targets: List[int] = []
+    weights: List[float] = []
+    for source, target, weight in edges:
+        if source in position and target in position and weight > 0:
+            sources.append(position[source])
+            targets.append(position[target])
+            weights.append(float(weight))
+    if np is not None:
+        scores = _pagerank_numpy(count, sources, targets, weights, damping, tol, max_iter)
+    else:
+        scores = _pagerank_python(count, sources, targets, weights, damping, tol, max_iter)
+    return {node: float(scores[order]) for node, order in position.items()}
+
+
+def _pagerank_numpy(
+    count: int,
+    sources: List[int],
+    targets: List[int],
+    weights: List[float],
+    damping: float,
+    tol: float,
+    max_iter: int,
+) -> Sequence[float]:
+    src = np.asarray(sources, dtype=np.int64)
+    dst = np.asarray(targets, dtype=np.int64)
+    out_weight = np.bincount(src, weights=weights, minlength=count)
+    # Fraction of its rank each edge carries away from its source.
+    share = np.asarray(weights, dtype=float) / out_weight[src] if len(src) else np.zeros(0)
+    sinks = out_weight == 0
+    rank = np.full(count, 1.0 / count)
+    for _ in range(max_iter):
+        spread = np.bincount(dst, weights=rank[src] * share, minlength=count)
+        updated = (1.0 - damping) / count + damping * (spread + rank[sinks].sum() / count)
+        delta = np.abs(updated - rank).sum()
+        rank = updated
+        if delta < tol:
+            break
+    return rank
+
+
+def _pagerank_python(
+    count: int,
+    sources: List[int],
+    targets: List[int],
+    weights: List[float],
+    damping: float,
+    tol: float,
+    max_iter: int,
+) -> Sequence[float]:
+    out_weight = [0.0] * count
+    for source, weight in zip(sources, weights):
+        out_weight[source] += weight
+    share = [weight / out_weight[source] for source, weight in zip(sources, weights)]
+    sinks = [node for node in range(count) if out_weight[node] == 0]
+    rank = [1.0 / count] * count
+    for _ in range(max_iter):
+        sink_mass = sum(rank[node] for node in sinks) / count
+        updated = [(1.0 - damping) / count + damping * sink_mass] * count
+        for source, target, fraction in zip(sources, targets, share):
+            updated[target] += damping * rank[source] * fraction
+        delta = sum(abs(new - old) for new, old in zip(updated, rank))
+        rank = updated
+        if delta < tol:
+            break
+    return rank
@@ -0,0 +1,287 @@
+"""Inverted index over world entities for ``world search``.
+
+Names, aliases, tags, attribute values and descriptions are split into
+tokens: CJK runs become single characters plus overlapping bigrams, other
+runs become lowercase words. Each posting records the best field weight the
+token reached in that entity, so name hits outrank description hits.
+
+Posting lists are append-only arrays of document numbers: an upsert
+tombstones the entity's old document and appends a new one, and the lists
+are compacted once tombstones outnumber live documents. Queries scan the
+shortest posting list and check the remaining tokens against each
+candidate's own token map.
+
+``to_dict``/``from_dict`` let a caller persist the index instead of
+re-tokenizing every entity. Posting lists are stored as base64 uint32
+arrays and each document's tokens as one space-joined string per weight;
+a loaded document's token map is only unpacked when a query first needs it.
+"""
+
+import base64
+import heapq
+import re
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, MutableSequence, Optional, Set, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+")
+
+FIELD_WEIGHTS = {"name": 4.0, "aliases": 3.0, "tags": 2.0, "attributes": 1.0, "description": 1.0}
+EXACT_NAME_BONUS = 10.0
+
+# Token weights of a document: a token -> weight map, or the packed
+# ``[[weight, "token token ..."], ...]`` form read from ``to_dict`` output.
+_Weights = Any
+_Document = Tuple[str, _Weights, str, List[Tuple[str, str]], List[str]]
+
+# Persisted postings are little-endian 4-byte unsigned document numbers.
+_POSTING_TYPE = "I" if array("I").itemsize == 4 else "L"
+
+
+def _encode_posting(posting: MutableSequence[int]) -> str:
+    packed = array(_POSTING_TYPE, posting)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _decode_posting(text: str) -> MutableSequence[int]:
+    packed = array(_POSTING_TYPE)
+    packed.frombytes(base64.b64decode(text))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed
+
+
+def _pack_weights(weights: _Weights) -> List[List[Any]]:
+    if isinstance(weights, list):
+        return weights
+    groups: Dict[float, List[str]] = {}
+    for token, weight in weights.items():
+        groups.setdefault(weight, []).append(token)
+    return [[weight, " ".join(tokens)] for weight, tokens in groups.items()]
+
+
+def _is_cjk(run: str) -> bool:
+    return not run[0].isascii()
+
+
+def index_tokens(text: str) -> Iterator[str]:
+    """Tokens stored for ``text``: CJK unigrams and bigrams, words otherwise."""
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if not _is_cjk(run):
+            yield run
+            continue
+        yield from run
+        yield from map("".join, zip(run, run[1:]))
+
+
+def _text_tokens(texts: List[str]) -> Set[str]:
+    tokens: Set[str] = set()
+    for text in texts:
+        if text:
+            tokens.update(index_tokens(text))
+    return tokens
+
+
+def query_tokens(text: str) -> List[str]:
+    """Tokens a query must match: bigrams for CJK runs longer than one char."""
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _is_cjk(run) and len(run) > 1:
+            tokens.extend(run[start : start + 2] for start in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return list(dict.fromkeys(tokens))
+
+
+class EntitySearchIndex:
+    """Token -> document postings plus exact type/attribute/name lookups."""
+
+    def __init__(self) -> None:
+        # Lists while built in memory, uint32 arrays once loaded from disk.
+        self.postings: Dict[str, MutableSequence[int]] = {}
+        self.by_type: Dict[str, Set[str]] = {}
+        self.by_attribute: Dict[Tuple[str, str], Set[str]] = {}
+        self.by_label: Dict[str, Set[str]] = {}
+        # Document number -> (entity id, token weights, type, attributes,
+        # labels); ``None`` marks a tombstone.
+        self._documents: List[Optional[_Document]] = []
+        self._document_of: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, entities: Iterable[Any]) -> "EntitySearchIndex":
+        index = cls()
+        for entity in entities:
+            index.upsert(entity)
+        return index
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready form; tombstones are compacted away first."""
+        if len(self._documents) != len(self._document_of):
+            self._compact()
+        return {
+            "documents": [
+                [
+                    entity_id,
+                    _pack_weights(weights),
+                    entity_type,
+                    [list(pair) for pair in attributes],
+                    labels,
+                ]
+                for entity_id, weights, entity_type, attributes, labels in self._documents
+            ],
+            "postings": {
+                token: _encode_posting(posting) for token, posting in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EntitySearchIndex":
+        index = cls()
+        index.postings = {
+            token: _decode_posting(text) for token, text in data["postings"].items()
+        }
+        for number, item in enumerate(data["documents"]):
+            entity_id, weights, entity_type, raw_attributes, labels = item
+            attributes = [(key, value) for key, value in raw_attributes]
+            index._documents.append((entity_id, weights, entity_type, attributes, labels))
+            index._document_of[entity_id] = number
+            index._register(entity_id, entity_type, attributes, labels)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._document_of)
+
+    def upsert(self, entity: Any) -> None:
+        """Index ``entity`` (a ``WorldEntity``), replacing any previous version."""
+        self.remove(entity.id)
+        # Lowest weight first so each token ends up with its best field's weight.
+        weights: Dict[str, float] = {}
+        for field_name, texts in (
+            ("description", [entity.description]),
+            ("attributes", list(entity.attributes.values())),
+            ("tags", list(entity.tags)),
+            ("aliases", list(entity.aliases)),
+            ("name", [entity.name]),
+        ):
+            weights.update(dict.fromkeys(_text_tokens(texts), FIELD_WEIGHTS[field_name]))
+        number = len(self._documents)
+        postings = self.postings
+        for token in weights:
+            posting = postings.get(token)
+            if posting is None:
+                postings[token] = [number]
+            else:
+                posting.append(number)
+        attributes = [(key, str(value)) for key, value in entity.attributes.items()]
+        labels = list(dict.fromkeys(label.lower() for label in [entity.name, *entity.aliases]))
+        self._register(entity.id, entity.type, attributes, labels)
+        self._documents.append((entity.id, weights, entity.type, attributes, labels))
+        self._document_of[entity.id] = number
+
+    def _register(
+        self,
+        entity_id: str,
+        entity_type: str,
+        attributes: List[Tuple[str, str]],
+        labels: List[str],
+    ) -> None:
+        self.by_type.setdefault(entity_type, set()).add(entity_id)
+        for pair in attributes:
+            self.by_attribute.setdefault(pair, set()).add(entity_id)
+        for label in labels:
+            self.by_label.setdefault(label, set()).add(entity_id)
+
+    def remove(self, entity_id: str) -> None:
+        number = self._document_of.pop(entity_id, None)
+        if number is None:
+            return
+        document = self._documents[number]
+        self._documents[number] = None
+        _, _, entity_type, attributes, labels = document
+        self._discard(self.by_type, entity_type, entity_id)
+        for pair in attributes:
+            self._discard(self.by_attribute, pair, entity_id)
+        for label in labels:
+            self._discard(self.by_label, label, entity_id)
+        if len(self._documents) > 2 * len(self._document_of) + 64:
+            self._compact()
+
+    @staticmethod
+    def _discard(table: Dict[Any, Set[str]], key: Any, entity_id: str) -> None:
+        members = table.get(key)
+        if members is None:
+            return
+        members.discard(entity_id)
+        if not members:
+            del table[key]
+
+    def _compact(self) -> None:
+        """Drop tombstones and renumber the live documents."""
+        live = [document for document in self._documents if document is not None]
+        self._documents = live
+        self._document_of = {document[0]: number for number, document in enumerate(live)}
+        self.postings = {}
+        for number in range(len(live)):
+            for token in self._weights(number):
+                self.postings.setdefault(token, []).append(number)
+
+    def _weights(self, number: int) -> Dict[str, float]:
+        """Token weights of a live document, unpacking a loaded one on first use."""
+        document = self._documents[number]
+        weights = document[1]
+        if isinstance(weights, list):
+            unpacked: Dict[str, float] = {}
+            for weight, tokens in weights:
+                unpacked.update(dict.fromkeys(tokens.split(" "), weight))
+            weights = unpacked
+            self._documents[number] = (document[0], weights, *document[2:])
+        return weights
+
+    def search(
+        self,
+        query: str = "",
+        *,
+        entity_type: str = "",
+        attributes: Optional[Dict[str, str]] = None,
+        limit: int = 20,
+    ) -> List[Tuple[str, float]]:
+        """Top ``limit`` ``(entity_id, score)`` pairs matching every query token.
+
+        Only the shortest posting list is scanned, type/attribute filters are
+        set lookups, and only the top ``limit`` results are ordered.
+        """
+        filters: List[Set[str]] = []
+        if entity_type:
+            filters.append(self.by_type.get(entity_type, set()))
+        for pair in (attributes or {}).items():
+            filters.append(self.by_attribute.get(pair, set()))
+
+        tokens = query_tokens(query)
+        scores: Dict[str, float] = {}
+        if tokens:
+            lists = [self.postings.get(token) for token in tokens]
+            if not all(lists):
+                return []
+            shortest = min(lists, key=len)
+            for number in shortest:
+                document = self._documents[number]
+                if document is None:
+                    continue
+                weights = self._weights(number)
+                if all(token in weights for token in tokens):
+                    scores[document[0]] = sum(weights[token] for token in tokens)
+            for entity_id in self.by_label.get(query.strip().lower(), ()):
+                if entity_id in scores:
+                    scores[entity_id] += EXACT_NAME_BONUS
+        elif filters:
+            scores = dict.fromkeys(min(filters, key=len), 0.0)
+        else:
+            return []
+
+        for members in filters:
+            scores = {
+                entity_id: score for entity_id, score in scores.items() if entity_id in members
+            }
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
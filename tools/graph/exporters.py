@@ -0,0 +1,186 @@
+"""Streaming GraphML / DOT / JSONL writers for the world graph and foreshadowing DAG.
+
+Nodes and edges arrive as iterables of ``(id, attrs)`` and
+``(source, target, attrs)`` and are written one element at a time, so the
+exporter never builds a second copy of the graph. Output goes to a temporary
+file that replaces ``path`` only after the last element is written.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+GRAPH_FORMATS = ("graphml", "dot", "jsonl")
+LIST_SEPARATOR = "|"
+
+NodeRow = Tuple[str, Dict[str, Any]]
+EdgeRow = Tuple[str, str, Dict[str, Any]]
+
+
+def graph_format(path: Path, fmt: Optional[str] = None) -> str:
+    """Explicit ``fmt``, else the format implied by ``path``'s suffix."""
+    chosen = (fmt or path.suffix.lstrip(".") or "").lower()
+    if chosen == "gv":
+        chosen = "dot"
+    if chosen not in GRAPH_FORMATS:
+        raise ValueError(f"不支持的图导出格式: {chosen or path.name}（仅支持 graphml/dot/jsonl）")
+    return chosen
+
+
+def _flat(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return "" if value is None else str(value)
+
+
+def _graphml_type(value_type: type) -> str:
+    if value_type is bool:
+        return "boolean"
+    if value_type is int:
+        return "int"
+    if value_type is float:
+        return "double"
+    return "string"
+
+
+def _write_graphml(
+    handle: TextIO,
+    name: str,
+    nodes: Iterable[NodeRow],
+    edges: Iterable[EdgeRow],
+    node_keys: Dict[str, type],
+    edge_keys: Dict[str, type],
+) -> Tuple[int, int]:
+    handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    handle.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    for domain, keys in (("node", node_keys), ("edge", edge_keys)):
+        for key, value_type in keys.items():
+            key_id = quoteattr(f"{domain[0]}_{key}")
+            handle.write(
+                f"  <key id={key_id} for=\"{domain}\" attr.name={quoteattr(key)} "
+                f"attr.type=\"{_graphml_type(value_type)}\"/>\n"
+            )
+    handle.write(f"  <graph id={quoteattr(name)} edgedefault=\"directed\">\n")
+
+    def data(prefix: str, attrs: Dict[str, Any]) -> str:
+        parts = []
+        for key, value in attrs.items():
+            if value is None or value == "" or value == []:
+                continue
+            if isinstance(value, bool):
+                text = "true" if value else "false"
+            else:
+                text = escape(_flat(value))
+            parts.append(f"<data key={quoteattr(f'{prefix}_{key}')}>{text}</data>")
+        return "".join(parts)
+
+    node_count = edge_count = 0
+    for node_id, attrs in nodes:
+        handle.write(f"    <node id={quoteattr(node_id)}>{data('n', attrs)}</node>\n")
+        node_count += 1
+    for source, target, attrs in edges:
+        handle.write(
+            f"    <edge source={quoteattr(source)} target={quoteattr(target)}>"
+            f"{data('e', attrs)}</edge>\n"
+        )
+        edge_count += 1
+    handle.write("  </graph>\n</graphml>\n")
+    return node_count, edge_count
+
+
+def _dot_quote(value: Any) -> str:
+    text = _flat(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{text}"'
+
+
+def _dot_attrs(attrs: Dict[str, Any]) -> str:
+    parts = [
+        f"{_dot_quote(key)}={_dot_quote(value)}"
+        for key, value in attrs.items()
+        if value is not None and value != "" and value != []
+    ]
+    return f" [{', '.join(parts)}]" if parts else ""
+
+
+def _write_dot(
+    handle: TextIO, name: str, nodes: Iterable[NodeRow], edges: Iterable[EdgeRow]
+) -> Tuple[int, int]:
+    handle.write(f"digraph {_dot_quote(name)} {{\n")
+    node_count = edge_count = 0
+    for node_id, attrs in nodes:
+        handle.write(f"  {_dot_quote(node_id)}{_dot_attrs(attrs)};\n")
+        node_count += 1
+    for source, target, attrs in edges:
+        handle.write(f"  {_dot_quote(source)} -> {_dot_quote(target)}{_dot_attrs(attrs)};\n")
+        edge_count += 1
+    handle.write("}\n")
+    return node_count, edge_count
+
+
+def _write_jsonl(
+    handle: TextIO, nodes: Iterable[NodeRow], edges: Iterable[EdgeRow]
+) -> Tuple[int, int]:
+    node_count = edge_count = 0
+    for node_id, attrs in nodes:
+        handle.write(json.dumps({"kind": "node", "id": node_id, **attrs}, ensure_ascii=False))
+        handle.write("\n")
+        node_count += 1
+    for source, target, attrs in edges:
+        row = {"kind": "edge", "source": source, "target": target, **attrs}
+        handle.write(json.dumps(row, ensure_ascii=False))
+        handle.write("\n")
+        edge_count += 1
+    return node_count, edge_count
+
+
+def write_graph(
+    path: Path,
+    nodes: Iterable[NodeRow],
+    edges: Iterable[EdgeRow],
+    *,
+    fmt: Optional[str] = None,
+    name: str = "graph",
+    node_keys: Optional[Dict[str, type]] = None,
+    edge_keys: Optional[Dict[str, type]] = None,
+) -> Dict[str, int]:
+    """Stream ``nodes`` then ``edges`` to ``path``; returns ``{nodes, edges}`` counts.
+
+    ``node_keys``/``edge_keys`` declare GraphML attribute names and value
+    types up front (GraphML needs them before the first node); attributes
+    not declared there are dropped from GraphML output only.
+    """
+    chosen = graph_format(path, fmt)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with tmp_path.open("w", encoding="utf-8", newline="\n") as handle:
+            if chosen == "graphml":
+                declared_nodes = node_keys or {}
+                declared_edges = edge_keys or {}
+                counts = _write_graphml(
+                    handle,
+                    name,
+                    ((node_id, _declared(attrs, declared_nodes)) for node_id, attrs in nodes),
+                    (
+                        (source, target, _declared(attrs, declared_edges))
+                        for source, target, attrs in edges
+                    ),
+                    declared_nodes,
+                    declared_edges,
+                )
+            elif chosen == "dot":
+                counts = _write_dot(handle, name, nodes, edges)
+            else:
+                counts = _write_jsonl(handle, nodes, edges)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return {"nodes": counts[0], "edges": counts[1]}
+
+
+def _declared(attrs: Dict[str, Any], keys: Dict[str, type]) -> Dict[str, Any]:
+    return {key: value for key, value in attrs.items() if key in keys}
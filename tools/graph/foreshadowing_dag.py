@@ -1,20 +1,27 @@
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 try:
+    from tools.graph.algorithms import find_cycles, find_path, topological_order
+    from tools.graph.exporters import write_graph
     from tools.models.foreshadowing import (
         ForeshadowingEdge,
         ForeshadowingGraph,
         ForeshadowingNode,
     )
 except ImportError:  # pragma: no cover - supports legacy path injection
+    from graph.algorithms import find_cycles, find_path, topological_order
+    from graph.exporters import write_graph
     from models.foreshadowing import ForeshadowingEdge, ForeshadowingGraph, ForeshadowingNode
 
 
 class ForeshadowingDAGManager:
     """伏笔 DAG 管理器"""
 
+    # 拓扑序缓存：按 DAG 文件路径，以 (mtime_ns, size) 校验
+    _topo_cache: Dict[Path, Tuple[Tuple[int, int], List[str]]] = {}
+
     def __init__(self, project_dir: Optional[Path] = None, novel_id: str = "my_novel"):
         self.project_dir = project_dir or self._find_project_dir()
         self.novel_id = novel_id
@@ -108,6 +115,11 @@ class ForeshadowingDAGManager:
             print(f"目标节点不存在: {to_node}")
             return False
 
+        cycle = self._cycle_with(dag, from_node, to_node)
+        if cycle:
+            print(f"拒绝创建伏笔边，将形成循环: {' -> '.join(cycle)}")
+            return False
+
         edge = ForeshadowingEdge(from_=from_node, to=to_node, type=edge_type)
         dag.edges.append(edge)
         self._save_dag(dag)
@@ -129,6 +141,45 @@ class ForeshadowingDAGManager:
         self._log_operation("update_status", f"更新节点状态: {node_id} -> {status}")
         return True
 
+    @staticmethod
+    def _adjacency(dag: ForeshadowingGraph) -> Dict[str, List[str]]:
+        """节点 -> 后继列表；包含全部节点，节点顺序与 DAG 文件一致。"""
+        adjacency: Dict[str, List[str]] = {node_id: [] for node_id in dag.nodes}
+        for edge in dag.edges:
+            adjacency.setdefault(edge.from_, []).append(edge.to)
+        return adjacency
+
+    def _cycle_with(self, dag: ForeshadowingGraph, from_node: str, to_node: str) -> List[str]:
+        """加入 from_node -> to_node 后形成的循环路径；不成环时返回空列表。"""
+        path = find_path(self._adjacency(dag), to_node, from_node)
+        return [from_node] + path if path else []
+
+    def _dag_signature(self) -> Tuple[int, int]:
+        try:
+            stat = self.dag_file.stat()
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def topological_order(self) -> List[str]:
+        """伏笔节点的拓扑序（前置伏笔在前），DAG 文件未变化时直接使用缓存。
+
+        回收点等非节点目标不参与排序；处于循环中或依赖循环的节点被排除。
+        """
+        signature = self._dag_signature()
+        cached = self._topo_cache.get(self.dag_file)
+        if cached is not None and cached[0] == signature:
+            return list(cached[1])
+        dag = self._load_dag()
+        adjacency = {
+            node_id: [target for target in targets if target in dag.nodes]
+            for node_id, targets in self._adjacency(dag).items()
+            if node_id in dag.nodes
+        }
+        order = topological_order(adjacency)
+        self._topo_cache[self.dag_file] = (signature, order)
+        return list(order)
+
     def get_pending_nodes(self, min_weight: int = 1) -> List[Dict[str, Any]]:
         """获取待回收的伏笔节点"""
         dag = self._load_dag()
@@ -165,13 +216,9 @@ class ForeshadowingDAGManager:
             ):
                 errors.append(f"边引用了不存在的目标节点: {to_node}")
 
-        # 检查是否有循环引用
-        node_stack = []
-        for edge in dag.edges:
-            edge_data = edge if isinstance(edge, dict) else edge.model_dump(by_alias=True)
-            node_stack.append(edge_data["to"])
-
-        # TODO: 实现完整的循环检测
+        # 检查是否有循环引用（每个强连通分量报告一条循环路径）
+        for cycle in find_cycles(self._adjacency(dag)):
+            errors.append(f"伏笔依赖存在循环: {' -> '.join(cycle)}")
 
         # 检查主线伏笔是否有目标章节
         for node_id, node_data in dag.nodes.items():
@@ -220,6 +267,80 @@ class ForeshadowingDAGManager:
 
         return stats
 
+    def export_graph(
+        self,
+        path: Path,
+        fmt: Optional[str] = None,
+        layers: Optional[Iterable[str]] = None,
+        statuses: Optional[Iterable[str]] = None,
+        min_weight: int = 1,
+    ) -> Dict[str, int]:
+        """流式导出伏笔 DAG（GraphML/DOT/JSONL），可按层级、状态、权重过滤子图。
+
+        ``*_recover`` 回收点作为 ``kind=recover`` 节点输出；只有两端都被导出的边才会写出。
+        """
+        dag = self._load_dag()
+        layer_filter = set(layers or ())
+        status_filter = set(statuses or ())
+
+        def keep(node_id: str) -> bool:
+            node = dag.nodes.get(node_id)
+            if node is None:
+                return False
+            if layer_filter and node.layer not in layer_filter:
+                return False
+            if status_filter and dag.status.get(node_id, node.status) not in status_filter:
+                return False
+            return node.weight >= min_weight
+
+        recover_points: Set[str] = {
+            edge.to
+            for edge in dag.edges
+            if edge.to not in dag.nodes and edge.to.endswith("_recover") and keep(edge.from_)
+        }
+
+        def nodes() -> Iterator[Tuple[str, Dict[str, Any]]]:
+            for node_id, node in dag.nodes.items():
+                if not keep(node_id):
+                    continue
+                yield node_id, {
+                    "kind": "foreshadowing",
+                    "content": node.content,
+                    "weight": node.weight,
+                    "layer": node.layer,
+                    "status": dag.status.get(node_id, node.status),
+                    "created_at": node.created_at,
+                    "target_chapter": node.target_chapter or "",
+                    "tags": node.tags,
+                }
+            for point in sorted(recover_points):
+                yield point, {"kind": "recover"}
+
+        def edges() -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+            for edge in dag.edges:
+                if keep(edge.from_) and (keep(edge.to) or edge.to in recover_points):
+                    yield edge.from_, edge.to, {"type": edge.type}
+
+        node_keys: Dict[str, type] = {
+            "kind": str,
+            "content": str,
+            "weight": int,
+            "layer": str,
+            "status": str,
+            "created_at": str,
+            "target_chapter": str,
+            "tags": str,
+        }
+        return write_graph(
+            path,
+            nodes(),
+            edges(),
+            fmt=fmt,
+            name=f"{self.novel_id}_foreshadowing",
+            node_keys=node_keys,
+            edge_keys={"type": str},
+        )
+
     def _log_operation(self, operation: str, message: str):
         """记录操作日志"""
         from datetime import datetime
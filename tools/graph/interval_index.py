@@ -0,0 +1,84 @@
+"""Static centered interval tree for stabbing queries.
+
+Built once from closed ``[low, high]`` intervals; ``stab(point)`` returns
+every item whose interval contains ``point`` in O(log n + k). Construction
+and queries are iterative.
+"""
+
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Node(Generic[T]):
+    __slots__ = ("center", "by_low", "by_high", "left", "right")
+
+    def __init__(self, center: int):
+        self.center = center
+        # Intervals containing ``center``, ascending by low / descending by high.
+        self.by_low: List[Tuple[int, int, T]] = []
+        self.by_high: List[Tuple[int, int, T]] = []
+        self.left: Optional["_Node[T]"] = None
+        self.right: Optional["_Node[T]"] = None
+
+
+class IntervalIndex(Generic[T]):
+    """Items keyed by closed integer intervals."""
+
+    def __init__(self, intervals: Sequence[Tuple[int, int, T]]):
+        self.size = len(intervals)
+        self._root: Optional[_Node[T]] = None
+        if not intervals:
+            return
+        # (items, parent, attach_left) work items; each level splits on the
+        # median endpoint so the tree depth stays O(log n).
+        pending: List[Tuple[List[Tuple[int, int, T]], Optional[_Node[T]], bool]] = [
+            (list(intervals), None, False)
+        ]
+        while pending:
+            items, parent, attach_left = pending.pop()
+            endpoints = sorted(value for low, high, _ in items for value in (low, high))
+            node: _Node[T] = _Node(endpoints[len(endpoints) // 2])
+            left: List[Tuple[int, int, T]] = []
+            right: List[Tuple[int, int, T]] = []
+            for interval in items:
+                if interval[1] < node.center:
+                    left.append(interval)
+                elif interval[0] > node.center:
+                    right.append(interval)
+                else:
+                    node.by_low.append(interval)
+            node.by_low.sort(key=lambda interval: interval[0])
+            node.by_high = sorted(node.by_low, key=lambda interval: -interval[1])
+            if parent is None:
+                self._root = node
+            elif attach_left:
+                parent.left = node
+            else:
+                parent.right = node
+            if left:
+                pending.append((left, node, True))
+            if right:
+                pending.append((right, node, False))
+
+    def stab(self, point: int) -> List[T]:
+        """Items whose interval contains ``point``."""
+        found: List[T] = []
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                for low, _, item in node.by_low:
+                    if low > point:
+                        break
+                    found.append(item)
+                node = node.left
+            elif point > node.center:
+                for _, high, item in node.by_high:
+                    if high < point:
+                        break
+                    found.append(item)
+                node = node.right
+            else:
+                found.extend(item for _, _, item in node.by_low)
+                break
+        return found
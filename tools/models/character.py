@@ -1,9 +1,26 @@
 """Character models: lightweight card + optional detailed markdown profile."""
 
+import re
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, computed_field, model_validator
+
+ITEM_COUNT_PATTERN = re.compile(r"^(.+?)(?:\s+[xX]|\s*×)\s*(\d+)$")
+
+
+def split_item_count(text: str) -> Tuple[str, int]:
+    """Split ``"回气丹 x3"`` into ``("回气丹", 3)``; plain names count as one."""
+    text = text.strip()
+    match = ITEM_COUNT_PATTERN.match(text)
+    if not match:
+        return text, 1
+    return match.group(1).strip(), int(match.group(2))
+
+
+def render_item(name: str, count: int) -> str:
+    """Legacy ``items`` rendering: ``"回气丹"`` or ``"回气丹 x3"``."""
+    return name if count == 1 else f"{name} x{count}"
 
 
 class CharacterStatic(BaseModel):
@@ -77,9 +94,48 @@ class CharacterSummary(BaseModel):
     realm: str = Field(default="凡人", description="Current realm")
     location: str = Field(default="未知", description="Current location")
     statuses: List[str] = Field(default_factory=list, description="Status tags")
-    items: List[str] = Field(default_factory=list, description="Key items")
+    inventory: Dict[str, int] = Field(default_factory=dict, description="Items and counts")
     highlights: List[str] = Field(default_factory=list, description="Optional short notes")
 
+    @model_validator(mode="before")
+    @classmethod
+    def _migrate_items(cls, data: Any) -> Any:
+        """Fold legacy ``items: ["回气丹 x3"]`` into ``inventory``; inventory wins."""
+        if not isinstance(data, dict) or "items" not in data:
+            return data
+        data = dict(data)
+        legacy = data.pop("items") or []
+        if not data.get("inventory"):
+            inventory: Dict[str, int] = {}
+            for text in legacy:
+                name, count = split_item_count(str(text))
+                if name and count > 0:
+                    inventory[name] = inventory.get(name, 0) + count
+            data["inventory"] = inventory
+        return data
+
+    @computed_field
+    @property
+    def items(self) -> List[str]:
+        """Legacy string rendering kept for profiles, snapshots and old readers."""
+        return [render_item(name, count) for name, count in self.inventory.items()]
+
+    def item_count(self, name: str) -> int:
+        return self.inventory.get(name, 0)
+
+    def add_item(self, name: str, count: int = 1) -> None:
+        self.inventory[name] = self.inventory.get(name, 0) + count
+
+    def remove_item(self, name: str, count: int = 1) -> None:
+        """Remove ``count`` of ``name``; raises ``ValueError`` when short."""
+        held = self.inventory.get(name, 0)
+        if held < count:
+            raise ValueError(f"物品不足，无法使用: {render_item(name, count)}")
+        if held == count:
+            del self.inventory[name]
+        else:
+            self.inventory[name] = held - count
+
 
 class CharacterCard(BaseModel):
     """Character card: static profile + lightweight summary + dynamic markdown link."""
@@ -103,7 +159,7 @@ class CharacterCard(BaseModel):
         state = self.current_state
         has_summary = (
             bool(self.summary.statuses)
-            or bool(self.summary.items)
+            or bool(self.summary.inventory)
             or bool(self.summary.highlights)
             or self.summary.realm != "凡人"
             or self.summary.location != "未知"
@@ -119,8 +175,6 @@ class CharacterCard(BaseModel):
                 if flag and flag not in self.summary.statuses:
                     self.summary.statuses.append(flag)
             for item, count in state.inventory.items():
-                if count <= 0:
-                    continue
-                item_text = item if count == 1 else f"{item} x{count}"
-                self.summary.items.append(item_text)
+                if count > 0:
+                    self.summary.add_item(item, count)
         return self
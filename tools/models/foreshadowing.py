@@ -2,7 +2,7 @@
 伏笔系统数据模型
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict
 from datetime import datetime
 
@@ -23,6 +23,8 @@ class ForeshadowingNode(BaseModel):
 class ForeshadowingEdge(BaseModel):
     """伏笔 DAG 边"""
 
+    model_config = ConfigDict(populate_by_name=True)
+
     from_: str = Field(..., alias="from", description="来源伏笔ID")
     to: str = Field(..., description="目标伏笔ID或回收点")
     type: str = Field(..., description="依赖/强化/反转")
@@ -12,6 +12,7 @@ class WorldEntity(BaseModel):
     id: str = Field(..., description="Entity ID")
     name: str = Field(..., description="Entity display name")
     type: str = Field(default="concept", description="Entity type")
+    aliases: List[str] = Field(default_factory=list, description="Alternative names")
     description: str = Field(default="", description="Free-form description")
     tags: List[str] = Field(default_factory=list, description="Tags")
     attributes: Dict[str, str] = Field(default_factory=dict, description="Structured attributes")
@@ -25,6 +26,12 @@ class WorldRelation(BaseModel):
     relation: str = Field(..., description="Relation label, e.g. belongs_to")
     weight: int = Field(default=1, ge=1, le=10, description="Relation strength")
     note: str = Field(default="", description="Optional relation note")
+    from_chapter: str = Field(default="", description="First chapter the relation holds, inclusive")
+    until_chapter: str = Field(default="", description="Last chapter the relation holds, inclusive")
+
+    @property
+    def is_temporal(self) -> bool:
+        return bool(self.from_chapter or self.until_chapter)
 
 
 class WorldGraph(BaseModel):
@@ -0,0 +1,79 @@
+"""Character profile panel parser.
+
+Dynamic profiles (``characters/profiles/*.md``) are free-form markdown, but
+authors keep the important facts in panel lines such as ``【境界：归元后期】``.
+This module extracts those lines into a structured mapping and caches the
+result per file on (mtime, size), so repeated context builds never re-read
+unchanged profiles.
+"""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PANEL_FIELD_PATTERN = re.compile(r"【\s*([^【】：:]+?)\s*[：:]\s*([^【】]*?)\s*】")
+
+
+@dataclass
+class ProfilePanel:
+    """Structured view of one profile file."""
+
+    fields: Dict[str, List[str]] = field(default_factory=dict)
+    panel_lines: List[str] = field(default_factory=list)
+    compact_text: str = ""
+
+    def first(self, key: str, default: str = "") -> str:
+        values = self.fields.get(key)
+        return values[0] if values else default
+
+    def values(self, *keys: str) -> List[str]:
+        result: List[str] = []
+        for key in keys:
+            result.extend(self.fields.get(key, []))
+        return result
+
+    def excerpt(self, max_chars: int = 120) -> str:
+        if self.panel_lines:
+            return " ".join(self.panel_lines[:6])[:max_chars]
+        return self.compact_text[:max_chars]
+
+
+def parse_profile(text: str) -> ProfilePanel:
+    """Parse panel fields, panel lines and a compact text fallback."""
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    panel = ProfilePanel()
+    for line in lines:
+        if "【" not in line or "】" not in line:
+            continue
+        panel.panel_lines.append(line)
+        for match in PANEL_FIELD_PATTERN.finditer(line):
+            key, value = match.group(1), match.group(2)
+            if value:
+                panel.fields.setdefault(key, []).append(value)
+
+    if not panel.panel_lines and lines:
+        compact = " ".join(lines)
+        compact = re.sub(r"[`#>*_-]+", " ", compact)
+        panel.compact_text = re.sub(r"\s+", " ", compact).strip()
+    return panel
+
+
+_PANEL_CACHE: Dict[Path, Tuple[Tuple[int, int], ProfilePanel]] = {}
+
+
+def load_profile_panel(path: Path) -> Optional[ProfilePanel]:
+    """Return the parsed panel for ``path``, re-parsing only when it changed."""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        _PANEL_CACHE.pop(path, None)
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _PANEL_CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    panel = parse_profile(path.read_text(encoding="utf-8"))
+    _PANEL_CACHE[path] = (signature, panel)
+    return panel
@@ -0,0 +1,96 @@
+"""Row-level readers and writers for world entity/relation tables.
+
+World bibles kept in spreadsheets are exchanged as CSV or JSONL. Rows are
+streamed one at a time in both directions so imports and exports never hold
+a second copy of the table in memory.
+
+CSV conventions: ``tags`` and ``aliases`` are ``|``-separated and every
+``attr.<key>`` column becomes ``attributes[<key>]``; JSONL rows carry
+lists/dicts natively.
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+ATTRIBUTE_PREFIX = "attr."
+TAG_SEPARATOR = "|"
+LIST_COLUMNS = ("tags", "aliases")
+
+
+def table_format(path: Path) -> str:
+    """``csv`` or ``jsonl``, decided by the file suffix."""
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in {".jsonl", ".ndjson"}:
+        return "jsonl"
+    raise ValueError(f"不支持的表格格式: {path.name}（仅支持 .csv/.jsonl）")
+
+
+def _normalize_csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    item: Dict[str, Any] = {}
+    attributes: Dict[str, str] = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = key.strip()
+        value = (value or "").strip()
+        if key.startswith(ATTRIBUTE_PREFIX):
+            if value:
+                attributes[key[len(ATTRIBUTE_PREFIX):]] = value
+        elif key in LIST_COLUMNS:
+            item[key] = [part.strip() for part in value.split(TAG_SEPARATOR) if part.strip()]
+        elif value:
+            item[key] = value
+    if attributes:
+        item["attributes"] = attributes
+    return item
+
+
+def read_rows(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(line_number, row)`` pairs from a CSV or JSONL file."""
+    fmt = table_format(path)
+    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+        if fmt == "csv":
+            reader = csv.DictReader(handle)
+            for row in reader:
+                if not any((value or "").strip() for value in row.values() if isinstance(value, str)):
+                    continue
+                yield reader.line_num, _normalize_csv_row(row)
+            return
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path.name} 第 {line_number} 行不是合法 JSON: {exc}") from exc
+            if not isinstance(row, dict):
+                raise ValueError(f"{path.name} 第 {line_number} 行应为 JSON 对象")
+            yield line_number, row
+
+
+def write_rows(path: Path, rows: Iterable[Dict[str, Any]], fieldnames: List[str]) -> int:
+    """Stream ``rows`` to CSV or JSONL; returns the number of rows written."""
+    fmt = table_format(path)
+    count = 0
+    with path.open("w", encoding="utf-8", newline="") as handle:
+        if fmt == "jsonl":
+            for row in rows:
+                handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+            return count
+        writer = csv.DictWriter(handle, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            flat = dict(row)
+            for key in LIST_COLUMNS:
+                if isinstance(flat.get(key), list):
+                    flat[key] = TAG_SEPARATOR.join(flat[key])
+            for key, value in (flat.pop("attributes", None) or {}).items():
+                flat[f"{ATTRIBUTE_PREFIX}{key}"] = value
+            writer.writerow(flat)
+            count += 1
+    return count
@@ -38,7 +38,76 @@ class CharacterQuery:
             "dynamic_profile": card.dynamic_profile,
         }
 
-    def get_timeline(self, name: str) -> List[Dict[str, Any]]:
+    def diff(self, name: str, from_chapter: str, to_chapter: str) -> Dict[str, Any]:
+        """Structured change of realm, location, statuses and items between chapters."""
         card = self.manager.get_character_card(name=name)
-        timeline = self.manager.get_timeline(character_id=card.static.id)
+        before, after = self.manager.rebuild_window(
+            character_id=card.static.id, from_chapter=from_chapter, to_chapter=to_chapter
+        )
+        gained: Dict[str, int] = {}
+        lost: Dict[str, int] = {}
+        for item in dict.fromkeys([*before.inventory, *after.inventory]):
+            delta = after.item_count(item) - before.item_count(item)
+            if delta > 0:
+                gained[item] = delta
+            elif delta < 0:
+                lost[item] = -delta
+        result: Dict[str, Any] = {
+            "id": card.static.id,
+            "name": card.static.name,
+            "from_chapter": from_chapter,
+            "to_chapter": to_chapter,
+            "realm": {"from": before.realm, "to": after.realm}
+            if before.realm != after.realm
+            else None,
+            "location": {"from": before.location, "to": after.location}
+            if before.location != after.location
+            else None,
+            "statuses": {
+                "added": [item for item in after.statuses if item not in before.statuses],
+                "removed": [item for item in before.statuses if item not in after.statuses],
+            },
+            "items": {"gained": gained, "lost": lost},
+        }
+        result["changed"] = bool(
+            result["realm"]
+            or result["location"]
+            or result["statuses"]["added"]
+            or result["statuses"]["removed"]
+            or gained
+            or lost
+        )
+        return result
+
+    def get_cast_state_at(self, until_chapter: Optional[str] = None) -> List[Dict[str, Any]]:
+        entries = self.manager.list_characters()
+        states = self.manager.rebuild_all(
+            until_chapter=until_chapter, character_ids=[item["id"] for item in entries]
+        )
+        return [
+            {
+                "id": item["id"],
+                "name": item.get("name", ""),
+                "until_chapter": until_chapter,
+                "state": states[item["id"]].model_dump(),
+            }
+            for item in entries
+            if item["id"] in states
+        ]
+
+    def get_chapter_changes(self, chapter_id: str) -> List[Dict[str, Any]]:
+        names = {item["id"]: item.get("name", "") for item in self.manager.list_characters()}
+        rows: List[Dict[str, Any]] = []
+        for character_id, mutation in self.manager.get_chapter_changes(chapter_id):
+            row = mutation.model_dump()
+            row["character_id"] = character_id
+            row["name"] = names.get(character_id, "")
+            rows.append(row)
+        return rows
+
+    def get_timeline(self, name: str, include_archived: bool = False) -> List[Dict[str, Any]]:
+        card = self.manager.get_character_card(name=name)
+        timeline = self.manager.get_timeline(
+            character_id=card.static.id, include_archived=include_archived
+        )
         return [mutation.model_dump() for mutation in timeline]
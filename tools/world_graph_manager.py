@@ -2,27 +2,165 @@
 
 from __future__ import annotations
 
+import json
+import os
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import yaml
 
 try:
+    from tools.chapter_registry import ChapterOrder, ChapterRegistry
+    from tools.checks.world_conflicts import WorldConflictState
+    from tools.graph.algorithms import (
+        find_cycle,
+        find_cycles,
+        longest_path_heights,
+        strongly_connected_components,
+        weighted_pagerank,
+    )
+    from tools.graph.entity_index import EntitySearchIndex
+    from tools.graph.exporters import write_graph
+    from tools.graph.interval_index import IntervalIndex
     from tools.models.world import WorldEntity, WorldGraph, WorldRelation
+    from tools.parsers.world_table import ATTRIBUTE_PREFIX, read_rows, write_rows
 except ImportError:  # pragma: no cover - supports legacy path injection
+    from chapter_registry import ChapterOrder, ChapterRegistry
+    from checks.world_conflicts import WorldConflictState
+    from graph.algorithms import (
+        find_cycle,
+        find_cycles,
+        longest_path_heights,
+        strongly_connected_components,
+        weighted_pagerank,
+    )
+    from graph.entity_index import EntitySearchIndex
+    from graph.exporters import write_graph
+    from graph.interval_index import IntervalIndex
     from models.world import WorldEntity, WorldGraph, WorldRelation
+    from parsers.world_table import ATTRIBUTE_PREFIX, read_rows, write_rows
+
+# libyaml bindings parse/dump large graphs several times faster when present.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Interval bounds for relations open at one end.
+_OPEN_START = -1
+_OPEN_END = 1 << 62
+
+
+@dataclass
+class _WorldIndex:
+    """Loaded graph plus outgoing/incoming adjacency keyed by entity and relation.
+
+    The graph held here is shared and must be treated as read-only.
+    """
+
+    signature: Tuple[int, int]
+    graph: WorldGraph
+    outgoing: Dict[str, Dict[str, List[WorldRelation]]] = field(default_factory=dict)
+    incoming: Dict[str, Dict[str, List[WorldRelation]]] = field(default_factory=dict)
+    realm_ranks: Optional[Dict[str, int]] = None
+    # Transitive closure of the ranked ``above`` edges: a bit per realm and,
+    # per realm, the mask of every realm below it.
+    realm_reach: Optional[Tuple[Dict[str, int], Dict[str, int]]] = None
+    # PageRank per entity and the entity/relation orders derived from it.
+    centrality: Optional[Dict[str, float]] = None
+    ranked_entities: Optional[List[WorldEntity]] = None
+    ranked_relations: Optional[List[WorldRelation]] = None
+    names: Dict[str, str] = field(default_factory=dict)
+    by_type: Dict[str, List[str]] = field(default_factory=dict)
+    # Full-text index; built on first search, then carried across writes.
+    search: Optional[EntitySearchIndex] = None
+    # Relations without a chapter window, and an interval index over chapter
+    # ordinals for the rest, tagged with the registry version it was built for.
+    static_relations: List[WorldRelation] = field(default_factory=list)
+    temporal: Optional[Tuple[str, IntervalIndex]] = None
+    # LRU of ``neighborhood`` results; lives and dies with this graph version.
+    neighborhoods: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = field(
+        default_factory=OrderedDict
+    )
+
+    @classmethod
+    def build(cls, signature: Tuple[int, int], graph: WorldGraph) -> "_WorldIndex":
+        index = cls(signature=signature, graph=graph)
+        for entity in graph.entities.values():
+            index.names.setdefault(entity.name, entity.id)
+            for alias in entity.aliases:
+                index.names.setdefault(alias, entity.id)
+            index.by_type.setdefault(entity.type, []).append(entity.id)
+        for rel in graph.relations:
+            if not rel.is_temporal:
+                index.static_relations.append(rel)
+            index.outgoing.setdefault(rel.source_id, {}).setdefault(rel.relation, []).append(rel)
+            index.incoming.setdefault(rel.target_id, {}).setdefault(rel.relation, []).append(rel)
+        return index
+
+    @staticmethod
+    def _edges(
+        adjacency: Dict[str, Dict[str, List[WorldRelation]]], entity_id: str, relation: str
+    ) -> List[WorldRelation]:
+        by_relation = adjacency.get(entity_id)
+        if not by_relation:
+            return []
+        if relation:
+            return by_relation.get(relation, [])
+        return [rel for rels in by_relation.values() for rel in rels]
+
+    def out_edges(self, entity_id: str, relation: str = "") -> List[WorldRelation]:
+        return self._edges(self.outgoing, entity_id, relation)
+
+    def in_edges(self, entity_id: str, relation: str = "") -> List[WorldRelation]:
+        return self._edges(self.incoming, entity_id, relation)
 
 
 class WorldGraphManager:
     """Manage world entities and relations for one novel."""
 
+    # Parsed graphs and adjacency shared by all managers, keyed by graph file
+    # and validated against its (mtime_ns, size) before every use.
+    _index_cache: Dict[Path, _WorldIndex] = {}
+    # Conflict state per graph file, tagged with the graph signature it matches.
+    _conflict_cache: Dict[Path, Tuple[Tuple[int, int], WorldConflictState]] = {}
+    # Realm rank and reachability tables per graph file, keyed by the
+    # ``above`` edges and the names of the realms they connect.
+    _rank_cache: Dict[
+        Path,
+        Tuple[
+            Tuple[frozenset, frozenset],
+            Dict[str, int],
+            Tuple[Dict[str, int], Dict[str, int]],
+        ],
+    ] = {}
+
+    REALM_RELATION = "above"
+    NEIGHBORHOOD_CACHE_SIZE = 128
+
     def __init__(self, project_dir: Optional[Path] = None, novel_id: str = "my_novel"):
         self.project_dir = project_dir or self._find_project_dir()
         self.novel_id = novel_id
         self.world_dir = self.project_dir / "data" / "novels" / novel_id / "world"
         self.graph_file = self.world_dir / "world_graph.yaml"
+        self.conflict_state_file = self.world_dir / "conflict_state.json"
+        self.search_index_file = self.world_dir / "search_index.json"
+        # Graph version the persisted search index matches, kept apart so
+        # relation-only writes can move it forward without rewriting the index.
+        self.search_stamp_file = self.world_dir / "search_index.stamp.json"
+        self.chapter_registry = ChapterRegistry(self.project_dir, novel_id)
         self.world_dir.mkdir(parents=True, exist_ok=True)
+        # Unit-of-work state, see ``session()``.
+        self._session_graph: Optional[WorldGraph] = None
+        self._session_dirty = False
+        self._session_index: Optional[_WorldIndex] = None
+        self._session_conflicts: Optional[WorldConflictState] = None
+        self._session_search: Optional[EntitySearchIndex] = None
+        self._session_search_taken = False
+        # Conflicts introduced by the most recent upsert_entity/add_relation.
+        self.last_write_conflicts: Dict[str, List[str]] = {"errors": [], "warnings": []}
 
     def _find_project_dir(self) -> Path:
         cwd = Path.cwd()
@@ -35,13 +173,222 @@ class WorldGraphManager:
         if not self.graph_file.exists():
             return WorldGraph()
         with self.graph_file.open("r", encoding="utf-8") as handle:
-            data = yaml.safe_load(handle) or {}
+            data = yaml.load(handle, Loader=_YAML_LOADER) or {}
         return WorldGraph.model_validate(data)
 
-    def _save_graph(self, graph: WorldGraph) -> None:
+    def _save_graph(
+        self,
+        graph: WorldGraph,
+        conflicts: Optional[WorldConflictState] = None,
+        search: Optional[EntitySearchIndex] = None,
+    ) -> None:
+        """Write ``graph`` atomically and cache its index.
+
+        ``search`` is the entity index already updated for this write (only
+        entity writes pass one); without one, an index built for the previous
+        version carries over unchanged and is not rewritten.
+        """
+        before = self._graph_signature()
+        entities_changed = search is not None
+        previous = self._index_cache.get(self.graph_file)
+        if search is None and previous is not None and previous.signature == before:
+            search = previous.search
         graph.updated_at = datetime.now().isoformat()
-        with self.graph_file.open("w", encoding="utf-8") as handle:
-            yaml.safe_dump(graph.model_dump(), handle, allow_unicode=True, sort_keys=False)
+        tmp_path = self.graph_file.with_name(f".{self.graph_file.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as handle:
+            yaml.dump(
+                graph.model_dump(),
+                handle,
+                Dumper=_YAML_DUMPER,
+                allow_unicode=True,
+                sort_keys=False,
+            )
+        os.replace(tmp_path, self.graph_file)
+        index = _WorldIndex.build(self._graph_signature(), graph)
+        index.search = search
+        self._index_cache[self.graph_file] = index
+        if conflicts is not None:
+            self._store_conflict_state(conflicts)
+        if search is not None:
+            if not entities_changed and self._search_stamp_matches(before):
+                self._stamp_search_index(index.signature)
+            else:
+                self._store_search_index(search, index.signature)
+
+    def _store_conflict_state(self, state: WorldConflictState) -> None:
+        signature = self._graph_signature()
+        data = {"signature": list(signature), **state.to_dict()}
+        tmp_path = self.conflict_state_file.with_name(f".{self.conflict_state_file.name}.tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.conflict_state_file)
+        self._conflict_cache[self.graph_file] = (signature, state)
+
+    def _load_conflict_state(self, graph: WorldGraph, *, take: bool) -> WorldConflictState:
+        """Conflict state matching the graph on disk, rebuilt by full scan if stale.
+
+        With ``take`` the cached object is handed over for mutation and only
+        returns to the cache once the graph is saved, so a failed write never
+        leaves edits in the cache.
+        """
+        signature = self._graph_signature()
+        cached = (
+            self._conflict_cache.pop(self.graph_file, None)
+            if take
+            else self._conflict_cache.get(self.graph_file)
+        )
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if self.conflict_state_file.exists():
+            try:
+                data = json.loads(self.conflict_state_file.read_text(encoding="utf-8"))
+                if tuple(data.get("signature") or ()) == signature:
+                    state = WorldConflictState.from_dict(data)
+                    if not take:
+                        self._conflict_cache[self.graph_file] = (signature, state)
+                    return state
+            except (ValueError, KeyError, IndexError, TypeError):
+                pass
+        state = WorldConflictState.build(graph, find_cycle)
+        if not take and self.graph_file.exists():
+            self._store_conflict_state(state)
+        return state
+
+    def _store_search_index(
+        self, search: EntitySearchIndex, signature: Tuple[int, int]
+    ) -> None:
+        tmp_path = self.search_index_file.with_name(f".{self.search_index_file.name}.tmp")
+        tmp_path.write_text(json.dumps(search.to_dict(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.search_index_file)
+        self._stamp_search_index(signature)
+
+    def _search_index_stat(self) -> List[int]:
+        stat = self.search_index_file.stat()
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _stamp_search_index(self, signature: Tuple[int, int]) -> None:
+        """Record that ``search_index.json`` as it is now matches graph ``signature``."""
+        data = {"signature": list(signature), "index": self._search_index_stat()}
+        tmp_path = self.search_stamp_file.with_name(f".{self.search_stamp_file.name}.tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.search_stamp_file)
+
+    def _search_stamp_matches(self, signature: Tuple[int, int]) -> bool:
+        try:
+            data = json.loads(self.search_stamp_file.read_text(encoding="utf-8"))
+            current = self._search_index_stat()
+        except (OSError, ValueError):
+            return False
+        return data.get("signature") == list(signature) and data.get("index") == current
+
+    def _load_search_index(self, index: _WorldIndex) -> EntitySearchIndex:
+        """Entity index persisted for the graph on disk, rebuilt if stale."""
+        if self._search_stamp_matches(index.signature):
+            try:
+                data = json.loads(self.search_index_file.read_text(encoding="utf-8"))
+                return EntitySearchIndex.from_dict(data)
+            except (OSError, ValueError, KeyError, IndexError, TypeError):
+                pass
+        search = EntitySearchIndex.build(index.graph.entities.values())
+        if self.graph_file.exists():
+            self._store_search_index(search, index.signature)
+        return search
+
+    def _write_conflicts(self, graph: WorldGraph) -> WorldConflictState:
+        """Conflict state to update alongside a write to ``graph``."""
+        if self._session_graph is not None:
+            if self._session_conflicts is None:
+                self._session_conflicts = self._load_conflict_state(graph, take=True)
+            return self._session_conflicts
+        return self._load_conflict_state(graph, take=True)
+
+    def _take_search(self) -> Optional[EntitySearchIndex]:
+        """Entity index to update alongside a write, if one has been built.
+
+        Like the conflict state it is removed from the cache while the write
+        is pending, so a failed write never leaves edits behind.
+        """
+        if self._session_graph is not None and self._session_search_taken:
+            return self._session_search
+        search: Optional[EntitySearchIndex] = None
+        cached = self._index_cache.get(self.graph_file)
+        if cached is not None and cached.signature == self._graph_signature():
+            search, cached.search = cached.search, None
+        if self._session_graph is not None:
+            self._session_search = search
+            self._session_search_taken = True
+        return search
+
+    @contextmanager
+    def session(self) -> Iterator["WorldGraphManager"]:
+        """Unit of work: load the graph once, buffer writes, flush once atomically.
+
+        Every ``upsert_entity``/``add_relation`` inside the block edits the
+        in-memory graph; the file is written once on a clean exit and left
+        untouched if the block raises. Nested sessions join the outer one.
+        """
+        if self._session_graph is not None:
+            yield self
+            return
+        self._session_graph = self._load_graph()
+        self._session_dirty = False
+        self._session_index = None
+        self._session_conflicts = None
+        self._session_search = None
+        self._session_search_taken = False
+        try:
+            yield self
+            if self._session_dirty:
+                self._save_graph(
+                    self._session_graph, self._session_conflicts, self._session_search
+                )
+        finally:
+            self._session_graph = None
+            self._session_dirty = False
+            self._session_index = None
+            self._session_conflicts = None
+            self._session_search = None
+            self._session_search_taken = False
+
+    def _write_graph(self) -> WorldGraph:
+        """Graph to modify: the session graph, or a fresh copy from disk."""
+        if self._session_graph is not None:
+            return self._session_graph
+        return self._load_graph()
+
+    def _commit(
+        self,
+        graph: WorldGraph,
+        conflicts: WorldConflictState,
+        search: Optional[EntitySearchIndex] = None,
+    ) -> None:
+        if self._session_graph is not None:
+            self._session_dirty = True
+            self._session_index = None
+            return
+        self._save_graph(graph, conflicts, search)
+
+    def _graph_signature(self) -> Tuple[int, int]:
+        try:
+            stat = self.graph_file.stat()
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _index(self) -> _WorldIndex:
+        """Cached graph and adjacency for read paths; rebuilt when the file changes."""
+        if self._session_graph is not None:
+            # Reads inside a session see its buffered writes.
+            if self._session_index is None:
+                self._session_index = _WorldIndex.build((0, 0), self._session_graph)
+                self._session_index.search = self._session_search
+            return self._session_index
+        signature = self._graph_signature()
+        cached = self._index_cache.get(self.graph_file)
+        if cached is not None and cached.signature == signature:
+            return cached
+        index = _WorldIndex.build(signature, self._load_graph())
+        self._index_cache[self.graph_file] = index
+        return index
 
     def upsert_entity(
         self,
@@ -52,18 +399,26 @@ class WorldGraphManager:
         description: str = "",
         tags: Optional[List[str]] = None,
         attributes: Optional[Dict[str, str]] = None,
+        aliases: Optional[List[str]] = None,
     ) -> WorldEntity:
-        graph = self._load_graph()
+        graph = self._write_graph()
         node = WorldEntity(
             id=entity_id,
             name=name,
             type=entity_type,
+            aliases=[alias for alias in dict.fromkeys(aliases or []) if alias and alias != name],
             description=description,
             tags=tags or [],
             attributes=attributes or {},
         )
+        conflicts = self._write_conflicts(graph)
+        search = self._take_search()
         graph.entities[entity_id] = node
-        self._save_graph(graph)
+        conflicts.entity_upserted(entity_id)
+        if search is not None:
+            search.upsert(node)
+        self.last_write_conflicts = {"errors": [], "warnings": []}
+        self._commit(graph, conflicts, search)
         return node
 
     def add_relation(
@@ -74,12 +429,21 @@ class WorldGraphManager:
         relation: str,
         weight: int = 1,
         note: str = "",
+        from_chapter: str = "",
+        until_chapter: str = "",
     ) -> WorldRelation:
-        graph = self._load_graph()
+        graph = self._write_graph()
         if source_id not in graph.entities:
             raise ValueError(f"源实体不存在: {source_id}")
         if target_id not in graph.entities:
             raise ValueError(f"目标实体不存在: {target_id}")
+        if from_chapter and until_chapter:
+            order = self.chapter_registry.snapshot()
+            reversed_window = order.ordinal(from_chapter) > order.ordinal(until_chapter)
+        else:
+            reversed_window = False
+        if reversed_window:
+            raise ValueError(f"关系起始章节晚于结束章节: {from_chapter} > {until_chapter}")
 
         rel = WorldRelation(
             source_id=source_id,
@@ -87,22 +451,353 @@ class WorldGraphManager:
             relation=relation,
             weight=weight,
             note=note,
+            from_chapter=from_chapter,
+            until_chapter=until_chapter,
         )
+        conflicts = self._write_conflicts(graph)
         graph.relations.append(rel)
-        self._save_graph(graph)
+        self.last_write_conflicts = conflicts.relation_added(rel, graph.entities)
+        self._commit(graph, conflicts)
         return rel
 
+    @staticmethod
+    def _parse_weight(raw: Any) -> int:
+        """Relation weight from a table cell; only a missing or empty cell means 1.
+
+        Bools and non-integral numbers are rejected instead of coerced; the
+        1-10 range is left to ``WorldRelation``.
+        """
+        value = raw.strip() if isinstance(raw, str) else raw
+        if value is None or value == "":
+            return 1
+        if isinstance(value, str):
+            try:
+                return int(value)
+            except ValueError:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        raise ValueError(f"weight 必须是整数: {raw}")
+
+    def import_records(
+        self, entities: List[Dict[str, Any]], relations: List[Dict[str, Any]]
+    ) -> Tuple[int, int]:
+        """Upsert entity dicts, then add relation dicts, in one session.
+
+        Returns ``(entities, relations added)``; see ``import_stream``.
+        """
+        stats = self.import_stream(
+            ((f"第 {index} 个实体", item) for index, item in enumerate(entities, start=1)),
+            ((f"第 {index} 条关系", item) for index, item in enumerate(relations, start=1)),
+        )
+        return stats["entities"], stats["relations"]
+
+    def import_stream(
+        self,
+        entity_rows: Iterable[Tuple[str, Dict[str, Any]]],
+        relation_rows: Iterable[Tuple[str, Dict[str, Any]]],
+    ) -> Dict[str, int]:
+        """Stream ``(location, row)`` pairs into the graph in one session.
+
+        Keys follow the CLI: ``id/name/type/aliases/description/tags/attributes``
+        and ``source(_id)/target(_id)/relation/weight/note/from_chapter/until_chapter``.
+        Entities upsert by id; relations already present (same source,
+        relation, target and chapter window) are skipped. Any invalid row
+        aborts the import before anything is written; ``location`` prefixes
+        its error message.
+        """
+        stats = {"entities": 0, "relations": 0, "duplicates": 0}
+        with self.session():
+            graph = self._write_graph()
+            seen_entities: Set[str] = set()
+            for location, item in entity_rows:
+                if not item.get("id") or not item.get("name"):
+                    raise ValueError(f"{location}: 实体缺少 id 或 name")
+                try:
+                    self.upsert_entity(
+                        entity_id=str(item["id"]),
+                        name=str(item["name"]),
+                        entity_type=str(item.get("type") or "concept"),
+                        description=str(item.get("description") or ""),
+                        tags=list(item.get("tags") or []),
+                        aliases=[str(alias) for alias in item.get("aliases") or []],
+                        attributes={
+                            str(key): str(value)
+                            for key, value in (item.get("attributes") or {}).items()
+                        },
+                    )
+                except ValueError as exc:
+                    raise ValueError(f"{location}: {exc}") from exc
+                seen_entities.add(str(item["id"]))
+            stats["entities"] = len(seen_entities)
+
+            seen: Set[Tuple[str, str, str, str, str]] = {
+                (rel.source_id, rel.relation, rel.target_id, rel.from_chapter, rel.until_chapter)
+                for rel in graph.relations
+            }
+            for location, item in relation_rows:
+                source_id = item.get("source_id") or item.get("source")
+                target_id = item.get("target_id") or item.get("target")
+                if not source_id or not target_id or not item.get("relation"):
+                    raise ValueError(f"{location}: 关系缺少 source/target/relation")
+                key = (
+                    str(source_id),
+                    str(item["relation"]),
+                    str(target_id),
+                    str(item.get("from_chapter") or ""),
+                    str(item.get("until_chapter") or ""),
+                )
+                try:
+                    weight = self._parse_weight(item.get("weight"))
+                except ValueError as exc:
+                    raise ValueError(f"{location}: {exc}") from None
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                try:
+                    self.add_relation(
+                        source_id=key[0],
+                        target_id=key[2],
+                        relation=key[1],
+                        weight=weight,
+                        note=str(item.get("note") or ""),
+                        from_chapter=key[3],
+                        until_chapter=key[4],
+                    )
+                except ValueError as exc:
+                    raise ValueError(f"{location}: {exc}") from exc
+                seen.add(key)
+                stats["relations"] += 1
+        return stats
+
+    def import_tables(
+        self, *, entities_path: Optional[Path] = None, relations_path: Optional[Path] = None
+    ) -> Dict[str, int]:
+        """Import entity/relation tables (``.csv`` or ``.jsonl``) row by row."""
+
+        def rows(path: Optional[Path]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+            if path is None:
+                return
+            for line_number, row in read_rows(path):
+                yield f"{path.name} 第 {line_number} 行", row
+
+        return self.import_stream(rows(entities_path), rows(relations_path))
+
+    def export_tables(
+        self, *, entities_path: Optional[Path] = None, relations_path: Optional[Path] = None
+    ) -> Dict[str, int]:
+        """Write entities/relations as ``.csv`` or ``.jsonl``, one row at a time."""
+        graph = self._index().graph
+        stats = {"entities": 0, "relations": 0}
+        if entities_path is not None:
+            attribute_keys = sorted(
+                {key for entity in graph.entities.values() for key in entity.attributes}
+            )
+            fieldnames = ["id", "name", "type", "aliases", "description", "tags"] + [
+                f"{ATTRIBUTE_PREFIX}{key}" for key in attribute_keys
+            ]
+            stats["entities"] = write_rows(
+                entities_path,
+                (entity.model_dump() for entity in graph.entities.values()),
+                fieldnames,
+            )
+        if relations_path is not None:
+            stats["relations"] = write_rows(
+                relations_path,
+                (rel.model_dump() for rel in graph.relations),
+                [
+                    "source_id",
+                    "target_id",
+                    "relation",
+                    "weight",
+                    "note",
+                    "from_chapter",
+                    "until_chapter",
+                ],
+            )
+        return stats
+
+    def export_graph(
+        self,
+        path: Path,
+        *,
+        fmt: Optional[str] = None,
+        entity_types: Optional[Iterable[str]] = None,
+        relations: Optional[Iterable[str]] = None,
+        seeds: Optional[Iterable[str]] = None,
+        hops: int = 1,
+        at: str = "",
+    ) -> Dict[str, int]:
+        """Stream the graph, or a filtered subgraph, as GraphML/DOT/JSONL.
+
+        ``entity_types`` and ``relations`` restrict node types and edge
+        labels, ``seeds``/``hops`` keep only the neighbourhood of the given
+        entities, and ``at`` keeps relations holding at that chapter. Edges
+        are written only when both endpoints are exported.
+        """
+        index = self._index()
+        graph = index.graph
+        types = set(entity_types or ())
+        labels = set(relations or ())
+        included: Optional[Set[str]] = None
+        if seeds is not None:
+            local = self.neighborhood(
+                seeds,
+                hops=hops,
+                max_nodes=max(len(graph.entities), 1),
+                relations=labels or None,
+                at=at,
+            )
+            included = set(local["hops"])
+
+        def keep(entity: Optional[WorldEntity]) -> bool:
+            if entity is None:
+                return False
+            return (included is None or entity.id in included) and (
+                not types or entity.type in types
+            )
+
+        attribute_keys = sorted(
+            {
+                key
+                for entity in graph.entities.values()
+                if keep(entity)
+                for key in entity.attributes
+            }
+        )
+        node_keys: Dict[str, type] = {
+            "name": str,
+            "type": str,
+            "aliases": str,
+            "tags": str,
+            "description": str,
+        }
+        node_keys.update((f"{ATTRIBUTE_PREFIX}{key}", str) for key in attribute_keys)
+        edge_keys: Dict[str, type] = {
+            "relation": str,
+            "weight": int,
+            "note": str,
+            "from_chapter": str,
+            "until_chapter": str,
+        }
+
+        def nodes() -> Iterator[Tuple[str, Dict[str, Any]]]:
+            for entity in graph.entities.values():
+                if not keep(entity):
+                    continue
+                row: Dict[str, Any] = {
+                    "name": entity.name,
+                    "type": entity.type,
+                    "aliases": entity.aliases,
+                    "tags": entity.tags,
+                    "description": entity.description,
+                }
+                for key, value in entity.attributes.items():
+                    row[f"{ATTRIBUTE_PREFIX}{key}"] = value
+                yield entity.id, row
+
+        def edges() -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+            for rel in self.relations_at(at) if at else graph.relations:
+                if labels and rel.relation not in labels:
+                    continue
+                if not keep(graph.entities.get(rel.source_id)):
+                    continue
+                if not keep(graph.entities.get(rel.target_id)):
+                    continue
+                yield rel.source_id, rel.target_id, {
+                    "relation": rel.relation,
+                    "weight": rel.weight,
+                    "note": rel.note,
+                    "from_chapter": rel.from_chapter,
+                    "until_chapter": rel.until_chapter,
+                }
+
+        return write_graph(
+            path,
+            nodes(),
+            edges(),
+            fmt=fmt,
+            name=self.novel_id,
+            node_keys=node_keys,
+            edge_keys=edge_keys,
+        )
+
     def list_entities(self, entity_type: str = "") -> List[WorldEntity]:
-        graph = self._load_graph()
-        items = list(graph.entities.values())
+        index = self._index()
+        entities = index.graph.entities
         if entity_type:
-            items = [item for item in items if item.type == entity_type]
+            items = [entities[entity_id] for entity_id in index.by_type.get(entity_type, [])]
+        else:
+            items = list(entities.values())
         items.sort(key=lambda item: item.id)
         return items
 
-    def list_relations(self, relation: str = "") -> List[WorldRelation]:
-        graph = self._load_graph()
-        items = list(graph.relations)
+    def search_entities(
+        self,
+        query: str = "",
+        *,
+        entity_type: str = "",
+        attributes: Optional[Dict[str, str]] = None,
+        limit: int = 20,
+    ) -> List[Tuple[WorldEntity, float]]:
+        """Entities matching every token of ``query`` plus exact filters, best first.
+
+        Searches name, aliases, tags, attribute values and description; CJK
+        text matches by character bigrams. The inverted index is persisted in
+        ``search_index.json``, stamped with the graph version it matches, and
+        kept current by ``upsert_entity`` once loaded.
+        """
+        index = self._index()
+        if index.search is None:
+            if self._session_graph is not None:
+                # The session graph is not on disk yet; nothing to persist.
+                index.search = EntitySearchIndex.build(index.graph.entities.values())
+            else:
+                index.search = self._load_search_index(index)
+        return [
+            (index.graph.entities[entity_id], score)
+            for entity_id, score in index.search.search(
+                query, entity_type=entity_type, attributes=attributes, limit=limit
+            )
+        ]
+
+    @staticmethod
+    def _temporal_index(index: _WorldIndex, order: ChapterOrder) -> IntervalIndex:
+        """Interval index of windowed relations for the outline ``order``."""
+        version = order.version
+        if index.temporal is None or index.temporal[0] != version:
+            ordinal = order.ordinal
+            intervals = [
+                (
+                    ordinal(rel.from_chapter) if rel.from_chapter else _OPEN_START,
+                    ordinal(rel.until_chapter) if rel.until_chapter else _OPEN_END,
+                    rel,
+                )
+                for rel in index.graph.relations
+                if rel.is_temporal
+            ]
+            index.temporal = (version, IntervalIndex(intervals))
+        return index.temporal[1]
+
+    def relations_at(self, chapter_id: str) -> List[WorldRelation]:
+        """Relations that hold at ``chapter_id``, in O(log n + k).
+
+        Relations without a window always hold; windowed ones are looked up
+        in an interval index over chapter ordinals.
+        """
+        index = self._index()
+        order = self.chapter_registry.snapshot()
+        point = order.ordinal(chapter_id)
+        return index.static_relations + self._temporal_index(index, order).stab(point)
+
+    def list_relations(self, relation: str = "", at: str = "") -> List[WorldRelation]:
+        graph = self._index().graph
+        items = self.relations_at(at) if at else list(graph.relations)
         if relation:
             items = [item for item in items if item.relation == relation]
         items.sort(key=lambda item: (item.source_id, item.relation, item.target_id))
@@ -111,114 +806,304 @@ class WorldGraphManager:
     def related_entities(
         self, *, entity_id: str, relation: str = ""
     ) -> List[Tuple[WorldRelation, WorldEntity]]:
-        graph = self._load_graph()
+        """Outgoing ``(relation, target)`` pairs of ``entity_id`` in O(degree)."""
+        index = self._index()
         pairs: List[Tuple[WorldRelation, WorldEntity]] = []
-        for rel in graph.relations:
-            if rel.source_id != entity_id:
-                continue
-            if relation and rel.relation != relation:
-                continue
-            target = graph.entities.get(rel.target_id)
-            if target is None:
-                continue
-            pairs.append((rel, target))
+        for rel in index.out_edges(entity_id, relation):
+            target = index.graph.entities.get(rel.target_id)
+            if target is not None:
+                pairs.append((rel, target))
+        return pairs
+
+    def incoming_entities(
+        self, *, entity_id: str, relation: str = ""
+    ) -> List[Tuple[WorldRelation, WorldEntity]]:
+        """Incoming ``(relation, source)`` pairs of ``entity_id`` in O(degree)."""
+        index = self._index()
+        pairs: List[Tuple[WorldRelation, WorldEntity]] = []
+        for rel in index.in_edges(entity_id, relation):
+            source = index.graph.entities.get(rel.source_id)
+            if source is not None:
+                pairs.append((rel, source))
         return pairs
 
+    def neighborhood(
+        self,
+        seeds: Iterable[str],
+        hops: int = 2,
+        max_nodes: int = 30,
+        *,
+        relations: Optional[Iterable[str]] = None,
+        direction: str = "both",
+        at: str = "",
+    ) -> Dict[str, Any]:
+        """Entities within ``hops`` edges of ``seeds`` (ids or names), BFS order.
+
+        Expansion stops once ``max_nodes`` entities are collected, so the cost
+        is bounded by the neighbourhood size rather than the graph size.
+        ``relations`` restricts which labels are followed and ``direction`` is
+        ``out``/``in``/``both``; with ``at`` only relations holding at that
+        chapter are followed. Returns ``{"entities", "relations", "hops"}``
+        where ``relations`` are the edges among the collected entities and
+        ``hops`` maps entity id to its distance. Results are cached per graph
+        version (LRU of ``NEIGHBORHOOD_CACHE_SIZE``).
+        """
+        if direction not in {"out", "in", "both"}:
+            raise ValueError(f"direction 仅支持 out/in/both: {direction}")
+        index = self._index()
+        seed_ids: List[str] = []
+        for seed in seeds:
+            entity_id = seed if seed in index.graph.entities else index.names.get(seed)
+            if entity_id and entity_id not in seed_ids:
+                seed_ids.append(entity_id)
+        labels = tuple(sorted(set(relations))) if relations else ()
+        moment: Tuple[str, int] = ("", 0)
+        active: Optional[Set[int]] = None
+        order: Optional[ChapterOrder] = None
+        if at:
+            order = self.chapter_registry.snapshot()
+            moment = (order.version, order.ordinal(at))
+        key = (tuple(seed_ids), hops, max_nodes, labels, direction, moment)
+        cached = index.neighborhoods.get(key)
+        if cached is not None:
+            index.neighborhoods.move_to_end(key)
+        else:
+            if at:
+                active = {
+                    id(rel) for rel in self._temporal_index(index, order).stab(moment[1])
+                }
+            cached = self._bounded_bfs(
+                index, seed_ids, hops, max_nodes, labels, direction, active
+            )
+            index.neighborhoods[key] = cached
+            if len(index.neighborhoods) > self.NEIGHBORHOOD_CACHE_SIZE:
+                index.neighborhoods.popitem(last=False)
+        return {
+            "entities": list(cached["entities"]),
+            "relations": list(cached["relations"]),
+            "hops": dict(cached["hops"]),
+        }
+
+    @staticmethod
+    def _bounded_bfs(
+        index: _WorldIndex,
+        seed_ids: List[str],
+        hops: int,
+        max_nodes: int,
+        labels: Tuple[str, ...],
+        direction: str,
+        active: Optional[Set[int]] = None,
+    ) -> Dict[str, Any]:
+        """BFS behind ``neighborhood``; ``active`` holds the ids of windowed
+        relations in force, or ``None`` to ignore windows."""
+
+        def edges(entity_id: str, adjacency_of: Any) -> Iterator[WorldRelation]:
+            for label in labels or ("",):
+                for rel in adjacency_of(entity_id, label):
+                    if active is None or not rel.is_temporal or id(rel) in active:
+                        yield rel
+
+        distance: Dict[str, int] = {}
+        queue: deque = deque()
+        for entity_id in seed_ids[:max_nodes]:
+            distance[entity_id] = 0
+            queue.append(entity_id)
+        while queue and len(distance) < max_nodes:
+            node = queue.popleft()
+            if distance[node] >= hops:
+                continue
+            neighbours: List[str] = []
+            if direction in {"out", "both"}:
+                neighbours.extend(rel.target_id for rel in edges(node, index.out_edges))
+            if direction in {"in", "both"}:
+                neighbours.extend(rel.source_id for rel in edges(node, index.in_edges))
+            for neighbour in neighbours:
+                if neighbour in distance or neighbour not in index.graph.entities:
+                    continue
+                distance[neighbour] = distance[node] + 1
+                queue.append(neighbour)
+                if len(distance) >= max_nodes:
+                    break
+
+        collected: List[WorldRelation] = []
+        for entity_id in distance:
+            for rel in edges(entity_id, index.out_edges):
+                if rel.target_id in distance:
+                    collected.append(rel)
+        return {
+            "entities": [index.graph.entities[entity_id] for entity_id in distance],
+            "relations": collected,
+            "hops": distance,
+        }
+
+    def centrality(self) -> Dict[str, float]:
+        """Weighted PageRank of every entity, computed once per graph version."""
+        index = self._index()
+        if index.centrality is None:
+            graph = index.graph
+            index.centrality = weighted_pagerank(
+                list(graph.entities),
+                ((rel.source_id, rel.target_id, rel.weight) for rel in graph.relations),
+            )
+        return index.centrality
+
+    def _ranked(self) -> Tuple[List[WorldEntity], List[WorldRelation]]:
+        """Entities by centrality and relations by weighted endpoint centrality."""
+        index = self._index()
+        if index.ranked_entities is None or index.ranked_relations is None:
+            scores = self.centrality()
+            entities = index.graph.entities
+            index.ranked_entities = sorted(
+                entities.values(), key=lambda item: (-scores[item.id], item.id)
+            )
+            index.ranked_relations = sorted(
+                (
+                    rel
+                    for rel in index.graph.relations
+                    if rel.source_id in entities and rel.target_id in entities
+                ),
+                key=lambda rel: (
+                    -rel.weight * (scores[rel.source_id] + scores[rel.target_id]),
+                    rel.relation,
+                    rel.source_id,
+                    rel.target_id,
+                ),
+            )
+        return index.ranked_entities, index.ranked_relations
+
     def summary(self, *, max_entities: int = 8, max_relations: int = 8) -> str:
-        graph = self._load_graph()
+        """Most central entities and relations; O(k) once the ranking is cached."""
+        graph = self._index().graph
         if not graph.entities:
             return "暂无世界观图谱"
 
-        entities = sorted(graph.entities.values(), key=lambda item: item.id)[:max_entities]
-        entity_part = ", ".join(f"{item.name}<{item.type}>" for item in entities)
-
-        relations = sorted(
-            graph.relations, key=lambda item: (item.weight * -1, item.relation)
-        )[:max_relations]
-        relation_parts: List[str] = []
-        for rel in relations:
-            source = graph.entities.get(rel.source_id)
-            target = graph.entities.get(rel.target_id)
-            if not source or not target:
-                continue
-            relation_parts.append(f"{source.name}-{rel.relation}->{target.name}")
+        ranked_entities, ranked_relations = self._ranked()
+        entity_part = ", ".join(
+            f"{item.name}<{item.type}>" for item in ranked_entities[:max_entities]
+        )
+        relation_parts = [
+            f"{graph.entities[rel.source_id].name}-{rel.relation}->"
+            f"{graph.entities[rel.target_id].name}"
+            for rel in ranked_relations[:max_relations]
+        ]
         if relation_parts:
             return f"实体: {entity_part}; 关系: {'; '.join(relation_parts)}"
         return f"实体: {entity_part}; 关系: 暂无"
 
-    def check_conflicts(self) -> Dict[str, object]:
-        graph = self._load_graph()
-        errors: List[str] = []
-        warnings: List[str] = []
-
-        for rel in graph.relations:
-            if rel.source_id not in graph.entities:
-                errors.append(f"关系源实体不存在: {rel.source_id}")
-            if rel.target_id not in graph.entities:
-                errors.append(f"关系目标实体不存在: {rel.target_id}")
-
-        seen: Set[Tuple[str, str, str]] = set()
-        for rel in graph.relations:
-            key = (rel.source_id, rel.relation, rel.target_id)
-            if key in seen:
-                warnings.append(
-                    f"重复关系: {rel.source_id}-{rel.relation}->{rel.target_id}"
-                )
-            seen.add(key)
-
-        above_edges: Dict[str, List[str]] = {}
-        for rel in graph.relations:
-            if rel.relation != "above":
-                continue
-            above_edges.setdefault(rel.source_id, []).append(rel.target_id)
-
-        cycle = self._find_cycle(above_edges)
-        if cycle:
-            path = " -> ".join(cycle)
-            errors.append(f"境界层级存在循环: {path}")
+    def check_conflicts(self, full: bool = False) -> Dict[str, object]:
+        """Report dangling references, duplicate relations and ``above`` cycles.
 
+        Reads the incrementally maintained conflict state; ``full`` (or a
+        state that no longer matches the graph file) forces a full rescan.
+        """
+        graph = self._index().graph
+        if self._session_graph is not None and self._session_conflicts is not None:
+            state = self._session_conflicts
+        elif full:
+            state = WorldConflictState.build(graph, find_cycle)
+            if self.graph_file.exists():
+                self._store_conflict_state(state)
+        else:
+            state = self._load_conflict_state(graph, take=False)
+        report = state.report()
         return {
-            "errors": errors,
-            "warnings": warnings,
+            "errors": report["errors"],
+            "warnings": report["warnings"],
             "statistics": {
                 "entity_count": len(graph.entities),
                 "relation_count": len(graph.relations),
             },
-            "is_valid": len(errors) == 0,
+            "is_valid": len(report["errors"]) == 0,
         }
 
-    @staticmethod
-    def _find_cycle(edges: Dict[str, List[str]]) -> List[str]:
-        visiting: Set[str] = set()
-        visited: Set[str] = set()
-        parent: Dict[str, str] = {}
-
-        def dfs(node: str) -> List[str]:
-            visiting.add(node)
-            for nxt in edges.get(node, []):
-                if nxt in visited:
-                    continue
-                if nxt in visiting:
-                    cycle = [nxt, node]
-                    cur = node
-                    while parent.get(cur) and parent[cur] != nxt:
-                        cur = parent[cur]
-                        cycle.append(cur)
-                    cycle.append(nxt)
-                    cycle.reverse()
-                    return cycle
-                parent[nxt] = node
-                found = dfs(nxt)
-                if found:
-                    return found
-            visiting.remove(node)
-            visited.add(node)
-            return []
+    def strongly_connected_components(self, relation: str = "above") -> List[List[str]]:
+        """SCCs of the subgraph formed by ``relation`` edges (iterative Tarjan)."""
+        return strongly_connected_components(self._relation_edges(relation))
 
-        for node in list(edges.keys()):
-            if node in visited:
-                continue
-            found = dfs(node)
-            if found:
-                return found
-        return []
+    def find_cycles(self, relation: str = "above") -> List[List[str]]:
+        """Every cyclic component of ``relation`` edges, one closed path each."""
+        return find_cycles(self._relation_edges(relation))
+
+    def realm_ranks(self) -> Dict[str, int]:
+        """Rank of every realm in the ``above`` hierarchy, by entity id and name.
+
+        A realm's rank is its height over the lowest realms below it, so
+        ``a above b`` implies ``rank[a] > rank[b]``. Realms on, above or below
+        a cycle are left unranked. The table, and the reachability closure
+        ``compare_realms`` reads, are recomputed only when the set of
+        ``above`` edges changes.
+        """
+        index = self._index()
+        if index.realm_ranks is not None:
+            return index.realm_ranks
+        edges = self._relation_edges(self.REALM_RELATION)
+        entities = index.graph.entities
+        key = (
+            frozenset(
+                (source_id, target_id)
+                for source_id, targets in edges.items()
+                for target_id in targets
+            ),
+            frozenset(
+                (entity_id, entities[entity_id].name)
+                for source_id, targets in edges.items()
+                for entity_id in (source_id, *targets)
+                if entity_id in entities
+            ),
+        )
+        cached = self._rank_cache.get(self.graph_file)
+        if cached is not None and cached[0] == key:
+            index.realm_ranks, index.realm_reach = cached[1], cached[2]
+            return cached[1]
+        heights = longest_path_heights(edges)
+        ranks: Dict[str, int] = {}
+        for entity_id, height in heights.items():
+            ranks[entity_id] = height
+            entity = entities.get(entity_id)
+            if entity is not None:
+                ranks.setdefault(entity.name, height)
+        # Lower realms first, so every successor's mask is complete when read.
+        bits: Dict[str, int] = {}
+        reach: Dict[str, int] = {}
+        for entity_id in sorted(heights, key=heights.__getitem__):
+            bits[entity_id] = len(bits)
+            mask = 0
+            for target_id in edges.get(entity_id, ()):
+                if target_id in heights:
+                    mask |= (1 << bits[target_id]) | reach[target_id]
+            reach[entity_id] = mask
+        cached = (key, ranks, (bits, reach))
+        self._rank_cache[self.graph_file] = cached
+        index.realm_ranks, index.realm_reach = cached[1], cached[2]
+        return ranks
+
+    def compare_realms(self, a: str, b: str) -> Optional[int]:
+        """``1`` if realm ``a`` is above ``b``, ``-1`` below, ``0`` the same realm.
+
+        Accepts entity ids or names. Realms are only ordered along ``above``
+        paths, so ``None`` means "not ordered": either realm is unranked, or
+        the two sit on separate branches and neither reaches the other.
+        """
+        self.realm_ranks()
+        index = self._index()
+        bits, reach = index.realm_reach
+        id_a = a if a in index.graph.entities else index.names.get(a, a)
+        id_b = b if b in index.graph.entities else index.names.get(b, b)
+        if id_a not in bits or id_b not in bits:
+            return None
+        if id_a == id_b:
+            return 0
+        if reach[id_a] >> bits[id_b] & 1:
+            return 1
+        if reach[id_b] >> bits[id_a] & 1:
+            return -1
+        return None
+
+    def _relation_edges(self, relation: str) -> Dict[str, List[str]]:
+        index = self._index()
+        edges: Dict[str, List[str]] = {}
+        for source_id, by_relation in index.outgoing.items():
+            targets = [rel.target_id for rel in by_relation.get(relation, [])]
+            if targets:
+                edges[source_id] = targets
+        return edges